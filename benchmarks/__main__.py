@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.corpus import PROFILES
+from benchmarks.suite import (
+    DEFAULT_REPEAT,
+    DEFAULT_THRESHOLD,
+    compare,
+    mismatches,
+    run,
+)
+
+
+def parse_cores(value: str):
+    try:
+        cores = sorted({int(count) for count in value.split(",")})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a list of numbers: {value!r}") from None
+    if cores[0] < 1:
+        raise argparse.ArgumentTypeError("every number of cores must be at least 1")
+    return cores
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark python-abc on generated corpora, or compare two runs",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--profile",
+        dest="profiles",
+        action="append",
+        choices=tuple(PROFILES),
+        default=[],
+        help="only run this corpus profile, may be repeated (default: all of them)",
+    )
+    run_parser.add_argument(
+        "--cores",
+        dest="cores",
+        type=parse_cores,
+        default=sorted({1, os.cpu_count() or 1}),
+        help="comma-separated numbers of cores to time the process pool with "
+        "(default: 1 and every core)",
+    )
+    run_parser.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        default=0,
+        help="seed for the corpus generator",
+    )
+    run_parser.add_argument(
+        "--repeat",
+        dest="repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="run each benchmark this many times and keep the best",
+    )
+    run_parser.add_argument(
+        "--output",
+        dest="output",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="write the results as JSON to this file instead of stdout",
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare two runs, failing if anything got worse"
+    )
+    compare_parser.add_argument("old", type=str, help="results of the earlier run")
+    compare_parser.add_argument("new", type=str, help="results of the later run")
+    compare_parser.add_argument(
+        "--threshold",
+        dest="threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="how much worse, as a fraction, a metric must get to count as a regression",
+    )
+    compare_parser.add_argument(
+        "--format",
+        dest="format",
+        choices=("text", "jsonl"),
+        default="text",
+        help="write the comparison as a table or as JSON Lines",
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = run(
+            args.profiles or tuple(PROFILES),
+            args.cores,
+            args.seed,
+            args.repeat,
+            log=sys.stderr,
+        )
+        report = json.dumps(results, indent=2) + "\n"
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report)
+        else:
+            sys.stdout.write(report)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    for key, old_value, new_value in mismatches(old, new):
+        print(f"warning: {key} differs: {old_value} -> {new_value}", file=sys.stderr)
+
+    regressions = 0
+    for comparison in compare(old, new, args.threshold):
+        regressions += comparison.status == "regression"
+        if args.format == "jsonl":
+            print(json.dumps(comparison._asdict()))
+        else:
+            difference = comparison.new / comparison.old - 1 if comparison.old else 0
+            print(
+                f"{comparison.benchmark:<28} {comparison.metric:<14} "
+                f"{comparison.old:>12.4g} {comparison.new:>12.4g} "
+                f"{difference:>+8.1%} {comparison.status}"
+            )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
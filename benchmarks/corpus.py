@@ -0,0 +1,182 @@
+import hashlib
+import os
+import random
+from typing import Dict, List, NamedTuple
+
+# How often each kind of statement is picked, relative to the others. Compound statements are
+# only picked while there's room to nest another block.
+DEFAULT_MIX = {
+    "assign": 6,
+    "augassign": 1,
+    "call": 4,
+    "if": 3,
+    "for": 2,
+    "while": 1,
+    "try": 1,
+    "with": 1,
+    "def": 2,
+    "class": 1,
+}
+COMPOUND = ("if", "for", "while", "try", "with", "def", "class")
+
+FILES_PER_PACKAGE = 50
+
+
+class Profile(NamedTuple):
+    """The shape of a corpus: how many files, how long each is, and what's in them"""
+
+    files: int
+    # Statements per file, counting those in nested blocks
+    statements: int
+    # How deeply blocks may nest
+    depth: int
+    mix: Dict[str, int] = DEFAULT_MIX
+
+
+PROFILES = {
+    # Lots of short modules, like a typical application
+    "small": Profile(files=400, statements=40, depth=2),
+    # A few very long modules, like generated code
+    "large": Profile(files=8, statements=5000, depth=3),
+    # Deeply nested control flow
+    "deep": Profile(
+        files=60,
+        statements=300,
+        depth=10,
+        mix={**DEFAULT_MIX, "if": 6, "for": 4, "while": 3, "try": 3},
+    ),
+    # Straight-line code that's mostly assignments and calls
+    "flat": Profile(
+        files=60,
+        statements=600,
+        depth=1,
+        mix={"assign": 8, "augassign": 2, "call": 6, "def": 1},
+    ),
+}
+
+
+class Generator:
+    """Writes random but valid Python source, the same every time for the same seed"""
+
+    def __init__(self, profile: Profile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        simple = {k: w for k, w in profile.mix.items() if k not in COMPOUND}
+        self.kinds = list(profile.mix), list(profile.mix.values())
+        self.simple_kinds = list(simple) or ["assign"], list(simple.values()) or [1]
+        self.remaining = 0
+        self.definitions = 0
+
+    def name(self) -> str:
+        return f"v{self.rng.randrange(8)}"
+
+    def number(self) -> int:
+        return self.rng.randrange(100)
+
+    def expression(self) -> str:
+        v, n = self.name(), self.number()
+        return self.rng.choice(
+            (
+                f"{v} + {n}",
+                f"{v} * {self.name()} - {n}",
+                f"helper({v}, {n})",
+                f"{v}.value",
+                f"{v}[{n}]",
+                f"[{self.name()} for {v} in range({n}) if {v} > {n // 2}]",
+                f"{v} if {v} > {n} else {self.name()}",
+                f"{v} and not {self.name()}",
+                str(n),
+            )
+        )
+
+    def source(self) -> str:
+        self.remaining = self.profile.statements
+        self.definitions = 0
+        lines: List[str] = []
+        while self.remaining > 0:
+            self.statement(lines, 0)
+        return "\n".join(lines) + "\n"
+
+    def block(self, lines: List[str], depth: int) -> None:
+        for _ in range(self.rng.randint(1, 4)):
+            self.statement(lines, depth)
+            if self.remaining <= 0:
+                break
+
+    def statement(self, lines: List[str], depth: int) -> None:
+        self.remaining -= 1
+        if depth < self.profile.depth:
+            kind = self.rng.choices(*self.kinds)[0]
+        else:
+            kind = self.rng.choices(*self.simple_kinds)[0]
+        indent = "    " * depth
+        v = self.name()
+
+        if kind == "assign":
+            lines.append(f"{indent}{v} = {self.expression()}")
+        elif kind == "augassign":
+            lines.append(f"{indent}{v} += {self.expression()}")
+        elif kind == "call":
+            lines.append(f"{indent}helper({v}, {self.expression()})")
+        elif kind == "if":
+            lines.append(f"{indent}if {v} > {self.number()}:")
+            self.block(lines, depth + 1)
+            if self.rng.random() < 0.3:
+                lines.append(f"{indent}elif {v} == {self.number()}:")
+                self.block(lines, depth + 1)
+            if self.rng.random() < 0.5:
+                lines.append(f"{indent}else:")
+                self.block(lines, depth + 1)
+        elif kind == "for":
+            lines.append(f"{indent}for {v} in range({self.number()}):")
+            self.block(lines, depth + 1)
+        elif kind == "while":
+            lines.append(f"{indent}while {v} < {self.number()}:")
+            self.block(lines, depth + 1)
+        elif kind == "try":
+            lines.append(f"{indent}try:")
+            self.block(lines, depth + 1)
+            lines.append(f"{indent}except ValueError:")
+            self.block(lines, depth + 1)
+        elif kind == "with":
+            lines.append(f"{indent}with open({v}) as {self.name()}:")
+            self.block(lines, depth + 1)
+        elif kind == "def":
+            self.definitions += 1
+            lines.append(f"{indent}def f{self.definitions}({v}, option=None):")
+            self.block(lines, depth + 1)
+            lines.append(f"{indent}    return {self.expression()}")
+        elif kind == "class":
+            self.definitions += 1
+            lines.append(f"{indent}class C{self.definitions}:")
+            self.block(lines, depth + 1)
+        else:
+            raise ValueError(f"unknown kind of statement {kind!r}")
+
+
+def generate_sources(profile: Profile, seed: int = 0) -> List[str]:
+    """The source of every file in the corpus, in order"""
+    generator = Generator(profile, random.Random(seed))
+    return [generator.source() for _ in range(profile.files)]
+
+
+def generate_corpus(directory: str, profile: Profile, seed: int = 0) -> List[str]:
+    """Write the corpus under `directory` as packages of modules, returning their paths"""
+    files = []
+    for index, source in enumerate(generate_sources(profile, seed)):
+        package = os.path.join(directory, f"package{index // FILES_PER_PACKAGE:03}")
+        os.makedirs(package, exist_ok=True)
+        filename = os.path.join(package, f"module{index:04}.py")
+        with open(filename, "w") as f:
+            f.write(source)
+        files.append(filename)
+    return files
+
+
+def corpus_digest(sources: List[str]) -> str:
+    """Identifies a corpus, so that runs against different corpora aren't compared"""
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(source.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
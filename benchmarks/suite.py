@@ -0,0 +1,249 @@
+import ast
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import python_abc
+from python_abc import calculate_abc
+
+from benchmarks.corpus import PROFILES, corpus_digest, generate_corpus, generate_sources
+
+# Bump this whenever the layout of the results changes
+FORMAT_VERSION = 1
+
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.1
+
+# Metrics where a bigger number is better; for every other metric that's compared, smaller is
+HIGHER_IS_BETTER = {"nodes_per_sec", "bytes_per_sec", "files_per_sec"}
+COMPARED = HIGHER_IS_BETTER | {"seconds", "import_seconds", "peak_rss_kb"}
+
+Metrics = Dict[str, Any]
+
+
+class Run(NamedTuple):
+    seconds: float
+    peak_rss_kb: Optional[int]
+
+
+def count_nodes(source: str) -> int:
+    return sum(1 for _ in ast.walk(ast.parse(source)))
+
+
+def bench_calculate(sources: List[str], repeat: int = DEFAULT_REPEAT) -> Metrics:
+    """Time `calculate_abc` over every source in this process, taking the best of `repeat`"""
+    nodes = sum(count_nodes(source) for source in sources)
+    size = sum(len(source.encode()) for source in sources)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for source in sources:
+            calculate_abc(source)
+        best = min(best, time.perf_counter() - start)
+    return {
+        "files": len(sources),
+        "bytes": size,
+        "nodes": nodes,
+        "seconds": best,
+        "nodes_per_sec": nodes / best,
+        "bytes_per_sec": size / best,
+    }
+
+
+def cli_environment() -> Dict[str, str]:
+    """Make sure the CLI being timed is the python_abc that's imported here"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(python_abc.__file__)))
+    path = os.environ.get("PYTHONPATH")
+    return {
+        **os.environ,
+        "PYTHONPATH": root if not path else f"{root}{os.pathsep}{path}",
+    }
+
+
+def run_cli(arguments: List[str]) -> Run:
+    """Run `python -m python_abc` once, discarding its report"""
+    command = [sys.executable, "-m", "python_abc", *arguments]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, env=cli_environment()
+    )
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # Linux reports kilobytes, and macOS bytes
+        scale = 1024 if sys.platform == "darwin" else 1
+        peak_rss_kb: Optional[int] = usage.ru_maxrss // scale
+    else:
+        process.wait()
+        seconds = time.perf_counter() - start
+        peak_rss_kb = None
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}")
+    return Run(seconds, peak_rss_kb)
+
+
+def bench_cli(
+    arguments: List[str], files: int, repeat: int = DEFAULT_REPEAT
+) -> Metrics:
+    """Time the whole pipeline, taking the best of `repeat` and the largest peak RSS"""
+    runs = [run_cli(arguments) for _ in range(repeat)]
+    best = min(run.seconds for run in runs)
+    metrics: Metrics = {"seconds": best, "files_per_sec": files / best}
+    if runs[0].peak_rss_kb is not None:
+        metrics["peak_rss_kb"] = max(run.peak_rss_kb or 0 for run in runs)
+    return metrics
+
+
+def bench_startup(directory: str, repeat: int = DEFAULT_REPEAT) -> Metrics:
+    """How long scoring one tiny file takes, next to starting Python and doing nothing"""
+    filename = os.path.join(directory, "tiny.py")
+    with open(filename, "w") as f:
+        f.write("x = 1\n")
+    metrics = bench_cli([filename], 1, repeat)
+    del metrics["files_per_sec"]
+
+    interpreter = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        interpreter = min(interpreter, time.perf_counter() - start)
+    metrics["interpreter_seconds"] = interpreter
+    metrics["import_seconds"] = import_seconds()
+    return metrics
+
+
+def import_seconds() -> float:
+    """The time taken to import the CLI, as reported by `-X importtime`"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import python_abc.__main__"],
+        stderr=subprocess.PIPE,
+        env=cli_environment(),
+        check=True,
+    )
+    for line in completed.stderr.decode().splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "python_abc.__main__":
+            return int(fields[1]) / 1_000_000
+    raise RuntimeError("python_abc.__main__ was not imported")
+
+
+def run(
+    profiles: Iterable[str] = tuple(PROFILES),
+    cores: Iterable[int] = (1,),
+    seed: int = 0,
+    repeat: int = DEFAULT_REPEAT,
+    log=None,
+) -> Dict[str, Any]:
+    """Run every benchmark, returning the results in the form that's saved as JSON
+
+    Each profile's corpus is scored in this process with `calculate_abc`, by the CLI with
+    the executor it picks for itself, and by the CLI on a process pool with each number of
+    `cores`, to show how it scales.
+    """
+    benchmarks: Dict[str, Metrics] = {}
+    corpora: Dict[str, str] = {}
+
+    def record(name: str, metrics: Metrics) -> None:
+        benchmarks[name] = metrics
+        if log is not None:
+            print(f"{name}: {format_metrics(metrics)}", file=log, flush=True)
+
+    with tempfile.TemporaryDirectory(prefix="python-abc-bench-") as directory:
+        record("startup", bench_startup(directory, repeat))
+        for name in profiles:
+            profile = PROFILES[name]
+            sources = generate_sources(profile, seed)
+            corpora[name] = corpus_digest(sources)
+            record(f"calculate/{name}", bench_calculate(sources, repeat))
+
+            root = os.path.join(directory, name)
+            generate_corpus(root, profile, seed)
+            record(f"cli/{name}/auto", bench_cli([root], profile.files, repeat))
+            for count in cores:
+                record(
+                    f"cli/{name}/process-{count}",
+                    bench_cli(
+                        [root, "--executor", "process", "--cores", str(count)],
+                        profile.files,
+                        repeat,
+                    ),
+                )
+
+    return {
+        "format": FORMAT_VERSION,
+        "python_abc": python_abc.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+        "corpora": corpora,
+        "benchmarks": benchmarks,
+    }
+
+
+def format_metrics(metrics: Metrics) -> str:
+    return ", ".join(
+        f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in metrics.items()
+    )
+
+
+class Comparison(NamedTuple):
+    benchmark: str
+    metric: str
+    old: float
+    new: float
+    # How much worse the new value is, as a fraction of the old one; negative if it's better
+    change: float
+    status: str
+
+
+def worsening(metric: str, old: float, new: float) -> float:
+    if metric in HIGHER_IS_BETTER:
+        # Compare rates as times, so that halving the speed counts the same as doubling time
+        return old / new - 1 if new else float("inf")
+    return new / old - 1 if old else 0.0
+
+
+def compare(
+    old: Dict[str, Any], new: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> Iterator[Comparison]:
+    """Yield how every metric the two runs share has changed
+
+    A metric that got more than `threshold` worse is a `regression`, one that got more than
+    `threshold` better an `improvement`, and anything in between is `unchanged`.
+    """
+    for name, new_metrics in new["benchmarks"].items():
+        old_metrics = old["benchmarks"].get(name)
+        if old_metrics is None:
+            continue
+        for metric, new_value in new_metrics.items():
+            old_value = old_metrics.get(metric)
+            if metric not in COMPARED or old_value is None:
+                continue
+            change = worsening(metric, old_value, new_value)
+            if change > threshold:
+                status = "regression"
+            elif change < -threshold:
+                status = "improvement"
+            else:
+                status = "unchanged"
+            yield Comparison(name, metric, old_value, new_value, change, status)
+
+
+def mismatches(old: Dict[str, Any], new: Dict[str, Any]) -> List[Tuple[str, Any, Any]]:
+    """Anything that makes the two runs not strictly comparable"""
+    found = []
+    for key in ("format", "seed", "cpu_count", "python", "platform"):
+        if old.get(key) != new.get(key):
+            found.append((key, old.get(key), new.get(key)))
+    for name, digest in new.get("corpora", {}).items():
+        if old.get("corpora", {}).get(name, digest) != digest:
+            found.append((f"corpus {name}", old["corpora"][name], digest))
+    return found
@@ -1 +1,26 @@
 __version__ = "0.1.0"
+
+# The public API is imported on first use rather than here, so that running the command line
+# doesn't pay for modules it may not need before it has even parsed its arguments
+_EXPORTS = {
+    "Options": "python_abc.analyze",
+    "Result": "python_abc.analyze",
+    "analyze_files": "python_abc.analyze",
+    "analyze_paths": "python_abc.analyze",
+    "calculate_abc": "python_abc.calculate",
+    "calculate_abc_by_scope": "python_abc.calculate",
+}
+
+__all__ = ["__version__", *_EXPORTS]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from importlib import import_module
+
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
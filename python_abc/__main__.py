@@ -1,14 +1,150 @@
 import argparse
-import multiprocessing
+import io
 import os
-from typing import List
+import sys
+from contextlib import nullcontext
+from functools import partial
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple, Union
 
-from joblib import Parallel, delayed
+from python_abc.analyze import (
+    DEFAULT_MAX_FILE_SIZE,
+    Options,
+    Result,
+    analyze_files,
+    analyze_source,
+    describe_error,
+    expand,
+    to_compact,
+)
+from python_abc.dedupe import Duplicates
+from python_abc.discover import (
+    DEFAULT_EXCLUDES,
+    DEFAULT_INCLUDES,
+    compile_globs,
+    discover,
+    read_file_list,
+)
+from python_abc.output import FORMATS, Writer, make_writer, open_output
+from python_abc.rank import Ranking
+from python_abc.executor import EXECUTORS
+from python_abc.schedule import stat_sizes
+from python_abc.scope import Scope
+from python_abc.shard import parse_shard, select
 
-from python_abc.calculate import calculate_abc
+if TYPE_CHECKING:
+    import socket
+
+    from python_abc.git import Change
+    from python_abc.profiling import Profiler, TimedWriter
+    from python_abc.rollup import Rollup
+    from python_abc.watch import Changes, Session
+
+# Everything else is imported only when it's needed, so that scoring a single file isn't kept
+# waiting on asyncio, sqlite3, joblib, the cache or the archive and CSV modules
+
+
+def add_report_arguments(parser: argparse.ArgumentParser) -> None:
+    """The options for what goes in the report and how it's written, which `merge` shares"""
+    parser.add_argument(
+        "--sort",
+        dest="sort",
+        action="store_true",
+        help="sort files from highest to lowest magnitude",
+    )
+    parser.add_argument(
+        "--top",
+        dest="top",
+        type=int,
+        default=None,
+        help="only display the N files with the highest magnitude, highest first",
+    )
+    parser.add_argument(
+        "--min-magnitude",
+        dest="min_magnitude",
+        type=float,
+        default=None,
+        help="only display files with at least this magnitude",
+    )
+    parser.add_argument(
+        "--top-scopes",
+        dest="top_scopes",
+        type=int,
+        default=None,
+        help="display the N classes and functions with the highest magnitude",
+    )
+    parser.add_argument(
+        "--min-scope-magnitude",
+        dest="min_scope_magnitude",
+        type=float,
+        default=None,
+        help="display the classes and functions with at least this magnitude",
+    )
+    parser.add_argument(
+        "--format",
+        dest="format",
+        choices=FORMATS,
+        default="text",
+        help="write the report as a table, JSON Lines, CSV or SARIF",
+    )
+    parser.add_argument(
+        "--output",
+        dest="output",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="write the report to this file instead of stdout",
+    )
+    parser.add_argument(
+        "--scopes",
+        dest="scopes",
+        action="store_true",
+        help="also display the magnitude of each class and function",
+    )
+    parser.add_argument(
+        "--rollup",
+        dest="rollup",
+        action="store_true",
+        help="also total up the files under each directory, with the mean, the maximum "
+        "and the worst file",
+    )
+
+
+def merge(argv: List[str]) -> int:
+    """Combine the reports for each shard into the one a single run would have written"""
+    from python_abc.merge import MergeError, merge_results, open_shards
+
+    parser = argparse.ArgumentParser(
+        prog="python-abc merge",
+        description="Combine the reports written by each `--shard` with `--format jsonl`",
+    )
+    parser.add_argument(
+        "shards",
+        nargs="+",
+        metavar="FILE",
+        help="the report for each shard, or - for stdin",
+    )
+    add_report_arguments(parser)
+    args = vars(parser.parse_args(argv))
+
+    try:
+        shards = open_shards(args["shards"])
+    except OSError as e:
+        parser.error(f"can't read {e.filename}: {e.strerror}")
+    try:
+        write_report(merge_results(shards), args, 0)
+    except MergeError as e:
+        print(f"python-abc merge: error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        for stream in shards.values():
+            stream.close()
+    return 0
 
 
 def main():
+    if sys.argv[1:2] == ["merge"]:
+        return merge(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         prog="python-abc",
         description="""\
@@ -16,7 +152,29 @@ def main():
             https://en.wikipedia.org/wiki/ABC_Software_Metric
         """,
     )
-    parser.add_argument("path", nargs=1, type=str, help="path to directory or file")
+    parser.add_argument(
+        "path",
+        nargs="?",
+        type=str,
+        help="path to directory or file, or - to read a list of paths from stdin",
+    )
+    parser.add_argument(
+        "--files-from",
+        dest="files_from",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="analyze the paths listed in this file, or stdin if it's -, one per line or "
+        "separated by NULs",
+    )
+    parser.add_argument(
+        "--stdin-filename",
+        dest="stdin_filename",
+        type=str,
+        default=None,
+        metavar="NAME",
+        help="score the source read from stdin, reporting it as NAME",
+    )
     parser.add_argument(
         "--debug",
         dest="debug",
@@ -27,60 +185,584 @@ def main():
         "--cores",
         dest="cores",
         type=int,
-        default=multiprocessing.cpu_count(),
+        default=os.cpu_count() or 1,
         help="number of cores to use",
     )
     parser.add_argument(
-        "--sort",
-        dest="sort",
-        action="store_true",
-        help="sort files from highest to lowest magnitude",
+        "--executor",
+        dest="executor",
+        choices=EXECUTORS,
+        default="auto",
+        help="analyze files in this process, on threads or on separate processes "
+        "(default: auto, which picks by how much source there is)",
+    )
+    add_report_arguments(parser)
+    parser.add_argument(
+        "--order",
+        dest="order",
+        choices=("path", "completion"),
+        default="path",
+        help="print results in the order files were found, or as soon as each is ready",
+    )
+    parser.add_argument(
+        "--window",
+        dest="window",
+        type=int,
+        default=0,
+        help="maximum number of batches of files in flight at once (default: 4 per core)",
     )
     parser.add_argument(
         "--verbose", dest="verbose", action="store_true", help="display marked-up file",
     )
+    parser.add_argument(
+        "--diff",
+        dest="diff",
+        type=str,
+        default=None,
+        metavar="BASE..HEAD",
+        help="only analyze files changed since the merge base, before and after",
+    )
+    parser.add_argument(
+        "--baseline",
+        dest="baseline",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="only report new files, and files and scopes that got better or worse since "
+        "this baseline, failing if any got worse",
+    )
+    parser.add_argument(
+        "--write-baseline",
+        dest="write_baseline",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="save the vector of every file and scope to compare later runs against",
+    )
+    parser.add_argument(
+        "--include",
+        dest="include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="only analyze files matching this glob (default: *.py), may be repeated",
+    )
+    parser.add_argument(
+        "--exclude",
+        dest="exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="skip files and directories matching this glob, may be repeated",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        dest="no_default_excludes",
+        action="store_true",
+        help=f"don't skip {', '.join(DEFAULT_EXCLUDES)} or virtualenvs",
+    )
+    parser.add_argument(
+        "--gitignore",
+        dest="gitignore",
+        action="store_true",
+        help="skip files and directories ignored by .gitignore files",
+    )
+    parser.add_argument(
+        "--follow-symlinks",
+        dest="follow_symlinks",
+        action="store_true",
+        help="descend into symlinked directories",
+    )
+    parser.add_argument(
+        "--lazy-discovery",
+        dest="lazy_discovery",
+        action="store_true",
+        help="start analyzing files before the whole tree has been walked",
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        dest="no_dedupe",
+        action="store_true",
+        help="analyze every copy of a file, rather than reusing the result for the first",
+    )
+    parser.add_argument(
+        "--shard",
+        dest="shard",
+        type=parse_shard,
+        default=None,
+        metavar="K/N",
+        help="only analyze the Kth of N shards of the files, balanced by size, to be "
+        "combined with `python-abc merge`",
+    )
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        help="keep running, and update the report whenever files change",
+    )
+    parser.add_argument(
+        "--poll",
+        dest="poll",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="with --watch, look for changes this often instead of using inotify",
+    )
+    parser.add_argument(
+        "--daemon",
+        dest="daemon",
+        action="store_true",
+        help="score files on a running `python -m python_abc.daemon`, if there is one",
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        dest="daemon_socket",
+        type=str,
+        default=None,
+        metavar="SOCKET",
+        help="the daemon's socket (default: python-abc.sock in $XDG_RUNTIME_DIR, or in a "
+        "private python-abc-UID directory in the temporary directory)",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        dest="max_file_size",
+        type=int,
+        default=DEFAULT_MAX_FILE_SIZE,
+        metavar="BYTES",
+        help="skip files bigger than this, or 0 for no limit "
+        f"(default: {DEFAULT_MAX_FILE_SIZE // (1024 * 1024)} MB)",
+    )
+    parser.add_argument(
+        "--skip-generated",
+        dest="skip_generated",
+        action="store_true",
+        help="skip files marked as generated, e.g. with @generated or DO NOT EDIT",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=str,
+        default=None,
+        help="reuse results for unchanged files from this directory across runs",
+    )
+    parser.add_argument(
+        "--cache-size",
+        dest="cache_size",
+        type=int,
+        default=None,
+        help="maximum size of the result cache in MB (default: 64)",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        nargs="?",
+        const="text",
+        choices=("text", "json"),
+        default=None,
+        metavar="FORMAT",
+        help="report where the time went to stderr, as text (the default) or JSON",
+    )
 
     args = vars(parser.parse_args())
-    path = args["path"][0]
-    files: List[str] = []
-
-    if os.path.isdir(path):
-        files = []
-        for (dirpath, dirnames, filenames) in os.walk(path):
-            files += [
-                os.path.join(dirpath, file)
-                for file in filenames
-                if file.endswith(".py")
-            ]
+    path, files_from = args["path"], args["files_from"]
+    if path == "-":
+        path, files_from = None, files_from or "-"
+    stdin_filename = args["stdin_filename"]
+    if stdin_filename is not None:
+        if path is not None or files_from is not None:
+            parser.error("--stdin-filename can't be used with a path or --files-from")
+        if args["diff"] or args["watch"] or args["shard"]:
+            parser.error(
+                "--stdin-filename can't be used with --diff, --watch or --shard"
+            )
+    elif (path is None) == (files_from is None):
+        parser.error("give either a path or a list of them with - or --files-from")
+    if files_from is not None and (args["diff"] or args["watch"]):
+        parser.error("a list of paths can't be used with --diff or --watch")
+    shard = args["shard"]
+    if shard is not None and (args["diff"] or args["watch"] or args["lazy_discovery"]):
+        parser.error("--shard can't be used with --diff, --watch or --lazy-discovery")
+
+    profiler = None
+    if args["profile"]:
+        other_modes = ("diff", "watch", "daemon", "baseline", "write_baseline")
+        if any(args[mode] for mode in other_modes):
+            parser.error(
+                "--profile can't be used with --diff, --watch, --daemon, --baseline or "
+                "--write-baseline"
+            )
+        from python_abc.profiling import Profiler
+
+        profiler = Profiler()
+
+    excludes = list(args["exclude"])
+    if not args["no_default_excludes"]:
+        excludes.extend(DEFAULT_EXCLUDES)
+
+    if args["diff"]:
+        from python_abc.git import GitError, diff_scores
+
+        changes = diff_scores(
+            args["diff"],
+            path,
+            compile_globs(args["include"] or DEFAULT_INCLUDES),
+            compile_globs(excludes),
+        )
+        try:
+            # The changes are worked out as they're written, so that's where git can fail
+            write_changes(changes, args)
+        except GitError as e:
+            parser.exit(1, f"{parser.prog}: error: {e}\n")
+        return 0
+
+    if args["daemon"] and (args["debug"] or args["verbose"]):
+        # They're printed by whichever process parses the file
+        parser.error("--daemon can't be used with --debug or --verbose")
+
+    if args["watch"] and (args["baseline"] or args["write_baseline"]):
+        parser.error("--watch can't be used with --baseline or --write-baseline")
+
+    paths: Iterable[str] = [path] if path is not None else []
+    if files_from == "-":
+        paths = read_file_list(sys.stdin.buffer)
+    elif files_from is not None:
+        try:
+            paths = read_and_close(open(files_from, "rb"))
+        except OSError as e:
+            parser.error(f"can't read {files_from}: {e.strerror}")
+    # A list of paths is analyzed as it arrives, so that it never has to be held in memory,
+    # unless it has to be split into shards first
+    lazy = args["lazy_discovery"] or (files_from is not None and shard is None)
+
+    files: Iterable[str] = discover(
+        paths,
+        include=args["include"] or DEFAULT_INCLUDES,
+        exclude=excludes,
+        gitignore=args["gitignore"],
+        follow_symlinks=args["follow_symlinks"],
+    )
+
+    if profiler is not None:
+        files = profiler.iterate(files, "discover")
+
+    cache = None
+    if args["cache_dir"] and not (args["debug"] or args["verbose"] or profiler):
+        # Debug and verbose output are printed as a side effect of the analysis itself, so
+        # there is no point answering those runs from the cache, and profiling is meant to
+        # time the analysis
+        from python_abc.cache import DEFAULT_MAX_BYTES, ResultCache
+
+        max_bytes = DEFAULT_MAX_BYTES
+        if args["cache_size"] is not None:
+            max_bytes = args["cache_size"] * 1024 * 1024
+        cache = ResultCache(args["cache_dir"], max_bytes)
+
+    baseline = None
+    if args["baseline"]:
+        from python_abc.baseline import Baseline, BaselineError
+
+        try:
+            baseline = Baseline(args["baseline"]).open()
+        except BaselineError as e:
+            parser.error(str(e))
+
+    rank_scopes = (
+        args["top_scopes"] is not None or args["min_scope_magnitude"] is not None
+    )
+
+    # Baselines always hold every scope, so that they can be compared scope by scope
+    snapshot = bool(args["write_baseline"])
+    options = Options(
+        args["debug"],
+        args["verbose"],
+        args["scopes"] or rank_scopes or baseline is not None or snapshot,
+        cache,
+        baseline,
+        snapshot,
+        args["max_file_size"],
+        args["skip_generated"],
+    )
+    # Unless we're sorting or selecting the top N, results can be printed as they arrive
+    hold_files = args["sort"] or args["top"] is not None
+    # Only bother putting the biggest files first if nobody will see the order they finish in,
+    # and shards are always kept in path order so that they can be merged
+    keep_order = (args["order"] == "path" and not hold_files) or shard is not None
+
+    if args["watch"]:
+        from python_abc import watch
+
+        session = watch.Session(
+            [path],
+            partial(
+                analyze_files,
+                executor=args["executor"],
+                workers=args["cores"],
+                options=options,
+                ordered=False,
+            ),
+            include=args["include"] or DEFAULT_INCLUDES,
+            exclude=excludes,
+            gitignore=args["gitignore"],
+            follow_symlinks=args["follow_symlinks"],
+        )
+        watcher = watch.make_watcher(
+            session, excludes, args["poll"] is not None, args["poll"] or 1.0
+        )
+        try:
+            watch.watch(session, watcher, partial(render, session, args))
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            watcher.close()
+
+    connection = None
+    if args["daemon"]:
+        from python_abc import daemon
+
+        try:
+            connection = daemon.connect(
+                args["daemon_socket"] or daemon.default_socket_path()
+            )
+        except OSError:
+            # Nobody's listening, so do the work here instead
+            pass
+        except daemon.DaemonError as e:
+            parser.exit(1, f"{parser.prog}: error: {e}\n")
+
+    if lazy and connection is None:
+        # Start on the first files while the rest of the tree is still being walked
+        max_path_length = 0
     else:
-        files.append(path)
+        files = list(files)
+        if shard is not None:
+            files = [file for file, _ in select(stat_sizes(files), shard)]
+        max_path_length = max((len(file) for file in files), default=0)
 
-    max_path_length = max(len(file) for file in files)
+    duplicates = None
+    if not (args["no_dedupe"] or args["debug"] or args["verbose"] or lazy):
+        # Debug and verbose output are printed for every file that's analyzed
+        duplicates = Duplicates()
 
-    def analyze_file(filename):
-        with open(filename, "r") as f:
-            source = f.read()
+    results: Iterable[Result]
+    if stdin_filename is not None:
+        results = exit_on_daemon_error(
+            score_stdin(stdin_filename, options, connection), parser
+        )
+        max_path_length = len(stdin_filename)
+    elif connection is not None:
+        results = exit_on_daemon_error(
+            daemon.analyze_files(
+                connection,
+                files,
+                options.scopes,
+                keep_order,
+                max_file_size=options.max_file_size,
+                skip_generated=options.skip_generated,
+            ),
+            parser,
+        )
+    else:
+        # Unless discovery is lazy, every file is stat'ed and batched up front
+        with profiler.phase("schedule") if profiler else nullcontext():
+            results = analyze_files(
+                files,
+                args["executor"],
+                args["cores"],
+                options,
+                ordered=keep_order,
+                window=args["window"],
+                lazy=lazy,
+                profiler=profiler,
+                duplicates=duplicates,
+            )
 
-            try:
-                abc_vector = calculate_abc(source, args["debug"], args["verbose"])
-            except SyntaxError:
-                return (filename, None, 0.0)
-            else:
-                return (filename, abc_vector, abc_vector.get_magnitude_value())
+    if args["write_baseline"]:
+        from python_abc.baseline import BaselineWriter
 
-    output = Parallel(n_jobs=args["cores"])(
-        delayed(analyze_file)(filename) for filename in files
+        results = BaselineWriter(args["write_baseline"]).record(results)
+
+    if baseline is not None:
+        from python_abc.baseline import compare
+
+        regressions = write_changes(compare(baseline, results), args)
+        if duplicates is not None and duplicates.files:
+            print(duplicates.summary(), file=sys.stderr)
+        if cache is not None:
+            cache.evict()
+        return 1 if regressions else 0
+
+    if profiler is not None:
+        with profiler.phase("aggregate"):
+            write_report(results, args, max_path_length, profiler)
+        write_profile(profiler, args["profile"])
+    else:
+        write_report(results, args, max_path_length)
+
+    if duplicates is not None and duplicates.files:
+        print(duplicates.summary(), file=sys.stderr)
+
+    if cache is not None:
+        cache.evict()
+
+    return 0
+
+
+def write_report(
+    results: Iterable[Result],
+    args: dict,
+    max_path_length: int,
+    profiler: Optional["Profiler"] = None,
+) -> None:
+    """Write each file's result, filtered and ranked as asked, in the format asked for
+
+    With a `profiler`, the time spent waiting for each result and writing it out is counted
+    separately from the time spent ranking it and rolling it up.
+    """
+    rank_scopes = (
+        args["top_scopes"] is not None or args["min_scope_magnitude"] is not None
+    )
+    show_files = (
+        not rank_scopes or args["top"] is not None or args["min_magnitude"] is not None
+    )
+    hold_files = args["sort"] or args["top"] is not None
+
+    file_ranking: Ranking[Result] = Ranking(args["top"], args["min_magnitude"])
+    scope_ranking: Ranking[Tuple[str, Scope]] = Ranking(
+        args["top_scopes"], args["min_scope_magnitude"]
+    )
+
+    rollup: Optional["Rollup"] = None
+    if args["rollup"]:
+        from python_abc.rollup import Rollup
+
+        rollup = Rollup()
+
+    # The writers only flush, since the stream may be one they were handed rather than opened
+    with open_output(args["output"]) as stream:
+        writer: Union[Writer, "TimedWriter"] = make_writer(
+            args["format"], stream, args["scopes"], max_path_length
+        )
+        if profiler is not None:
+            from python_abc.profiling import TimedWriter
+
+            results = profiler.iterate(results, "wait")
+            writer = TimedWriter(writer, profiler)
+        for result in results:
+            if rollup is not None:
+                rollup.add(result)
+
+            if rank_scopes and result.scope is not None:
+                for depth, scope in result.scope.walk():
+                    if depth:
+                        score = scope.inclusive.get_magnitude_squared()
+                        scope_ranking.add(score, (result.path, scope))
+
+            if show_files:
+                vector = result.vector
+                score = 0 if vector is None else vector.get_magnitude_squared()
+                if hold_files:
+                    file_ranking.add(score, result)
+                elif file_ranking.accepts(score):
+                    writer.write_file(result)
+
+        for result in file_ranking:
+            writer.write_file(result)
+
+        if rank_scopes:
+            writer.write_scopes(list(scope_ranking))
+
+        if rollup is not None:
+            writer.write_rollups(rollup.finish())
+
+        writer.close()
+
+
+def write_profile(profiler: "Profiler", format: str) -> None:
+    import json
+
+    from python_abc.profiling import format_report
+
+    report = profiler.report()
+    if format == "json":
+        sys.stderr.write(json.dumps(report, indent=2) + "\n")
+    else:
+        sys.stderr.write(format_report(report))
+
+
+def render(session: "Session", args: dict, changes: "Changes", elapsed: float):
+    if sys.stdout.isatty() and args["output"] is None:
+        # Redraw the report in place
+        sys.stdout.write("\033[2J\033[H")
+        sys.stdout.flush()
+    results = list(session.results.values())
+    write_report(results, args, max((len(r.path) for r in results), default=0))
+    print(
+        f"{len(changes.added)} added, {len(changes.modified)} changed and "
+        f"{len(changes.deleted)} removed in {elapsed:.2f}s, watching for changes",
+        file=sys.stderr,
     )
 
-    if args["sort"] is True:
-        output.sort(key=lambda x: x[2], reverse=True)
 
-    for filename, vector, _ in output:
-        if vector is None:
-            print(f"{filename:<{max_path_length}} {'Unable to parse AST':>26}")
+def read_and_close(stream: io.BufferedIOBase) -> Iterator[str]:
+    """Yield each path in a list of them, closing the file it came from once it's been read"""
+    with stream:
+        yield from read_file_list(stream)
+
+
+def score_stdin(
+    name: str, options: Options, connection: Optional["socket.socket"] = None
+) -> Iterator[Result]:
+    """Yield the result for the source on stdin, scored by the daemon if we're connected"""
+    source = sys.stdin.buffer.read()
+    if connection is None:
+        yield expand(to_compact(name, analyze_source(source, options), None, options))
+        return
+
+    from importlib.util import decode_source
+
+    from python_abc import daemon
+
+    try:
+        # The daemon is sent text, so decode it the way the interpreter would
+        text = decode_source(source)
+    except (SyntaxError, UnicodeDecodeError) as e:
+        yield Result(name, None, error=describe_error(e))
+        return
+    yield daemon.score_source(connection, text, name, options.scopes)
+
+
+def exit_on_daemon_error(
+    results: Iterable[Result], parser: argparse.ArgumentParser
+) -> Iterator[Result]:
+    from python_abc.daemon import DaemonError
+
+    try:
+        yield from results
+    except DaemonError as e:
+        parser.exit(1, f"{parser.prog}: error: {e}\n")
+
+
+def write_changes(changes: Iterable["Change"], args: dict) -> int:
+    """Write each change in the format asked for, returning how many made things worse"""
+    from python_abc.baseline import is_regression
+
+    with open_output(args["output"]) as stream:
+        output = make_writer(args["format"], stream)
+        regressions = 0
+        if args["sort"] or args["top"] is not None:
+            ranking: Ranking["Change"] = Ranking(args["top"])
+            for change in changes:
+                regressions += is_regression(change)
+                ranking.add(change.get_score_change(), change)
+            for change in ranking:
+                output.write_change(change)
         else:
-            print(f"{filename:<{max_path_length}} {vector.magnitude:>26}")
+            for change in changes:
+                regressions += is_regression(change)
+                output.write_change(change)
+        output.close()
+    return regressions
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
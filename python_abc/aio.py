@@ -0,0 +1,242 @@
+import asyncio
+import os
+import weakref
+from concurrent.futures import Executor
+from contextlib import ExitStack
+from typing import (
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    MutableMapping,
+    Optional,
+    Set,
+    Union,
+)
+
+from python_abc.analyze import analyze_file as analyze_one_file
+from python_abc.analyze import (
+    LAZY_BATCH_BYTES,
+    LAZY_BATCH_FILES,
+    Compact,
+    Options,
+    Result,
+    analyze_batch,
+    analyze_source,
+    expand,
+    to_compact,
+)
+from python_abc.discover import DEFAULT_EXCLUDES, DEFAULT_INCLUDES, discover
+from python_abc.executor import AnyExecutor, Finished, get_executor
+from python_abc.schedule import Batch, iter_batches
+
+
+def analyze_named_source(name: str, source: str, options: Options) -> Compact:
+    return to_compact(name, analyze_source(source, options), None, options)
+
+
+class AsyncAnalyzer:
+    """Scores sources and files from asyncio code without blocking the event loop
+
+    The parsing happens on `executor`, which by default is joblib's process pool. That pool is
+    started on first use and kept for the life of the process, so it's shared by every
+    `AsyncAnalyzer` and no request pays for starting it again. No more than `limit` tasks from
+    this analyzer are ever waiting on the pool, however many requests are being served at
+    once, so one large request can't queue up work that every other request then waits behind.
+
+    Every coroutine takes a `timeout` in seconds for the whole call. Work that hasn't started
+    when it expires is cancelled, but a file that's already being parsed can't be interrupted,
+    so its worker stays busy until it's done.
+    """
+
+    def __init__(
+        self,
+        executor: Union[str, Executor] = "process",
+        workers: Optional[int] = None,
+        limit: Optional[int] = None,
+        options: Options = Options(),
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.limit = limit or 2 * self.workers
+        self.options = options
+        self._requested = executor
+        self._exit_stack = ExitStack()
+        self._executor: Optional[AnyExecutor] = None
+        self._semaphores: MutableMapping[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+
+    async def __aenter__(self) -> "AsyncAnalyzer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def executor(self) -> AnyExecutor:
+        if self._executor is None:
+            self._executor = self._exit_stack.enter_context(
+                get_executor(self._requested, self.workers)
+            )
+        return self._executor
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to the loop it's first used on
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return semaphore
+
+    def close(self) -> None:
+        """Shut down the executor, if it's one we started that isn't shared"""
+        self._exit_stack.close()
+        self._executor = None
+
+    async def _submit(self, function, *args) -> "asyncio.Future":
+        """Wait for room under the limit, then start `function` on the executor"""
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphore
+        await semaphore.acquire()
+        try:
+            future = self.executor.submit(function, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_) -> None:
+            # Only once the executor is done with the task, which may be after a caller
+            # that timed out has stopped waiting for it
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # The loop has already been closed
+                pass
+
+        future.add_done_callback(release)
+        if not isinstance(future, Finished):
+            return asyncio.wrap_future(future)
+
+        # The serial executor has already run the task, so there's only the outcome to pass on
+        wrapped = loop.create_future()
+        error = future.exception()
+        if error is None:
+            wrapped.set_result(future.result())
+        else:
+            wrapped.set_exception(error)
+        return wrapped
+
+    async def _run(self, function, *args, timeout: Optional[float] = None):
+        async def run():
+            return await (await self._submit(function, *args))
+
+        return await asyncio.wait_for(run(), timeout)
+
+    async def score_source(
+        self, source: str, name: str = "<string>", timeout: Optional[float] = None
+    ) -> Result:
+        """Score a string of source code"""
+        compact = await self._run(
+            analyze_named_source, name, source, self.options, timeout=timeout
+        )
+        return expand(compact)
+
+    async def analyze_file(self, path: str, timeout: Optional[float] = None) -> Result:
+        compact = await self._run(analyze_one_file, path, self.options, timeout=timeout)
+        return expand(compact)
+
+    async def analyze_paths(
+        self,
+        paths: Iterable[str],
+        timeout: Optional[float] = None,
+        include: Iterable[str] = DEFAULT_INCLUDES,
+        exclude: Iterable[str] = DEFAULT_EXCLUDES,
+        options: Optional[Options] = None,
+    ) -> AsyncIterator[Result]:
+        """Find the Python files under `paths` and yield a result for each as it's ready
+
+        Results come back in the order they finish. `options` overrides the analyzer's own
+        for just this call. Files are found on a thread and sent to
+        the executor in batches, and no more than `limit` batches are started ahead of
+        whatever is consuming the results. If the consumer stops early, for example by
+        closing the iterator with `contextlib.aclosing`, any work that hasn't started is
+        cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        def remaining() -> Optional[float]:
+            if deadline is None:
+                return None
+            left = deadline - loop.time()
+            if left <= 0:
+                raise asyncio.TimeoutError
+            return left
+
+        if options is None:
+            options = self.options
+        files = discover(list(paths), include=include, exclude=exclude)
+        batches = iter_batches(files, LAZY_BATCH_BYTES, LAZY_BATCH_FILES)
+        pending: Set[asyncio.Future] = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.limit:
+                    batch = await asyncio.wait_for(
+                        asyncio.to_thread(next_or_none, batches), remaining()
+                    )
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        pending.add(
+                            await asyncio.wait_for(
+                                self._submit(analyze_batch, batch, options),
+                                remaining(),
+                            )
+                        )
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError
+                for future in done:
+                    for compact in future.result():
+                        yield expand(compact)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def next_or_none(iterator: Iterator[Batch]) -> Optional[Batch]:
+    return next(iterator, None)
+
+
+_shared: Optional[AsyncAnalyzer] = None
+
+
+def shared_analyzer() -> AsyncAnalyzer:
+    """The analyzer behind the functions below, on joblib's process pool"""
+    global _shared
+    if _shared is None:
+        _shared = AsyncAnalyzer()
+    return _shared
+
+
+async def score_source(
+    source: str, name: str = "<string>", timeout: Optional[float] = None
+) -> Result:
+    return await shared_analyzer().score_source(source, name, timeout)
+
+
+async def analyze_file(path: str, timeout: Optional[float] = None) -> Result:
+    return await shared_analyzer().analyze_file(path, timeout)
+
+
+def analyze_paths(
+    paths: Iterable[str], timeout: Optional[float] = None
+) -> AsyncIterator[Result]:
+    return shared_analyzer().analyze_paths(paths, timeout)
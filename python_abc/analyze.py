@@ -0,0 +1,408 @@
+import ast
+import os
+from functools import partial
+from importlib.util import decode_source
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from python_abc import archive
+from python_abc.calculate import calculate_abc, count_abc, count_abc_by_scope
+from python_abc.discover import DEFAULT_EXCLUDES, DEFAULT_INCLUDES, discover
+from python_abc.executor import check_executor, choose_executor, get_executor
+from python_abc.schedule import Batch, iter_batches, plan_batches, stat_sizes
+from python_abc.scope import Scope
+from python_abc.stream import prefetch, stream
+from python_abc.vector import Vector
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from python_abc.baseline import Baseline
+    from python_abc.cache import ResultCache
+    from python_abc.dedupe import Duplicates
+    from python_abc.profiling import Profiler
+
+
+# Parsing needs many times a file's size in memory, so very large files, which are almost
+# always generated, are skipped by default
+DEFAULT_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+# A file is taken to be generated if one of these appears near the top
+GENERATED_MARKERS = (
+    b"@generated",
+    b"DO NOT EDIT",
+    b"Generated by the protocol buffer compiler",
+)
+GENERATED_HEAD_BYTES = 2048
+
+
+# Every `FileSkipped` message starts with this, so that a result says whether it was skipped
+SKIPPED = "skipped, "
+
+
+class FileSkipped(Exception):
+    """Raised instead of analyzing a file that the options say should be left out"""
+
+
+class Options(NamedTuple):
+    """Everything a worker needs to know to analyze a file the way it was asked to"""
+
+    debug: bool = False
+    verbose: bool = False
+    scopes: bool = False
+    cache: Optional["ResultCache"] = None
+    # Results are reused from the baseline for files whose contents haven't changed
+    baseline: Optional["Baseline"] = None
+    # Send back a digest of each file's contents, to be written to a baseline
+    digests: bool = False
+    # Files bigger than this many bytes are skipped rather than parsed, unless it's 0
+    max_file_size: int = DEFAULT_MAX_FILE_SIZE
+    # Skip files that say they were generated, like protobuf modules
+    skip_generated: bool = False
+
+
+class Result(NamedTuple):
+    """The outcome of analyzing one file
+
+    `vector` is `None` if the file couldn't be read or parsed, and `error` says why. `scope`
+    is only filled in if the per-scope breakdown was asked for, and `digest` if the file's
+    contents had to be read in binary.
+    """
+
+    path: str
+    vector: Optional[Vector]
+    scope: Optional[Scope] = None
+    error: Optional[str] = None
+    digest: Optional[str] = None
+
+
+# Without knowing how much there is to do up front, keep batches small enough that the first
+# few can't swallow a whole small tree and leave the other cores idle
+LAZY_BATCH_BYTES = 32 * 1024
+LAZY_BATCH_FILES = 32
+
+# What workers send back: plain tuples and lists are much cheaper to pickle than `Vector` and
+# `Scope` objects
+Compact = Tuple[str, Optional[List[int]], Optional[list], Optional[str], Optional[str]]
+
+
+def describe_error(error: Exception) -> str:
+    if isinstance(error, SyntaxError):
+        return f"{error.msg} (line {error.lineno})"
+    if isinstance(error, (FileSkipped, archive.ArchiveError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def is_parse_error(error: str) -> bool:
+    """Whether an error was described by `describe_error` as a `SyntaxError`"""
+    message, _, line = error.rpartition(" (line ")
+    return bool(message) and (line[:-1].isdigit() or line == "None)")
+
+
+def is_skipped(result: "Result") -> bool:
+    """Whether a file was left out on purpose, rather than failing to be read or parsed"""
+    return result.vector is None and (result.error or "").startswith(SKIPPED)
+
+
+def analyze_source(source: Union[str, bytes], options: Options) -> dict:
+    """Returns the payload that we store in the cache
+
+    Source that's still in bytes is decoded by the parser the same way the interpreter would,
+    following any PEP 263 encoding declaration, without making a copy of it as a `str`.
+    """
+    try:
+        return analyze_tree(ast.parse(source), source, options)
+    except (SyntaxError, ValueError) as e:
+        # `ValueError` is raised for source containing null bytes
+        return {"error": describe_error(e)}
+
+
+def analyze_tree(tree: ast.AST, source: Union[str, bytes], options: Options) -> dict:
+    text = None
+    if options.debug or options.verbose:
+        # Printing the annotated source needs it as text
+        text = decode_source(source) if isinstance(source, bytes) else source
+    if options.scopes:
+        module = count_abc_by_scope(tree)
+        if text is not None:
+            calculate_abc(text, options.debug, options.verbose)
+        abc_vector, scopes = module.inclusive, module.to_list()
+    elif text is not None:
+        abc_vector, scopes = calculate_abc(text, options.debug, options.verbose), None
+    else:
+        abc_vector, scopes = Vector(*count_abc(tree)), None
+    return {
+        "vector": [abc_vector.assignment, abc_vector.branch, abc_vector.condition],
+        "scopes": scopes,
+    }
+
+
+def analyze_file(
+    filename: str, options: Options, data: Optional[bytes] = None
+) -> Compact:
+    if data is None and archive.split(filename) is not None:
+        return analyze_batch([filename], options)[0]
+
+    try:
+        payload, digest = load_payload(filename, options, data)
+    except (OSError, FileSkipped) as e:
+        return (filename, None, None, describe_error(e), None)
+
+    return to_compact(filename, payload, digest, options)
+
+
+def to_compact(
+    filename: str, payload: dict, digest: Optional[str], options: Options
+) -> Compact:
+    if "error" in payload:
+        return (filename, None, None, payload["error"], digest)
+
+    scopes = payload["scopes"] if options.scopes else None
+    return (filename, payload["vector"], scopes, None, digest)
+
+
+def is_complete(payload: dict, options: Options) -> bool:
+    # A run that didn't ask for the breakdown will have stored the payload without it
+    return not options.scopes or payload.get("scopes", ()) is not None
+
+
+def check_size(size: int, options: Options) -> None:
+    if options.max_file_size and size > options.max_file_size:
+        raise FileSkipped(
+            f"{SKIPPED}{size:,} bytes is over the limit of {options.max_file_size:,}"
+        )
+
+
+def is_generated(data: bytes) -> bool:
+    head = data[:GENERATED_HEAD_BYTES]
+    return any(marker in head for marker in GENERATED_MARKERS)
+
+
+def check_generated(generated: bool, options: Options) -> None:
+    if generated and options.skip_generated:
+        raise FileSkipped(f"{SKIPPED}the file is marked as generated")
+
+
+def read_source(filename: str, options: Options) -> bytes:
+    """The contents of a file, as long as it isn't too big
+
+    The file is read unbuffered, straight into a single `bytes` of the size the file says it
+    is. Mapping it into memory instead wouldn't save anything, since the parser needs a
+    `bytes` of its own.
+    """
+    with open(filename, "rb", buffering=0) as f:
+        check_size(os.fstat(f.fileno()).st_size, options)
+        data = f.readall()
+    # The file may have grown since
+    check_size(len(data), options)
+    return data
+
+
+def load_payload(
+    filename: str, options: Options, data: Optional[bytes] = None
+) -> Tuple[dict, Optional[str]]:
+    """The payload for a file, and the digest of its contents if we have it
+
+    `data` is the contents of an archive member, which have already been read. Raises
+    `FileSkipped` if the options say the file should be left out.
+    """
+    cache, baseline = options.cache, options.baseline
+    if cache is None and baseline is None and not options.digests:
+        if data is None:
+            data = read_source(filename, options)
+        check_generated(is_generated(data), options)
+        return analyze_source(data, options), None
+
+    # Only needed with a cache, so only looked up with one
+    stat: Optional[os.stat_result] = None
+    if cache is not None:
+        stat = archive.stat(filename)
+        if data is None:
+            check_size(stat.st_size, options)
+        digest = cache.get_digest_by_stat(filename, stat)
+        if digest is not None:
+            found, payload = cache.get(digest)
+            if found and is_complete(payload, options):
+                check_generated(payload.get("generated", False), options)
+                return payload, digest
+
+    if data is None:
+        data = read_source(filename, options)
+    generated = is_generated(data)
+    check_generated(generated, options)
+    from python_abc.cache import content_digest
+
+    digest = content_digest(data)
+    if cache is not None:
+        assert stat is not None
+        found, payload = cache.get_by_digest(filename, stat, digest)
+        if found and is_complete(payload, options):
+            return payload, digest
+
+    payload = None
+    if baseline is not None:
+        payload = baseline.reuse(filename, digest)
+    if payload is None or not is_complete(payload, options):
+        payload = analyze_source(data, options)
+    if cache is not None:
+        assert stat is not None
+        # So that a later run that skips generated files can do so from the cache
+        cache.put(filename, stat, digest, {**payload, "generated": generated})
+    return payload, digest
+
+
+def analyze_batch(filenames: List[str], options: Options) -> List[Compact]:
+    members = archive.read_members(filenames, partial(check_size, options=options))
+    compacts: List[Compact] = []
+    for filename in filenames:
+        data = members.get(filename)
+        if isinstance(data, Exception):
+            compacts.append((filename, None, None, describe_error(data), None))
+        else:
+            compacts.append(analyze_file(filename, options, data))
+    return compacts
+
+
+def expand(compact: Compact) -> Result:
+    """Turn what a worker sent back into a result"""
+    filename, counts, scopes, error, digest = compact
+    if counts is None:
+        return Result(filename, None, error=error, digest=digest)
+
+    assignment, branch, condition = counts
+    vector = Vector(assignment, branch, condition)
+    module = None if scopes is None else Scope.from_list(scopes)
+    return Result(filename, vector, module, digest=digest)
+
+
+def pack(result: Result) -> Compact:
+    """The inverse of `expand`, for sending a result on to somewhere else"""
+    vector, scope = result.vector, result.scope
+    counts = None
+    if vector is not None:
+        counts = [vector.assignment, vector.branch, vector.condition]
+    scopes = None if scope is None else scope.to_list()
+    return (result.path, counts, scopes, result.error, result.digest)
+
+
+def analyze_files(
+    files: Iterable[str],
+    executor: Union[str, "Executor"] = "auto",
+    workers: Optional[int] = None,
+    options: Options = Options(),
+    ordered: bool = True,
+    window: Optional[int] = None,
+    lazy: bool = False,
+    profiler: Optional["Profiler"] = None,
+    duplicates: Optional["Duplicates"] = None,
+) -> Iterator[Result]:
+    """Analyze each of `files` on `executor`, lazily yielding a result for each
+
+    `executor` is one of `serial`, `thread` or `process`, or an `Executor` to use instead, and
+    `workers` is how many threads or processes to use, defaulting to one per core. `auto`
+    picks one of those by how much source there is, so a few small files are analyzed in this
+    process without waiting for a pool to start. Files are sent to the workers in batches and
+    no more than `window` batches are ever in flight or waiting to be yielded, so the work
+    only ever gets a little ahead of the caller. With `ordered` the results come back in the
+    same order as `files`, and otherwise as soon as each is ready with the largest files
+    started first.
+
+    Normally every file is stat'ed before any is analyzed so that the work can be balanced,
+    but with `lazy` the first files are started while `files` is still being consumed.
+
+    With a `profiler` every file is timed as it's analyzed, skipping the cache and baseline.
+
+    With `duplicates`, a file with the same contents as one before it isn't analyzed again,
+    but is given a copy of that file's result, and `duplicates` counts how many were. Files
+    that are found lazily are never checked for duplicates.
+
+    Closing the generator, or just abandoning it, cancels any work that hasn't started.
+    """
+    check_executor(executor)
+    workers = workers or os.cpu_count() or 1
+
+    window = window or 4 * workers
+
+    batches: Iterable[Batch]
+    if lazy:
+        # Only read ahead as far as the window, so that a caller who stops early hasn't
+        # paid for discovering everything else
+        batches = prefetch(
+            iter_batches(files, LAZY_BATCH_BYTES, LAZY_BATCH_FILES), window
+        )
+    else:
+        sized = stat_sizes(files)
+        if duplicates is not None:
+            sized = duplicates.find(sized)
+        if executor == "auto":
+            total_bytes = sum(size for _, size in sized)
+            executor = choose_executor(workers, len(sized), total_bytes)
+        batches = plan_batches(sized, workers, ordered)
+
+    results = _analyze_batches(
+        batches, executor, workers, options, ordered, window, profiler
+    )
+    if duplicates is not None and not lazy:
+        return duplicates.expand(results, ordered)
+    return results
+
+
+def _analyze_batches(
+    batches: Iterable[Batch],
+    executor: Union[str, "Executor"],
+    workers: int,
+    options: Options,
+    ordered: bool,
+    window: int,
+    profiler: Optional["Profiler"] = None,
+) -> Iterator[Result]:
+    with get_executor(executor, workers) as pool:
+        if profiler is not None:
+            yield from profiler.analyze_batches(pool, batches, options, ordered, window)
+            return
+
+        for batch in stream(
+            pool,
+            partial(analyze_batch, options=options),
+            batches,
+            ordered=ordered,
+            window=window,
+        ):
+            for compact in batch:
+                yield expand(compact)
+
+
+def analyze_paths(
+    paths: Iterable[str],
+    executor: Union[str, "Executor"] = "auto",
+    workers: Optional[int] = None,
+    options: Options = Options(),
+    ordered: bool = True,
+    window: Optional[int] = None,
+    include: Iterable[str] = DEFAULT_INCLUDES,
+    exclude: Iterable[str] = DEFAULT_EXCLUDES,
+    gitignore: bool = False,
+    follow_symlinks: bool = False,
+) -> Iterator[Result]:
+    """Find the Python files under `paths` and lazily yield a result for each
+
+    Files are found the same way as `discover` finds them, and are analyzed as they're found,
+    as `analyze_files` does with `lazy`.
+    """
+    files = discover(
+        list(paths),
+        include=include,
+        exclude=exclude,
+        gitignore=gitignore,
+        follow_symlinks=follow_symlinks,
+    )
+    return analyze_files(files, executor, workers, options, ordered, window, lazy=True)
@@ -0,0 +1,292 @@
+import argparse
+import ast
+import math
+import sys
+from html import escape
+from importlib.util import decode_source
+from typing import IO, Iterator, List, NamedTuple, Optional, Union
+
+from python_abc import calculate, scope
+
+FORMATS = ("text", "html")
+
+# A line with more marks than this shows its counts as numbers instead, so that one busy line
+# can't push every other line across the screen
+MAX_MARKS = 12
+
+HEAT_LEVELS = 10
+
+# Lines are written out this many at a time
+CHUNK_LINES = 1024
+
+
+class Section(NamedTuple):
+    """A class or function, and the lines it spans"""
+
+    qualname: str
+    kind: str
+    start: int
+    end: int
+
+
+# Classes and functions are statements, so they can only be found in these
+BLOCK_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+def sections(tree: ast.AST) -> List[Section]:
+    """Every class and function in the tree, outermost first where two start together
+
+    Only blocks of statements are searched, rather than every node in the tree.
+    """
+    found = []
+    stack = [("", "", tree)]
+    while stack:
+        prefix, kind, node = stack.pop()
+        if isinstance(node, scope.SCOPE_NODES):
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            elif kind == "class":
+                kind = "method"
+            else:
+                kind = "function"
+            qualname = f"{prefix}{node.name}"
+            found.append(Section(qualname, kind, node.lineno, node.end_lineno or 0))
+            prefix = f"{qualname}."
+        for field in BLOCK_FIELDS:
+            block = getattr(node, field, None)
+            if isinstance(block, list):
+                stack.extend((prefix, kind, child) for child in block)
+    found.sort(key=lambda section: (section.start, -section.end))
+    return found
+
+
+def marks(a: int, b: int, c: int) -> str:
+    if a + b + c > MAX_MARKS:
+        return " ".join(
+            f"{count}{letter}" for count, letter in zip((a, b, c), "abc") if count
+        )
+    return "a" * a + "b" * b + "c" * c
+
+
+def line_keys(counts: "calculate.LineCounts") -> "Iterator[calculate.Counts]":
+    # Line 0 doesn't exist
+    keys = zip(*counts)
+    next(keys)
+    return keys
+
+
+def render_text(out: IO[str], lines: List[str], counts: "calculate.LineCounts") -> None:
+    """Write each line of source after the marks for what it counted towards
+
+    Most lines count towards nothing, and the rest mostly repeat the same few counts, so the
+    prefix for each distinct `(A, B, C)` is only built once.
+    """
+    decorations = {key: marks(*key) for key in set(line_keys(counts))}
+    width = max(map(len, decorations.values()), default=0)
+    prefixes = {key: f"{marks:<{width}} | " for key, marks in decorations.items()}
+
+    chunk: List[str] = []
+    for key, line in zip(line_keys(counts), lines):
+        chunk += (prefixes[key], line, "\n")
+        if len(chunk) >= 3 * CHUNK_LINES:
+            out.writelines(chunk)
+            chunk.clear()
+    out.writelines(chunk)
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1em; }}
+.source {{ font-family: monospace; line-height: 1.3; }}
+.source div {{ white-space: pre; min-height: 1.3em; }}
+details {{ border-left: 2px solid #ccc; margin-left: -2px; }}
+summary {{ font-family: sans-serif; cursor: pointer; background: #f4f4f4; }}
+.n {{ display: inline-block; width: {number_width}ch; padding-right: 1ch; color: #999;
+      text-align: right; user-select: none; text-decoration: none; }}
+.d {{ display: inline-block; width: {marks_width}ch; padding-right: 1ch; color: #555;
+      user-select: none; }}
+.v {{ color: #555; }}
+{heat}
+</style>
+</head>
+<body>
+<h1>{heading}</h1>
+<div class="source">
+"""
+
+HTML_TAIL = """</div>
+</body>
+</html>
+"""
+
+
+def heat_styles() -> str:
+    rules = []
+    for level in range(1, HEAT_LEVELS):
+        # From pale yellow to deep red
+        lightness = 92 - level * 5
+        hue = 55 - level * 6
+        rules.append(f".h{level} {{ background: hsl({hue}, 100%, {lightness}%); }}")
+    return "\n".join(rules)
+
+
+def heat(magnitude: float, hottest: float) -> int:
+    if not magnitude or not hottest:
+        return 0
+    return max(1, math.ceil((HEAT_LEVELS - 1) * magnitude / hottest))
+
+
+def describe(a: int, b: int, c: int) -> str:
+    magnitude = math.sqrt(a * a + b * b + c * c)
+    return f"&lt;{a}, {b}, {c}&gt; ({magnitude:.1f})"
+
+
+def render_html(
+    out: IO[str],
+    path: str,
+    lines: List[str],
+    counts: "calculate.LineCounts",
+    spans: List[Section],
+) -> None:
+    """Write the source as a self-contained page
+
+    Each line is shaded by its magnitude relative to the busiest line, and each class and
+    function can be folded away under a summary of its own vector.
+    """
+    assignments, branches, conditions = counts
+    distinct = set(line_keys(counts))
+    magnitudes = {key: math.sqrt(sum(n * n for n in key)) for key in distinct}
+    hottest = max(magnitudes.values(), default=0)
+    decorations = {key: escape(marks(*key)) for key in distinct}
+    # Everything before the line number, and between it and the line itself
+    openings = {
+        key: f'<div class="h{heat(magnitudes[key], hottest)}">' for key in distinct
+    }
+    middles = {
+        key: f'</a><span class="d">{decorations[key]}</span>' for key in distinct
+    }
+
+    total = tuple(sum(counts[i]) for i in range(3))
+    out.write(
+        HTML_HEAD.format(
+            title=escape(path),
+            heading=f'{escape(path)} <span class="v">{describe(*total)}</span>',
+            number_width=len(str(len(lines))),
+            marks_width=max(map(len, decorations.values()), default=0),
+            heat=heat_styles(),
+        )
+    )
+
+    span_totals = [
+        (
+            sum(assignments[span.start : span.end + 1]),
+            sum(branches[span.start : span.end + 1]),
+            sum(conditions[span.start : span.end + 1]),
+        )
+        for span in spans
+    ]
+    hottest_span = max(
+        (math.sqrt(sum(n * n for n in t)) for t in span_totals), default=0
+    )
+    pending = iter(zip(spans, span_totals))
+    following = next(pending, None)
+    # The last line of each section that's open
+    open_ends: List[int] = []
+
+    chunk: List[str] = []
+    for lineno, (key, line) in enumerate(zip(line_keys(counts), lines), start=1):
+        while following is not None and following[0].start == lineno:
+            span, span_total = following
+            level = heat(math.sqrt(sum(n * n for n in span_total)), hottest_span)
+            chunk.append(
+                f'<details open><summary class="h{level}">{span.kind} '
+                f'{escape(span.qualname)} <span class="v">{describe(*span_total)}'
+                "</span></summary>\n"
+            )
+            open_ends.append(span.end)
+            following = next(pending, None)
+
+        chunk += (
+            openings[key],
+            f'<a class="n" id="L{lineno}" href="#L{lineno}">{lineno}',
+            middles[key],
+            escape(line, quote=False),
+            "</div>\n",
+        )
+
+        while open_ends and open_ends[-1] <= lineno:
+            open_ends.pop()
+            chunk.append("</details>\n")
+        if len(chunk) >= 5 * CHUNK_LINES:
+            out.writelines(chunk)
+            chunk.clear()
+
+    chunk += ["</details>\n"] * len(open_ends)
+    out.writelines(chunk)
+    out.write(HTML_TAIL)
+
+
+def annotate(
+    source: Union[str, bytes], out: IO[str], format: str = "text", path: str = ""
+) -> None:
+    """Parse `source` and write it annotated with what each line counted towards
+
+    Source that's still in bytes is decoded the way the interpreter would decode it.
+    """
+    tree = ast.parse(source)
+    if isinstance(source, bytes):
+        source = decode_source(source)
+    lines = source.split("\n")
+    counts = calculate.count_abc_by_line(tree, len(lines))
+    if format == "html":
+        render_html(out, path, lines, counts, sections(tree))
+    else:
+        render_text(out, lines, counts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python-abc-annotate",
+        description="Show what every line of a Python file counts towards its ABC score",
+    )
+    parser.add_argument("path", type=str, help="the file to annotate")
+    parser.add_argument(
+        "--format",
+        dest="format",
+        choices=FORMATS,
+        default="text",
+        help="write the source as marked-up text or as a self-contained HTML page",
+    )
+    parser.add_argument(
+        "--output",
+        dest="output",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="write to this file instead of stdout",
+    )
+    args = vars(parser.parse_args(argv))
+
+    from python_abc.output import open_output
+
+    try:
+        with open(args["path"], "rb") as f:
+            source = f.read()
+        out = open_output(args["output"])
+        try:
+            annotate(source, out, args["format"], args["path"])
+        finally:
+            out.close()
+    except OSError as e:
+        parser.exit(1, f"{e}\n")
+    except SyntaxError as e:
+        parser.exit(1, f"{args['path']}: {e.msg} (line {e.lineno})\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
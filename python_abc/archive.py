@@ -0,0 +1,224 @@
+import os
+from functools import lru_cache
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Pattern,
+    Tuple,
+    Type,
+    Union,
+)
+
+# Members are reported as `archive!member`, like Java's jar URLs
+SEPARATOR = "!"
+
+ZIP_SUFFIXES = (".whl", ".zip")
+TAR_SUFFIXES = (".tar.gz", ".tgz")
+SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES
+
+Listing = Dict[str, int]
+
+
+class ArchiveError(Exception):
+    """Raised when an archive can't be opened or read"""
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(SUFFIXES)
+
+
+def join(archive: str, member: str) -> str:
+    return f"{archive}{SEPARATOR}{member}"
+
+
+def split(path: str) -> Optional[Tuple[str, str]]:
+    """The archive and member a path names, or `None` if it's an ordinary file"""
+    index = path.find(SEPARATOR)
+    while index != -1:
+        if is_archive(path[:index]):
+            return path[:index], path[index + 1 :]
+        index = path.find(SEPARATOR, index + 1)
+    return None
+
+
+def read_errors() -> Tuple[Type[Exception], ...]:
+    """Everything that can go wrong reading a corrupt or truncated archive"""
+    # Only imported once there's an archive to read, like the modules that do the reading
+    import tarfile
+    import zipfile
+    import zlib
+
+    return (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError, zlib.error)
+
+
+def list_members(archive: str) -> Listing:
+    """The size of every regular file in the archive, by name
+
+    A tarball has no index, so listing it means decompressing all of it.
+    """
+    import tarfile
+    import zipfile
+
+    try:
+        if archive.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(archive) as z:
+                return {
+                    info.filename: info.file_size
+                    for info in z.infolist()
+                    if not info.is_dir()
+                }
+        with tarfile.open(archive, "r|*") as tar:
+            return {info.name: info.size for info in tar if info.isfile()}
+    except read_errors() as e:
+        raise ArchiveError(f"can't read {archive}: {e}") from e
+
+
+@lru_cache(maxsize=1024)
+def _cached_listing(archive: str, size: int, mtime_ns: int) -> Listing:
+    return list_members(archive)
+
+
+def cached_listing(archive: str) -> Listing:
+    """`list_members`, remembered for as long as the archive doesn't change
+
+    Discovery and scheduling both need the listing, and would otherwise each read a tarball
+    from end to end.
+    """
+    try:
+        stat = os.stat(archive)
+    except OSError as e:
+        raise ArchiveError(f"can't read {archive}: {e}") from e
+    return _cached_listing(archive, stat.st_size, stat.st_mtime_ns)
+
+
+def stat(path: str) -> os.stat_result:
+    """The stat of a file, or of the archive a member is in, which changes along with it"""
+    parts = split(path)
+    return os.stat(path if parts is None else parts[0])
+
+
+def source_size(path: str) -> int:
+    """The size of a file, or of an archive member once it's decompressed"""
+    parts = split(path)
+    if parts is None:
+        return os.stat(path).st_size
+    archive, member = parts
+    try:
+        return cached_listing(archive)[member]
+    except (ArchiveError, KeyError):
+        return 0
+
+
+def discover_members(
+    archive: str,
+    included: Optional[Pattern[str]] = None,
+    excluded: Optional[Pattern[str]] = None,
+) -> Iterator[str]:
+    """Yield the path of every member of an archive that discovery would have found
+
+    Members are filtered as if the archive were a directory. If the archive can't be read,
+    it's yielded itself, so that the problem is reported like any other.
+    """
+    try:
+        members = sorted(cached_listing(archive))
+    except ArchiveError:
+        yield archive
+        return
+
+    for member in members:
+        if included is not None and not included.fullmatch(member):
+            continue
+        if excluded is not None and is_excluded(excluded, member):
+            continue
+        yield join(archive, member)
+
+
+def is_excluded(excluded: Pattern[str], member: str) -> bool:
+    # As with a directory, excluding a parent excludes everything below it
+    index = member.find("/")
+    while index != -1:
+        if excluded.fullmatch(member[:index]):
+            return True
+        index = member.find("/", index + 1)
+    return bool(excluded.fullmatch(member))
+
+
+def read_members(
+    paths: Iterable[str], check_size: Callable[[int], None]
+) -> Dict[str, Union[bytes, Exception]]:
+    """Read every archive member in `paths`, opening each archive only once
+
+    Each member's size is passed to `check_size` before it's read, which can raise to skip
+    it. Anything that goes wrong is returned in place of the member's contents. Paths that
+    aren't in an archive are left out, except for archives that couldn't be listed.
+    """
+    wanted: Dict[str, Dict[str, str]] = {}
+    for path in paths:
+        parts = split(path)
+        if parts is not None:
+            wanted.setdefault(parts[0], {})[parts[1]] = path
+        elif is_archive(path):
+            wanted.setdefault(path, {})
+
+    found: Dict[str, Union[bytes, Exception]] = {}
+    for archive, members in wanted.items():
+        try:
+            if not members:
+                # Only yielded by discovery when the archive couldn't be listed
+                list_members(archive)
+                raise ArchiveError(f"{archive} is an archive, not a Python file")
+            found.update(read_archive(archive, members, check_size))
+        except ArchiveError as e:
+            found.update((path, e) for path in members.values())
+            if not members:
+                found[archive] = e
+    return found
+
+
+def read_archive(
+    archive: str, members: Dict[str, str], check_size: Callable[[int], None]
+) -> Dict[str, Union[bytes, Exception]]:
+    import tarfile
+    import zipfile
+
+    found: Dict[str, Union[bytes, Exception]] = {}
+
+    def read(member: str, size: int, read_bytes: Callable[[], bytes]) -> None:
+        path = members[member]
+        try:
+            check_size(size)
+        except Exception as e:
+            found[path] = e
+        else:
+            found[path] = read_bytes()
+
+    try:
+        if archive.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(archive) as z:
+                for member in members:
+                    try:
+                        zip_info = z.getinfo(member)
+                    except KeyError:
+                        continue
+                    read(member, zip_info.file_size, lambda: z.read(zip_info))
+        else:
+            # A tarball can only be read from the start, so make one pass over it and stop
+            # as soon as every member has been found
+            with tarfile.open(archive, "r|*") as tar:
+                for tar_info in tar:
+                    if tar_info.name in members and tar_info.isfile():
+                        extracted = tar.extractfile(tar_info)
+                        assert extracted is not None
+                        read(tar_info.name, tar_info.size, extracted.read)
+                        if len(found) == len(members):
+                            break
+    except read_errors() as e:
+        raise ArchiveError(f"can't read {archive}: {e}") from e
+
+    for member, path in members.items():
+        if path not in found:
+            found[path] = ArchiveError(f"{member} isn't in {archive}")
+    return found
@@ -0,0 +1,256 @@
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from python_abc.analyze import Result
+from python_abc.calculate import RULES_VERSION
+from python_abc.git import Change
+from python_abc.scope import Scope
+from python_abc.vector import Vector
+
+# Bump this whenever the layout of the tables below changes
+FORMAT_VERSION = 1
+
+# Like `ResultCache`, workers get a fresh `Baseline` for every task, so connections are kept
+# per process and per thread
+_connections: Dict[Tuple[int, int, str], Tuple[sqlite3.Connection, bool]] = {}
+
+
+class BaselineError(Exception):
+    pass
+
+
+def baseline_key(path: str) -> str:
+    """The same file scanned as `./pkg/a.py` or `pkg/a.py` should find the same entry"""
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def to_payload(result: Result) -> Dict[str, Any]:
+    if result.vector is None:
+        return {"error": result.error}
+    vector = result.vector
+    return {
+        "vector": [vector.assignment, vector.branch, vector.condition],
+        "scopes": None if result.scope is None else result.scope.to_list(),
+    }
+
+
+class Entry(NamedTuple):
+    digest: Optional[str]
+    payload: Dict[str, Any]
+
+    @property
+    def vector(self) -> Optional[Vector]:
+        counts = self.payload.get("vector")
+        return None if counts is None else Vector(*counts)
+
+    @property
+    def scope(self) -> Optional[Scope]:
+        scopes = self.payload.get("scopes")
+        return None if scopes is None else Scope.from_list(scopes)
+
+
+class Baseline:
+    """A snapshot of the vectors of every file and scope, to compare later runs against
+
+    It's an SQLite database with one row per file, so opening it costs the same however many
+    files it holds and each lookup is a single indexed read. It's opened read-only and lazily,
+    and only its path is pickled, so it can be handed to joblib workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._open()[0]
+
+    @property
+    def reusable(self) -> bool:
+        """Whether stored results can stand in for files whose contents haven't changed
+
+        That's only true if they were scored with the same rules.
+        """
+        return self._open()[1]
+
+    def _open(self) -> Tuple[sqlite3.Connection, bool]:
+        key = (os.getpid(), threading.get_ident(), self.path)
+        opened = _connections.get(key)
+        if opened is None:
+            if not os.path.isfile(self.path):
+                raise BaselineError(f"{self.path} does not exist")
+
+            uri = pathlib.Path(self.path).absolute().as_uri() + "?mode=ro"
+            connection = sqlite3.connect(uri, uri=True)
+            try:
+                meta = dict(connection.execute("SELECT key, value FROM meta"))
+            except sqlite3.DatabaseError:
+                connection.close()
+                raise BaselineError(f"{self.path} is not a baseline") from None
+            if meta.get("format") != str(FORMAT_VERSION):
+                connection.close()
+                raise BaselineError(f"{self.path} was written by another version")
+
+            opened = _connections[key] = (
+                connection,
+                meta.get("rules") == str(RULES_VERSION),
+            )
+        return opened
+
+    def open(self) -> "Baseline":
+        """Check the baseline can be read, raising `BaselineError` if not"""
+        self._open()
+        return self
+
+    def close(self) -> None:
+        opened = _connections.pop((os.getpid(), threading.get_ident(), self.path), None)
+        if opened is not None:
+            opened[0].close()
+
+    def get(self, path: str) -> Optional[Entry]:
+        row = self.connection.execute(
+            "SELECT digest, payload FROM files WHERE path = ?", (baseline_key(path),)
+        ).fetchone()
+        if row is None:
+            return None
+        return Entry(row[0], json.loads(row[1]))
+
+    def reuse(self, path: str, digest: str) -> Optional[Dict[str, Any]]:
+        """The stored payload for `path`, if its contents haven't changed since"""
+        entry = self.get(path)
+        if entry is None or not self.reusable or entry.digest != digest:
+            return None
+        return entry.payload
+
+
+class BaselineWriter:
+    """Writes a new baseline alongside the old one, replacing it only once it's complete"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.temporary = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(self.temporary):
+            os.unlink(self.temporary)
+        self.connection = sqlite3.connect(self.temporary)
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute(
+            """CREATE TABLE files (
+                path TEXT PRIMARY KEY,
+                digest TEXT,
+                payload TEXT NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        self.connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [("format", str(FORMAT_VERSION)), ("rules", str(RULES_VERSION))],
+        )
+
+    def add(self, result: Result) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+            (
+                baseline_key(result.path),
+                result.digest,
+                json.dumps(to_payload(result), separators=(",", ":")),
+            ),
+        )
+
+    def record(self, results: Iterable[Result]) -> Iterator[Result]:
+        """Pass `results` through, adding each one to the baseline on the way
+
+        The baseline is only written once every result has been through, and is abandoned if
+        anything goes wrong before then.
+        """
+        try:
+            for result in results:
+                self.add(result)
+                yield result
+        except BaseException:
+            self.abort()
+            raise
+        self.close()
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+        os.replace(self.temporary, self.path)
+
+    def abort(self) -> None:
+        self.connection.close()
+        os.unlink(self.temporary)
+
+
+def scope_changes(path: str, old: Scope, new: Scope) -> Iterator[Change]:
+    """Yield the scopes that are new, or whose magnitude changed
+
+    Scopes are matched by their qualified name, in source order when a name is reused, so that
+    moving a function around the file doesn't count as a change.
+    """
+    old_scopes: Dict[str, List[Scope]] = {}
+    for depth, scope in old.walk():
+        if depth:
+            old_scopes.setdefault(scope.qualname, []).append(scope)
+
+    seen: Dict[str, int] = {}
+    for depth, scope in new.walk():
+        if not depth:
+            continue
+        qualname = scope.qualname
+        index = seen[qualname] = seen.get(qualname, -1) + 1
+        candidates = old_scopes.get(qualname, [])
+        if index >= len(candidates):
+            yield Change(path, "A", None, scope.inclusive, qualname, scope.lineno)
+            continue
+
+        before, after = candidates[index].inclusive, scope.inclusive
+        if before.get_magnitude_squared() != after.get_magnitude_squared():
+            yield Change(path, "M", before, after, qualname, scope.lineno)
+
+
+def compare(baseline: Baseline, results: Iterable[Result]) -> Iterator[Change]:
+    """Yield how each result differs from the baseline
+
+    New files are reported with a status of `A`, and files and scopes whose magnitude went up
+    or down with a status of `M`. Files whose contents haven't changed are skipped without
+    looking any further.
+    """
+    for result in results:
+        entry = baseline.get(result.path)
+        if entry is None:
+            yield Change(result.path, "A", None, result.vector, error=result.error)
+            continue
+        if result.digest is not None and result.digest == entry.digest:
+            continue
+
+        old, new = entry.vector, result.vector
+        change = Change(result.path, "M", old, new, error=result.error)
+        if change.get_score_change() or (old is None) != (new is None):
+            yield change
+
+        old_scope = entry.scope
+        if old_scope is not None and result.scope is not None:
+            yield from scope_changes(result.path, old_scope, result.scope)
+
+
+def is_regression(change: Change) -> bool:
+    """Whether a change made things worse, which includes a file that had a score losing it
+
+    A file that can no longer be parsed, or is now skipped, would otherwise look like it had
+    dropped to nothing.
+    """
+    if change.status != "M":
+        return False
+    return change.get_score_change() > 0 or (
+        change.old is not None and change.new is None
+    )
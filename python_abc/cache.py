@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Optional, Tuple
+
+from python_abc import __version__
+from python_abc.calculate import RULES_VERSION
+
+if TYPE_CHECKING:
+    # Only runs with a cache need sqlite3
+    import sqlite3
+
+# Bump this whenever the layout of the tables below, or of the payloads in them, changes
+SCHEMA_VERSION = 3
+
+# Results from a different release, or from different counting rules, are never valid
+CACHE_KEY = f"{__version__}:{RULES_VERSION}:{SCHEMA_VERSION}"
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 100_000
+
+# joblib unpickles a fresh `ResultCache` for every task it runs, so connections are kept per
+# process rather than per instance to avoid reopening the database for every file. They're
+# kept per thread too, since a connection can only be used on the thread that opened it
+_connections: Dict[Tuple[int, int, str], "sqlite3.Connection"] = {}
+
+
+def content_digest(data: bytes) -> str:
+    import hashlib
+
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """An on-disk cache of analysis results, shared between runs and between worker processes
+
+    Results are stored against a digest of the file contents, so identical files share an
+    entry and a file that is touched without being changed is still a hit. Each path also
+    remembers the size and mtime it had when its digest was last computed, which lets an
+    unchanged file be answered without being read at all.
+
+    SQLite in WAL mode does the locking for us, so any number of processes can read and write
+    the same cache. The connection is opened lazily and is not pickled, so a `ResultCache`
+    can be handed to joblib workers and each will open its own.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, "python-abc-cache.sqlite3")
+
+    def __getstate__(self):
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["max_bytes"])
+
+    @property
+    def connection(self) -> "sqlite3.Connection":
+        key = (os.getpid(), threading.get_ident(), self.path)
+        connection = _connections.get(key)
+        if connection is None:
+            import sqlite3
+
+            os.makedirs(self.directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._prepare(connection)
+            _connections[key] = connection
+        return connection
+
+    @staticmethod
+    def _prepare(connection: "sqlite3.Connection") -> None:
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS paths (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest TEXT NOT NULL
+                )"""
+            )
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    digest TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            row = connection.execute(
+                "SELECT value FROM meta WHERE key = 'cache_key'"
+            ).fetchone()
+            if row is None or row[0] != CACHE_KEY:
+                # Written by another version of python-abc, so none of it can be trusted
+                connection.execute("DELETE FROM paths")
+                connection.execute("DELETE FROM results")
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('cache_key', ?)", (CACHE_KEY,)
+                )
+
+    def close(self) -> None:
+        connection = _connections.pop(
+            (os.getpid(), threading.get_ident(), self.path), None
+        )
+        if connection is not None:
+            connection.close()
+
+    def get(self, digest: str) -> Tuple[bool, Any]:
+        row = self.connection.execute(
+            "SELECT payload FROM results WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return False, None
+
+        self.connection.execute(
+            "UPDATE results SET accessed = ? WHERE digest = ?", (time.time(), digest)
+        )
+        return True, json.loads(row[0])
+
+    def get_digest_by_stat(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """The digest `path` had when it was last read, if its size and mtime still match"""
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, digest FROM paths WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+            return None
+        return row[2]
+
+    def get_by_stat(self, path: str, stat: os.stat_result) -> Tuple[bool, Any]:
+        """Look up `path` without reading it, trusting its size and mtime"""
+        digest = self.get_digest_by_stat(path, stat)
+        if digest is None:
+            return False, None
+
+        return self.get(digest)
+
+    def get_by_digest(
+        self, path: str, stat: os.stat_result, digest: str
+    ) -> Tuple[bool, Any]:
+        """Look up content we have already seen, possibly under a different path or mtime"""
+        found, payload = self.get(digest)
+        if found:
+            self._remember_path(path, stat, digest)
+        return found, payload
+
+    def put(self, path: str, stat: os.stat_result, digest: str, payload: Any) -> None:
+        encoded = json.dumps(payload, separators=(",", ":"))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (digest, encoded, len(encoded), time.time()),
+        )
+        self._remember_path(path, stat, digest)
+
+    def _remember_path(self, path: str, stat: os.stat_result, digest: str) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, digest),
+        )
+
+    def evict(self) -> int:
+        """Drop the least recently used results until the cache fits in `max_bytes`
+
+        Returns the number of results that were removed.
+        """
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            (total,) = connection.execute(
+                "SELECT COALESCE(SUM(nbytes), 0) FROM results"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return 0
+
+            excess = total - self.max_bytes
+            doomed = []
+            for digest, nbytes in connection.execute(
+                "SELECT digest, nbytes FROM results ORDER BY accessed ASC"
+            ):
+                if excess <= 0:
+                    break
+                doomed.append((digest,))
+                excess -= nbytes
+
+            connection.executemany("DELETE FROM results WHERE digest = ?", doomed)
+            connection.execute(
+                "DELETE FROM paths WHERE digest NOT IN (SELECT digest FROM results)"
+            )
+
+        return len(doomed)
+
+
+class MemoryCache:
+    """A least recently used cache of results, for a process that outlives a single run"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        try:
+            value = self.entries[key]
+        except KeyError:
+            return False, None
+        self.entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -1,8 +1,17 @@
 import ast
+import sys
+from array import array
 from functools import singledispatch
-from typing import List, Union
+from typing import Any, Callable, Dict, List, Tuple, Union
 
-from python_abc import vector
+from python_abc import scope, vector, walk
+
+# Bump this whenever a change to the handlers below would change the score of any source, so
+# that results stored by earlier versions are not reused
+RULES_VERSION = 1
+
+Counts = Tuple[int, int, int]
+LineCounts = Tuple[array, array, array]
 
 
 @singledispatch
@@ -40,19 +49,21 @@ def handle_else(
 
 
 # Node classes that do not, of themselves, contribute to any particular count, but may have
-# components that do, and so need to be decomposed
-@calculate_abc_for_node.register
+# components that do, and so need to be decomposed. Each is registered with its class rather
+# than leaving `singledispatch` to read it from the annotation, which goes through
+# `typing.get_type_hints` and would cost more at import than everything else in this module
+@calculate_abc_for_node.register(ast.For)
 def ast_for(node_class: ast.For):
     return [handle_else(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.While)
 def ast_while(node_class: ast.While):
     return [handle_else(node_class)]
 
 
 # Syntax contributing to assignment count
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.Assign)
 def ast_assign(node_class: ast.Assign):
     vectors = []
     for target in node_class.targets:
@@ -66,24 +77,24 @@ def ast_assign(node_class: ast.Assign):
     return vectors
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.AnnAssign)
 def ast_annassign(node_class: ast.AnnAssign):
     return [vector.assignment(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.AugAssign)
 def ast_augassign(node_class: ast.AugAssign):
     return [vector.assignment(node_class)]
 
 
 # Syntax contributing to branch count
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.Call)
 def ast_call(node_class: ast.Call):
     return [vector.branch(node_class)]
 
 
 # Syntax contributing to condition count
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.BoolOp)
 def ast_boolop(node_class: ast.BoolOp):
     return [
         vector.condition(v)
@@ -92,17 +103,17 @@ def ast_boolop(node_class: ast.BoolOp):
     ] or [vector.empty(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.Compare)
 def ast_compare(node_class: ast.Compare):
     return [vector.condition(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.ExceptHandler)
 def ast_excepthandler(node_class: ast.ExceptHandler):
     return [vector.condition(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.If)
 def ast_if(node_class: ast.If):
     if not isinstance(node_class.test, (ast.BoolOp, ast.Compare, ast.Constant)):
         # This is essentially saying `if variable is True`, so we should count it as such
@@ -111,7 +122,7 @@ def ast_if(node_class: ast.If):
         return [handle_else(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.IfExp)
 def ast_ifexp(node_class: ast.IfExp):
     if not isinstance(node_class.test, (ast.BoolOp, ast.Compare, ast.Constant)):
         # This is essentially saying `if variable is True`, so we should count it as such
@@ -120,14 +131,14 @@ def ast_ifexp(node_class: ast.IfExp):
         return [handle_else(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.Try)
 def ast_try(node_class: ast.Try):
     # `except` clauses are handled by `ast_excepthandler`
     # `finalbody` is always executed so no need to count it
     return [handle_else(node_class)]
 
 
-@calculate_abc_for_node.register
+@calculate_abc_for_node.register(ast.Assert)
 def ast_assert(node_class: ast.Assert):
     if isinstance(node_class.test, ast.Name):
         # This is a tacit conditional like `assert a`
@@ -136,51 +147,238 @@ def ast_assert(node_class: ast.Assert):
         return [vector.empty(node_class)]
 
 
+# Counts-only equivalents of the handlers above, which return `(A, B, C)` without allocating
+# a `Vector` for each node. These must always agree with the handlers they stand in for.
+ASSIGNMENT = (1, 0, 0)
+BRANCH = (0, 1, 0)
+CONDITION = (0, 0, 1)
+NOTHING = (0, 0, 0)
+
+
+def count_else(node_class: Union[ast.For, ast.Try, ast.While]) -> Counts:
+    return CONDITION if node_class.orelse else NOTHING
+
+
+def count_assign(node_class: ast.Assign) -> Counts:
+    count = 0
+    for target in node_class.targets:
+        count += len(target.elts) if isinstance(target, ast.Tuple) else 1
+    return (count, 0, 0)
+
+
+def count_assignment(node_class: ast.AST) -> Counts:
+    return ASSIGNMENT
+
+
+def count_branch(node_class: ast.AST) -> Counts:
+    return BRANCH
+
+
+def count_condition(node_class: ast.AST) -> Counts:
+    return CONDITION
+
+
+def count_boolop(node_class: ast.BoolOp) -> Counts:
+    count = 0
+    for v in node_class.values:
+        if not isinstance(v, (ast.BoolOp, ast.Compare)):
+            count += 1
+    return (0, 0, count)
+
+
+def count_if(node_class: Union[ast.If, ast.IfExp]) -> Counts:
+    count = (
+        0 if isinstance(node_class.test, (ast.BoolOp, ast.Compare, ast.Constant)) else 1
+    )
+    if node_class.orelse:
+        count += 1
+    return (0, 0, count)
+
+
+def count_assert(node_class: ast.Assert) -> Counts:
+    return CONDITION if isinstance(node_class.test, ast.Name) else NOTHING
+
+
+COUNTERS_BY_HANDLER = {
+    ast_for: count_else,
+    ast_while: count_else,
+    ast_assign: count_assign,
+    ast_annassign: count_assignment,
+    ast_augassign: count_assignment,
+    ast_call: count_branch,
+    ast_boolop: count_boolop,
+    ast_compare: count_condition,
+    ast_excepthandler: count_condition,
+    ast_if: count_if,
+    ast_ifexp: count_if,
+    ast_try: count_else,
+    ast_assert: count_assert,
+}  # type: Dict[Callable, Callable[[Any], Counts]]
+
+
+def counter_for(handler: Callable) -> Callable[[Any], Counts]:
+    """Find the counts-only equivalent of a handler, falling back to summing its vectors"""
+    if handler in COUNTERS_BY_HANDLER:
+        return COUNTERS_BY_HANDLER[handler]
+
+    def count(node_class: ast.AST) -> Counts:
+        a = b = c = 0
+        for v in handler(node_class):
+            if getattr(v, "lineno", 0):
+                a += v.assignment
+                b += v.branch
+                c += v.condition
+        return (a, b, c)
+
+    return count
+
+
+# Both resolved once, the first time a tree is scored, so that the tree can be traversed
+# without going through `singledispatch` for every node. Any handler registered after that
+# must be followed by a call to `rebuild_handlers`.
+HANDLERS: Dict[type, Callable] = {}
+COUNTERS: Dict[type, Callable[[Any], Counts]] = {}
+
+
+def rebuild_handlers() -> None:
+    HANDLERS.clear()
+    HANDLERS.update(walk.build_table(calculate_abc_for_node, walk.node_types()))
+    COUNTERS.clear()
+    COUNTERS.update((node_type, counter_for(h)) for node_type, h in HANDLERS.items())
+
+
+def handlers() -> Dict[type, Callable]:
+    """The handler for every node type that has one, building the tables on first use"""
+    if not HANDLERS:
+        rebuild_handlers()
+    return HANDLERS
+
+
+def counters() -> Dict[type, Callable[[Any], Counts]]:
+    """The counts-only equivalent of `handlers`"""
+    if not COUNTERS:
+        rebuild_handlers()
+    return COUNTERS
+
+
+def count_abc(tree: ast.AST) -> Counts:
+    """The lean way of scoring a tree, which only ever keeps three integers"""
+    a = b = c = 0
+    for node, counter in walk.walk(tree, counters()):
+        da, db, dc = counter(node)
+        a += da
+        b += db
+        c += dc
+    return (a, b, c)
+
+
+def count_abc_by_line(tree: ast.AST, line_count: int) -> LineCounts:
+    """Score a tree, keeping a count of A, B and C for every line
+
+    Index 0 of each array is unused, so that they can be indexed by line number.
+    """
+    assignments = array("L", [0]) * (line_count + 1)
+    branches = array("L", [0]) * (line_count + 1)
+    conditions = array("L", [0]) * (line_count + 1)
+    for node, handler in walk.walk(tree, handlers()):
+        for v in handler(node):
+            if lineno := getattr(v, "lineno", 0):
+                assignments[lineno] += v.assignment
+                branches[lineno] += v.branch
+                conditions[lineno] += v.condition
+    return (assignments, branches, conditions)
+
+
+def print_debug(tree: ast.AST) -> None:
+    print(ast.dump(tree, indent=4), end="\n\n")
+
+    print_lines = []
+    for node, handler in walk.walk(tree, handlers()):
+        print_lines.append((getattr(node, "lineno", 0), handler(node), node))
+
+    # The tree is walked depth-first from the last child, but for debugging purposes it's much
+    # easier to have the vectors ordered by line number
+    print_lines.sort(key=lambda x: x[0])
+    for lineno, vectors, node in print_lines:
+        if any(vectors):
+            print_line = f"Line {lineno} -> {vectors}"
+            print_node = f"{ast.dump(node, indent=4)}"
+            print(print_line + "\n" + print_node + "\n")
+
+
+def print_annotated(source_split: List[str], counts: LineCounts) -> None:
+    # Imported here since `annotate` needs this module
+    from python_abc import annotate
+
+    annotate.render_text(sys.stdout, source_split, counts)
+
+
+def calculate_abc_counts(source: Union[str, bytes]) -> Counts:
+    """Calculate the `(A, B, C)` counts for some source without building any `Vector`s"""
+    return count_abc(ast.parse(source))
+
+
 def calculate_abc(
     source: str, debug: bool = False, verbose: bool = False
 ) -> vector.Vector:
-    final_vector = vector.Vector(0, 0, 0)
-
-    source_split = source.split("\n")
-    temp = {
-        lineno: {"decoration": ""} for lineno, _ in enumerate(source_split, start=1)
-    }
-
     tree = ast.parse(source)
     if debug:
-        print(ast.dump(tree, indent=4), end="\n\n")
+        print_debug(tree)
 
-    print_lines = []
-    for node in ast.walk(tree):
-        temp_vectors = calculate_abc_for_node(node)
+    if not verbose:
+        return vector.Vector(*count_abc(tree))
 
-        if debug:
-            print_lines.append((getattr(node, "lineno", 0), temp_vectors, node))
+    source_split = source.split("\n")
+    counts = count_abc_by_line(tree, len(source_split))
+    print_annotated(source_split, counts)
 
-        for v in temp_vectors:
-            if lineno := getattr(v, "lineno", 0):
-                final_vector += v
-                temp[lineno]["decoration"] += v.as_notation
+    return vector.Vector(*(sum(line_counts) for line_counts in counts))
 
-    if debug:
-        # ast.walk doesn't have a specific order, but for debugging purposes it's much
-        # easier to have the vectors ordered by line number
-        print_lines.sort(key=lambda x: x[0])
-        for lineno, vectors, node in print_lines:
-            if any(vectors):
-                print_line = f"Line {lineno} -> {vectors}"
-                print_node = f"{ast.dump(node, indent=4)}"
-                print(print_line + "\n" + print_node + "\n")
-
-    if verbose:
-        decoration_length = max(len(line["decoration"]) for line in temp.values())
-        decorated_text = zip(
-            [line["decoration"] for line in temp.values()], source_split
-        )
-        for decoration, line in decorated_text:
-            decoration = "".join(sorted(decoration))
-            print(
-                f"{decoration:<{decoration_length}} | {line:<{88 - decoration_length - 3}}"
-            )
-
-    return final_vector
+
+def calculate_abc_by_scope(source: str) -> scope.Scope:
+    """Calculate the ABC vector for the module and for each class and function within it
+
+    Every vector is attributed to the innermost scope enclosing it during a single pass over
+    the tree, so this costs about the same as `calculate_abc`.
+    """
+    return count_abc_by_scope(ast.parse(source))
+
+
+def count_abc_by_scope(tree: ast.AST) -> scope.Scope:
+    module = scope.module()
+
+    AST = ast.AST
+    get_counter = counters().get
+    child_fields = walk.child_fields
+    stack = [(tree, module)]  # type: List[Tuple[ast.AST, scope.Scope]]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node, current = pop()
+
+        counter = get_counter(type(node))
+        if counter is not None:
+            a, b, c = counter(node)
+            exclusive = current.exclusive
+            exclusive.assignment += a
+            exclusive.branch += b
+            exclusive.condition += c
+
+        if isinstance(node, scope.SCOPE_NODES):
+            child = current.add_child(node)
+            for inside, child_node in scope.body_fields(node):
+                push((child_node, child if inside else current))
+            continue
+
+        for field in child_fields(type(node)):
+            value = getattr(node, field, None)
+            if isinstance(value, AST):
+                push((value, current))
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, AST):
+                        push((item, current))
+
+    module.finalise()
+    return module
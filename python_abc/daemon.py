@@ -0,0 +1,394 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import stat
+import struct
+import tempfile
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from python_abc import archive
+from python_abc.analyze import DEFAULT_MAX_FILE_SIZE, Options, Result, expand, pack
+from python_abc.cache import DEFAULT_MAX_ENTRIES, MemoryCache, content_digest
+
+
+class DaemonError(Exception):
+    pass
+
+
+def default_socket_path() -> str:
+    """Where the daemon listens unless told otherwise, in a directory only we can get into
+
+    That's `$XDG_RUNTIME_DIR`, which is already private, or else a directory of our own in the
+    shared temporary directory, which `Daemon.serve` creates.
+    """
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if not directory:
+        directory = os.path.join(tempfile.gettempdir(), f"python-abc-{os.getuid()}")
+    return os.path.join(directory, "python-abc.sock")
+
+
+def make_private_directory(path: str) -> None:
+    """Create a directory only we can use, or check that the one already there is"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise DaemonError(f"{path} isn't a directory of our own")
+    if info.st_mode & 0o077:
+        raise DaemonError(f"{path} can be used by other users")
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class Daemon:
+    """Answers requests to score files or source text over a Unix socket
+
+    Each connection sends one JSON request on a line, and gets back a line with a `result`
+    for each file, in the order they finish, followed by a line with `done`. The worker
+    processes are started once and kept warm, and results are kept in memory against each
+    file's path, size and mtime, or against the digest of source text, so a request for files
+    that haven't changed since they were last scored never leaves the daemon. A request for
+    files can also say which to skip, with `max_file_size` and `skip_generated`.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        idle_timeout: Optional[float] = None,
+        executor: Union[str, Executor] = "process",
+    ):
+        from python_abc.aio import AsyncAnalyzer
+
+        # Always work out the scopes, so that a result can answer either kind of request
+        self.analyzer = AsyncAnalyzer(executor, workers, options=Options(scopes=True))
+        self.cache = MemoryCache(max_entries)
+        self.idle_timeout = idle_timeout
+        self.stopped: Optional[asyncio.Event] = None
+        self.active = 0
+        self.last_request = 0.0
+
+    async def warm_up(self) -> None:
+        """Start every worker and have it import everything it will need"""
+        await asyncio.gather(
+            *(
+                self.analyzer.score_source("x = 1\n")
+                for _ in range(self.analyzer.workers)
+            )
+        )
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.active += 1
+        try:
+            request = json.loads(await reader.readline())
+            async for reply in self.respond(request):
+                writer.write(encode(reply))
+                await writer.drain()
+            writer.write(encode({"done": True}))
+        except (ValueError, KeyError, TypeError) as e:
+            writer.write(encode({"error": f"bad request: {e}"}))
+        except asyncio.TimeoutError:
+            writer.write(encode({"error": "timed out"}))
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            self.last_request = asyncio.get_running_loop().time()
+            try:
+                await writer.drain()
+                writer.close()
+            except ConnectionError:
+                pass
+
+    async def respond(self, request: Dict[str, Any]):
+        scopes = bool(request.get("scopes"))
+        timeout = request.get("timeout")
+        if request.get("stop"):
+            assert self.stopped is not None
+            self.stopped.set()
+        elif "source" in request:
+            result = await self.score_source(
+                request["source"], request.get("name", "<string>"), timeout
+            )
+            yield {"result": reply_compact(result, scopes)}
+        else:
+            options = self.analyzer.options._replace(
+                max_file_size=int(request.get("max_file_size", DEFAULT_MAX_FILE_SIZE)),
+                skip_generated=bool(request.get("skip_generated")),
+            )
+            async for result in self.analyze_files(request["files"], timeout, options):
+                yield {"result": reply_compact(result, scopes)}
+
+    async def score_source(
+        self, source: str, name: str, timeout: Optional[float]
+    ) -> Result:
+        key = ("source", content_digest(source.encode("utf-8", "surrogatepass")))
+        found, result = self.cache.get(key)
+        if not found:
+            result = await self.analyzer.score_source(source, name, timeout)
+            self.cache.put(key, result)
+        return result._replace(path=name)
+
+    async def analyze_files(
+        self, files: List[str], timeout: Optional[float], options: Options
+    ):
+        # Whether a file is skipped depends on the options as well as the file
+        skips = (options.max_file_size, options.skip_generated)
+        misses: Dict[str, Tuple[str, str, int, int, Tuple[int, bool]]] = {}
+        for filename in files:
+            try:
+                stat = archive.stat(filename)
+            except OSError:
+                # Let a worker report the problem
+                misses[filename] = ("path", filename, -1, -1, skips)
+                continue
+
+            key = ("path", filename, stat.st_size, stat.st_mtime_ns, skips)
+            found, result = self.cache.get(key)
+            if found:
+                yield result
+            else:
+                misses[filename] = key
+
+        if misses:
+            async for result in self.analyzer.analyze_paths(
+                list(misses), timeout, options=options
+            ):
+                self.cache.put(misses[result.path], result)
+                yield result
+
+    async def watch_idle(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.last_request = loop.time()
+        assert self.stopped is not None and self.idle_timeout is not None
+        while not self.stopped.is_set():
+            await asyncio.sleep(1)
+            idle = loop.time() - self.last_request
+            if not self.active and idle >= self.idle_timeout:
+                self.stopped.set()
+
+    async def serve(self, path: str) -> None:
+        self.stopped = asyncio.Event()
+        directory = os.path.dirname(path)
+        if path == default_socket_path() or directory and not os.path.exists(directory):
+            make_private_directory(directory)
+        remove_stale_socket(path)
+        # The socket is created without any access for anyone else, rather than being locked
+        # down once it's already listening
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle, path)
+        finally:
+            os.umask(umask)
+        try:
+            await self.warm_up()
+            tasks: List["asyncio.Future[Any]"] = [
+                asyncio.ensure_future(self.stopped.wait())
+            ]
+            if self.idle_timeout:
+                tasks.append(asyncio.ensure_future(self.watch_idle()))
+            async with server:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                task.cancel()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+            self.analyzer.close()
+
+
+def reply_compact(result: Result, scopes: bool) -> list:
+    compact = list(pack(result))
+    if not scopes:
+        compact[2] = None
+    return compact
+
+
+def remove_stale_socket(path: str) -> None:
+    """Remove a socket left behind by a daemon that died, but not one that's still serving"""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise DaemonError(f"a daemon is already listening on {path}")
+
+
+def peer_uid(sock: socket.socket, path: str) -> int:
+    """The user on the other end of a connected Unix socket"""
+    if hasattr(socket, "SO_PEERCRED"):
+        credentials = sock.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        _, uid, _ = struct.unpack("3i", credentials)
+        return uid
+    # Without a way to ask who's listening, the socket's owner is the next best thing
+    return os.stat(path).st_uid
+
+
+def connect(path: str, timeout: Optional[float] = None) -> socket.socket:
+    """Connect to the daemon, raising `OSError` if there isn't one
+
+    Raises `DaemonError` if whoever is listening isn't us, since anyone could have put a
+    socket at a path in a shared directory and answered with whatever scores they liked.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        uid = peer_uid(sock, path)
+    except OSError:
+        sock.close()
+        raise
+    if uid != os.getuid():
+        sock.close()
+        raise DaemonError(f"{path} belongs to another user")
+    return sock
+
+
+def request(sock: socket.socket, message: Dict[str, Any]) -> Iterator[list]:
+    """Send `message` and yield each result compact the daemon sends back"""
+    with sock, sock.makefile("rb") as replies:
+        sock.sendall(encode(message))
+        for line in replies:
+            reply = json.loads(line)
+            if "error" in reply:
+                raise DaemonError(reply["error"])
+            if reply.get("done"):
+                return
+            yield reply["result"]
+    raise DaemonError("the daemon closed the connection")
+
+
+def score_source(
+    sock: socket.socket,
+    source: str,
+    name: str = "<string>",
+    scopes: bool = False,
+    timeout: Optional[float] = None,
+) -> Result:
+    """Score a string of source code on the daemon, reporting it as `name`"""
+    message = {"source": source, "name": name, "scopes": scopes, "timeout": timeout}
+    [compact] = request(sock, message)
+    # JSON has no tuples, so the compact arrives as a list
+    return expand(tuple(compact))
+
+
+def analyze_files(
+    sock: socket.socket,
+    files: Sequence[str],
+    scopes: bool = False,
+    ordered: bool = True,
+    timeout: Optional[float] = None,
+    max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+    skip_generated: bool = False,
+) -> Iterator[Result]:
+    """Score `files` on the daemon, yielding results with the paths as they were given
+
+    The daemon may not share our working directory, so it's sent absolute paths, each only
+    once however many times it was given.
+    """
+    names: Dict[str, List[int]] = {}
+    for i, filename in enumerate(files):
+        names.setdefault(os.path.abspath(filename), []).append(i)
+    message = {
+        "files": list(names),
+        "scopes": scopes,
+        "timeout": timeout,
+        "max_file_size": max_file_size,
+        "skip_generated": skip_generated,
+    }
+    buffered: Dict[int, Result] = {}
+    next_index = 0
+    answered = 0
+    for compact in request(sock, message):
+        # JSON has no tuples, so the compact arrives as a list
+        result = expand(tuple(compact))
+        for index in names.pop(result.path, ()):
+            answered += 1
+            if not ordered:
+                yield result._replace(path=files[index])
+                continue
+
+            buffered[index] = result._replace(path=files[index])
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+
+    if answered < len(files):
+        raise DaemonError(f"the daemon didn't score {len(files) - answered} files")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python-abc-daemon",
+        description="Keep warm workers around to score files for `python_abc --daemon`",
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        type=str,
+        default=default_socket_path(),
+        help="the Unix socket to listen on",
+    )
+    parser.add_argument(
+        "--cores",
+        dest="cores",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="number of worker processes to keep running",
+    )
+    parser.add_argument(
+        "--cache-entries",
+        dest="cache_entries",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="maximum number of results to keep in memory",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        dest="idle_timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="exit after this long without a request",
+    )
+    parser.add_argument(
+        "--stop",
+        dest="stop",
+        action="store_true",
+        help="stop the daemon listening on the socket",
+    )
+    args = vars(parser.parse_args())
+
+    if args["stop"]:
+        try:
+            list(request(connect(args["socket"]), {"stop": True}))
+        except OSError:
+            parser.exit(1, f"no daemon is listening on {args['socket']}\n")
+        return
+
+    daemon = Daemon(args["cores"], args["cache_entries"], args["idle_timeout"])
+    try:
+        asyncio.run(daemon.serve(args["socket"]))
+    except DaemonError as e:
+        parser.exit(1, f"{e}\n")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from python_abc.analyze import Result
+from python_abc.archive import split
+
+READ_CHUNK = 1024 * 1024
+
+
+def file_digest(filename: str) -> str:
+    """The same digest as `content_digest`, without holding the whole file in memory"""
+    import hashlib
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb", buffering=0) as f:
+        while chunk := f.read(READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Duplicates:
+    """Files with the same contents as one found before them, which only need analyzing once
+
+    Only files that are the same size as another are ever read, so a tree without any
+    duplicates costs nothing more than the stat that scheduling does anyway.
+    """
+
+    def __init__(self) -> None:
+        # The files each duplicate is a copy of, and the copies of each of those
+        self.original: Dict[str, str] = {}
+        self.copies: Dict[str, List[str]] = {}
+        self.order: List[str] = []
+        self.files = 0
+        self.bytes = 0
+
+    def find(self, sized: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """Remember which of `sized` are duplicates, returning the files that aren't"""
+        self.order = [filename for filename, _ in sized]
+        by_size: Dict[int, List[str]] = {}
+        for filename, size in sized:
+            # Archive members would each mean another pass over the archive to hash them
+            if split(filename) is None:
+                by_size.setdefault(size, []).append(filename)
+
+        first_by_digest: Dict[Tuple[int, str], str] = {}
+        for size, filenames in by_size.items():
+            if len(filenames) < 2:
+                continue
+            for filename in filenames:
+                try:
+                    key = (size, file_digest(filename))
+                except OSError:
+                    # Let the worker report the problem
+                    continue
+                original = first_by_digest.setdefault(key, filename)
+                if original != filename:
+                    self.original[filename] = original
+                    self.copies.setdefault(original, []).append(filename)
+                    self.files += 1
+                    self.bytes += size
+
+        return [item for item in sized if item[0] not in self.original]
+
+    def summary(self) -> str:
+        return (
+            f"skipped {self.files:,} duplicate files ({self.bytes:,} bytes), reusing the "
+            "results for the identical files found before them"
+        )
+
+    def expand(self, results: Iterable[Result], ordered: bool) -> Iterator[Result]:
+        """Yield every result along with one for each copy of its file
+
+        With `ordered` the results are yielded in the order the files were given to `find`,
+        holding on to the result for each file that has copies until the last has been
+        yielded.
+        """
+        if not self.original:
+            yield from results
+            return
+
+        if not ordered:
+            for result in results:
+                yield result
+                for copy in self.copies.get(result.path, ()):
+                    yield result._replace(path=copy)
+            return
+
+        results = iter(results)
+        held: Dict[str, Result] = {}
+        remaining: Dict[str, int] = {
+            original: len(copies) for original, copies in self.copies.items()
+        }
+        for filename in self.order:
+            original: Optional[str] = self.original.get(filename)
+            if original is None:
+                result = next(results)
+                if filename in remaining:
+                    held[filename] = result
+                yield result
+                continue
+
+            yield held[original]._replace(path=filename)
+            remaining[original] -= 1
+            if not remaining[original]:
+                del held[original]
@@ -0,0 +1,260 @@
+import fnmatch
+import io
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Pattern, Set, Tuple
+
+from python_abc.archive import discover_members, is_archive
+
+# Directories that never contain code worth scoring, but can easily contain hundreds of
+# thousands of files that would otherwise be scanned
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".mypy_cache",
+    ".nox",
+    ".pytest_cache",
+    ".svn",
+    ".tox",
+    ".venv",
+    "__pycache__",
+    "build",
+    "node_modules",
+    "venv",
+)
+
+DEFAULT_INCLUDES = ("*.py",)
+
+FILE_LIST_CHUNK = 64 * 1024
+
+
+def compile_globs(globs: Iterable[str]) -> Optional[Pattern[str]]:
+    """Combine shell-style globs into one regex
+
+    A glob without a `/` is matched against the name of a file or directory, and one with a
+    `/` is matched against its whole path relative to where discovery started.
+    """
+    names, paths = [], []
+    for glob in globs:
+        if "/" in glob:
+            paths.append(fnmatch.translate(glob.strip("/")))
+        else:
+            names.append(fnmatch.translate(glob))
+
+    parts = []
+    if names:
+        parts.append(f"(?:.*/)?(?:{'|'.join(names)})")
+    if paths:
+        parts.append(f"(?:{'|'.join(paths)})")
+    return re.compile("|".join(parts)) if parts else None
+
+
+def translate_gitignore(pattern: str) -> str:
+    """Turn a single .gitignore pattern, minus any `!` and trailing `/`, into a regex"""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex.append("/.*")
+            i += 3
+        elif char == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif char == "?":
+            regex.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex.append(re.escape(char))
+                i += 1
+            else:
+                contents = pattern[i + 1 : end].replace("\\", "\\\\")
+                if contents.startswith("!"):
+                    contents = "^" + contents[1:]
+                regex.append(f"[{contents}]")
+                i = end + 1
+        elif char == "\\" and i + 1 < len(pattern):
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(char))
+            i += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return prefix + "".join(regex)
+
+
+class GitIgnore:
+    """The rules from one .gitignore file, which apply to paths below the directory it's in"""
+
+    def __init__(self, lines: Iterable[str]):
+        self.rules: List[Tuple[Pattern[str], bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                regex = re.compile(translate_gitignore(line))
+                self.rules.append((regex, negate, directory_only))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["GitIgnore"]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r") as f:
+                ignore = cls(f)
+        except (OSError, UnicodeDecodeError):
+            return None
+        return ignore if ignore.rules else None
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """Whether the path is ignored, or `None` if no rule mentions it"""
+        ignored = None
+        for regex, negate, directory_only in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.fullmatch(relative_path):
+                ignored = not negate
+        return ignored
+
+
+def is_virtualenv(path: str) -> bool:
+    return os.path.exists(os.path.join(path, "pyvenv.cfg"))
+
+
+def discover(
+    paths: Iterable[str],
+    include: Iterable[str] = DEFAULT_INCLUDES,
+    exclude: Iterable[str] = DEFAULT_EXCLUDES,
+    gitignore: bool = False,
+    follow_symlinks: bool = False,
+) -> Iterator[str]:
+    """Yield the Python files found under `paths`, lazily and in a stable order
+
+    Files passed directly are always yielded. Within a directory, a file is yielded if it
+    matches one of the `include` globs, and neither it nor any directory above it matches
+    one of the `exclude` globs, is a virtualenv, or (with `gitignore`) is ignored by git.
+    Symlinked directories are only entered with `follow_symlinks`, and never twice.
+
+    Wheels, zip files and tarballs passed directly are searched as if they were directories,
+    yielding `archive!member` for each of their Python files.
+    """
+    included = compile_globs(include)
+    excluded = compile_globs(exclude)
+
+    for path in paths:
+        if is_archive(path) and os.path.isfile(path):
+            yield from discover_members(path, included, excluded)
+            continue
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        visited: Set[Tuple[int, int]] = set()
+        # The .gitignore files that apply to a directory, each with the relative path of the
+        # directory it was found in
+        ignores: List[Tuple[str, GitIgnore]] = []
+        if gitignore and (root_ignore := GitIgnore.load(path)) is not None:
+            ignores.append(("", root_ignore))
+        stack = [(path, "", ignores)]
+
+        while stack:
+            directory, relative, ignores = stack.pop()
+            try:
+                stat = os.stat(directory)
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            key = (stat.st_dev, stat.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+
+            subdirectories = []
+            for entry in entries:
+                entry_relative = f"{relative}{entry.name}"
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                except OSError:
+                    continue
+
+                if excluded is not None and excluded.fullmatch(entry_relative):
+                    continue
+                if ignores and is_ignored(ignores, entry_relative, is_dir):
+                    continue
+
+                if is_dir:
+                    if not is_virtualenv(entry.path):
+                        subdirectories.append((entry.path, f"{entry_relative}/"))
+                elif included is None or included.fullmatch(entry_relative):
+                    try:
+                        if entry.is_file():
+                            yield entry.path
+                    except OSError:
+                        continue
+
+            for subdirectory, subdirectory_relative in reversed(subdirectories):
+                subdirectory_ignores = ignores
+                if gitignore and (ignore := GitIgnore.load(subdirectory)) is not None:
+                    subdirectory_ignores = ignores + [(subdirectory_relative, ignore)]
+                stack.append(
+                    (subdirectory, subdirectory_relative, subdirectory_ignores)
+                )
+
+
+def read_file_list(stream: io.BufferedIOBase) -> Iterator[str]:
+    """Yield each path in a list of them as soon as it's been read
+
+    Paths are separated by newlines, or by NULs if a NUL comes before the first newline, as
+    from `git ls-files -z` or `find -print0`. Blank entries are skipped.
+    """
+    separator = None
+    pending = b""
+    while chunk := stream.read1(FILE_LIST_CHUNK):
+        pending += chunk
+        if separator is None:
+            nul, newline = pending.find(b"\0"), pending.find(b"\n")
+            if nul == -1 and newline == -1:
+                continue
+            separator = b"\0" if newline == -1 or -1 < nul < newline else b"\n"
+        *entries, pending = pending.split(separator)
+        yield from decode_entries(entries, separator)
+    yield from decode_entries([pending], separator)
+
+
+def decode_entries(entries: List[bytes], separator: Optional[bytes]) -> Iterator[str]:
+    for entry in entries:
+        if separator != b"\0":
+            entry = entry.rstrip(b"\r")
+        if entry:
+            yield os.fsdecode(entry)
+
+
+def is_ignored(
+    ignores: List[Tuple[str, GitIgnore]], relative_path: str, is_dir: bool
+) -> bool:
+    # Rules in deeper .gitignore files take precedence over those above them
+    for base, ignore in reversed(ignores):
+        ignored = ignore.match(relative_path[len(base) :], is_dir)
+        if ignored is not None:
+            return ignored
+    return False
@@ -0,0 +1,130 @@
+import sys
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Union
+
+# `concurrent.futures` is only imported for the pools, since it brings `logging` with it and
+# scoring a few files in this process shouldn't have to wait for either
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+EXECUTORS = ("auto", "serial", "thread", "process")
+
+# Starting the process pool, importing joblib included, takes about as long as parsing this
+# much source in one process, so anything smaller is finished sooner without it
+SERIAL_MAX_BYTES = 2 * 1024 * 1024
+
+
+class Finished:
+    """The outcome of a task that `SerialExecutor` has already run
+
+    It has as much of the `Future` interface as makes sense for a task that's already over.
+    """
+
+    __slots__ = ("_result", "_exception")
+
+    def __init__(self, result: Any = None, exception: Optional[BaseException] = None):
+        self._result = result
+        self._exception = exception
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout: Optional[float] = None) -> Optional[BaseException]:
+        return self._exception
+
+    def done(self) -> bool:
+        return True
+
+    def cancel(self) -> bool:
+        return False
+
+    def add_done_callback(self, fn: Callable[["Finished"], Any]) -> None:
+        fn(self)
+
+
+class SerialExecutor:
+    """Runs each task in the calling thread as soon as it's submitted
+
+    There's nothing to start up and nothing to pickle, which makes this the fastest choice for
+    a handful of files, and the easiest to debug. Since every task is over by the time it's
+    been submitted, it hands back a `Finished` rather than a `Future`, and so it needs nothing
+    from `concurrent.futures`.
+    """
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Finished:
+        try:
+            return Finished(fn(*args, **kwargs))
+        except BaseException as e:
+            return Finished(exception=e)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        pass
+
+
+# What tasks are run on: one of the pools from `concurrent.futures`, or the serial executor
+AnyExecutor = Union["Executor", SerialExecutor]
+
+
+def gil_enabled() -> bool:
+    # Free-threaded builds of Python 3.13 and later can run threads in parallel
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def choose_executor(
+    workers: int, files: Optional[int] = None, total_bytes: Optional[int] = None
+) -> str:
+    """What `auto` means for `files` files of `total_bytes` bytes in total
+
+    Small jobs run in this process, since they'd be over before a pool had started. Bigger
+    ones go to processes, or to threads where there's no GIL to stop threads running in
+    parallel. When the size of the job isn't known it's assumed to be big.
+    """
+    if workers <= 1 or files is not None and files <= 1:
+        return "serial"
+    if total_bytes is not None and total_bytes < SERIAL_MAX_BYTES:
+        return "serial"
+    return "process" if gil_enabled() else "thread"
+
+
+def check_executor(executor: Union[str, "Executor"]) -> None:
+    # Anything that isn't a name is taken to be an executor, so that checking doesn't need
+    # `concurrent.futures` either
+    if isinstance(executor, str) and executor not in EXECUTORS:
+        raise ValueError(
+            f"executor must be one of {', '.join(EXECUTORS)} or an Executor, "
+            f"not {executor!r}"
+        )
+
+
+@contextmanager
+def get_executor(
+    executor: Union[str, "Executor"], workers: int
+) -> Iterator["AnyExecutor"]:
+    """The executor to run tasks on, shutting it down afterwards if we started it
+
+    An `Executor` that's passed in is used as it is and left running, and `auto` is decided
+    without knowing how much work there is.
+    """
+    check_executor(executor)
+    if executor == "auto":
+        executor = choose_executor(workers)
+    if not isinstance(executor, str):
+        yield executor
+    elif executor == "serial":
+        yield SerialExecutor()
+    elif executor == "thread":
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            yield pool
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        # Only pay for importing joblib when processes are asked for. Its workers are kept
+        # alive between calls, so there's nothing to shut down.
+        from joblib.externals.loky import get_reusable_executor
+
+        yield get_reusable_executor(max_workers=workers)
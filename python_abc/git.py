@@ -0,0 +1,181 @@
+import os
+import subprocess
+from typing import IO, Iterator, List, NamedTuple, Optional, Pattern, Tuple, cast
+
+from python_abc.calculate import calculate_abc_counts
+from python_abc.vector import Vector
+
+
+class GitError(Exception):
+    pass
+
+
+def run_git(args: List[str], cwd: str) -> bytes:
+    try:
+        completed = subprocess.run(
+            ["git", *args], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed") from None
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.decode(errors="replace").strip())
+    return completed.stdout
+
+
+def parse_range(spec: str) -> Tuple[str, str]:
+    """Split `BASE..HEAD` or `BASE...HEAD` into its two revisions, defaulting to HEAD"""
+    for separator in ("...", ".."):
+        if separator in spec:
+            base, head = spec.split(separator, 1)
+            return base or "HEAD", head or "HEAD"
+    return spec, "HEAD"
+
+
+class CatFile:
+    """Reads blobs through a single long-lived `git cat-file --batch` process
+
+    Starting a process per blob would take longer than scoring it, and this never touches
+    the working tree, so a diff can be scored without checking anything out.
+    """
+
+    def __init__(self, cwd: str):
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.stdin = cast(IO[bytes], self.process.stdin)
+        self.stdout = cast(IO[bytes], self.process.stdout)
+
+    def __enter__(self) -> "CatFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.stdin.close()
+        self.process.wait()
+        self.stdout.close()
+
+    def read(self, revision: str, path: str) -> Optional[bytes]:
+        """The contents of `path` at `revision`, or `None` if there's no such blob"""
+        self.stdin.write(f"{revision}:{path}\n".encode())
+        self.stdin.flush()
+
+        header = self.stdout.readline().split()
+        if len(header) != 3 or header[1] != b"blob":
+            # Either `<object> missing` or something that isn't a file
+            return None
+
+        size = int(header[2])
+        data = self.stdout.read(size)
+        self.stdout.read(1)  # Every blob is followed by a newline
+        return data
+
+
+class Change(NamedTuple):
+    """One changed file, scored at the merge base and at the head
+
+    `old` or `new` is `None` if the file doesn't exist on that side, or couldn't be parsed
+    there, which `status` will tell apart. If the change is to a single class or function
+    within the file then `qualname` and `lineno` say which, and if the head side couldn't be
+    scored for some other reason than being unparsable then `error` says why.
+    """
+
+    path: str
+    status: str
+    old: Optional[Vector]
+    new: Optional[Vector]
+    qualname: Optional[str] = None
+    lineno: int = 0
+    error: Optional[str] = None
+
+    @property
+    def delta(self) -> Vector:
+        old = self.old or Vector(0, 0, 0)
+        new = self.new or Vector(0, 0, 0)
+        return Vector(
+            new.assignment - old.assignment,
+            new.branch - old.branch,
+            new.condition - old.condition,
+        )
+
+    def get_score_change(self) -> int:
+        old = self.old.get_magnitude_squared() if self.old else 0
+        new = self.new.get_magnitude_squared() if self.new else 0
+        return new - old
+
+
+def changed_files(
+    merge_base: str, head: str, toplevel: str, pathspec: str
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield the status, old path and new path of each file changed since the merge base"""
+    output = run_git(
+        ["diff", "-z", "--name-status", "-M", merge_base, head, "--", pathspec],
+        toplevel,
+    )
+
+    fields = output.decode("utf-8", errors="surrogateescape").split("\0")
+    i = 0
+    while i < len(fields) - 1:
+        status = fields[i][0]
+        if status in "RC":
+            old_path, new_path = fields[i + 1], fields[i + 2]
+            i += 3
+        else:
+            old_path = new_path = fields[i + 1]
+            i += 2
+        yield status, old_path, new_path
+
+
+def score_blob(data: Optional[bytes]) -> Optional[Vector]:
+    if data is None:
+        return None
+    try:
+        # Parsing bytes lets the encoding be worked out the same way Python itself does
+        return Vector(*calculate_abc_counts(data))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def is_wanted(
+    path: str, included: Optional[Pattern[str]], excluded: Optional[Pattern[str]]
+) -> bool:
+    if included is not None and not included.fullmatch(path):
+        return False
+    if excluded is not None:
+        parts = path.split("/")
+        for i in range(1, len(parts) + 1):
+            if excluded.fullmatch("/".join(parts[:i])):
+                return False
+    return True
+
+
+def diff_scores(
+    spec: str,
+    path: str = ".",
+    included: Optional[Pattern[str]] = None,
+    excluded: Optional[Pattern[str]] = None,
+) -> Iterator[Change]:
+    """Score every Python file changed in `spec` under `path`, on both sides of the change"""
+    base, head = parse_range(spec)
+    directory = path if os.path.isdir(path) else os.path.dirname(path) or "."
+    toplevel = run_git(["rev-parse", "--show-toplevel"], directory).decode().strip()
+    pathspec = os.path.relpath(os.path.abspath(path), toplevel)
+    merge_base = run_git(["merge-base", base, head], toplevel).decode().strip()
+
+    with CatFile(toplevel) as cat_file:
+        for status, old_path, new_path in changed_files(
+            merge_base, head, toplevel, pathspec
+        ):
+            if not is_wanted(new_path, included, excluded):
+                continue
+
+            old = new = None
+            if status != "A":
+                old = score_blob(cat_file.read(merge_base, old_path))
+            if status != "D":
+                new = score_blob(cat_file.read(head, new_path))
+            yield Change(new_path, status, old, new)
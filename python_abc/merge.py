@@ -0,0 +1,100 @@
+import heapq
+import json
+import sys
+from typing import IO, Any, Dict, Iterable, Iterator, List
+
+from python_abc.analyze import Result
+from python_abc.scope import Scope
+from python_abc.shard import path_key
+from python_abc.vector import Vector
+
+
+class MergeError(Exception):
+    """Raised for a shard report that can't be merged"""
+
+
+def scope_list(fields: Dict[str, Any]) -> list:
+    """Turn the nested fields a JSON Lines report has for a scope back into `to_list` form"""
+    exclusive = fields["exclusive"]
+    return [
+        fields["name"],
+        fields["kind"],
+        fields["lineno"],
+        [exclusive["assignment"], exclusive["branch"], exclusive["condition"]],
+        [scope_list(child) for child in fields["children"]],
+    ]
+
+
+def to_result(record: Dict[str, Any]) -> Result:
+    path = record["path"]
+    if "assignment" not in record:
+        return Result(path, None, error=record.get("error"))
+
+    counts = [record["assignment"], record["branch"], record["condition"]]
+    scope = None
+    if "scopes" in record:
+        children = [scope_list(fields) for fields in record["scopes"]]
+        # What's left once the classes and functions are taken away is the module's own
+        exclusive = list(counts)
+        for child in record["scopes"]:
+            for i, component in enumerate(("assignment", "branch", "condition")):
+                exclusive[i] -= child[component]
+        scope = Scope.from_list(["<module>", "module", 0, exclusive, children])
+    return Result(path, Vector(*counts), scope)
+
+
+def read_results(stream: IO[str], name: str = "<stream>") -> Iterator[Result]:
+    """Yield the result for each file in a report written with `--format jsonl`"""
+    for lineno, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise MergeError(f"{name}:{lineno}: not JSON Lines: {e}") from None
+        kind = record.get("type")
+        if kind == "file":
+            yield to_result(record)
+        elif kind not in ("scope", "rollup"):
+            # Ranked scopes and rollups are worked out again from the files they came from
+            raise MergeError(f"{name}:{lineno}: can't merge a record of type {kind!r}")
+
+
+def in_order(results: Iterable[Result], name: str) -> Iterator[Result]:
+    previous = None
+    for result in results:
+        key = path_key(result.path)
+        if previous is not None and key < previous:
+            raise MergeError(
+                f"{name}: {result.path} is out of order, "
+                "so the shard wasn't written by --shard with --order path"
+            )
+        previous = key
+        yield result
+
+
+def merge_results(shards: Dict[str, IO[str]]) -> Iterator[Result]:
+    """Interleave the results from each shard, by name, into one stream in path order
+
+    Each shard is already in path order, so only one result per shard is held at a time.
+    """
+    return heapq.merge(
+        *(
+            in_order(read_results(stream, name), name)
+            for name, stream in shards.items()
+        ),
+        key=lambda result: path_key(result.path),
+    )
+
+
+def open_shards(paths: List[str]) -> Dict[str, IO[str]]:
+    """Open every shard, or none of them"""
+    streams: Dict[str, IO[str]] = {}
+    try:
+        for path in paths:
+            streams[path] = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    except OSError:
+        for stream in streams.values():
+            stream.close()
+        raise
+    return streams
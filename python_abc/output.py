@@ -0,0 +1,572 @@
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from python_abc import __version__
+from python_abc.analyze import SKIPPED, Result, is_parse_error
+from python_abc.scope import Scope
+from python_abc.vector import Vector
+
+if TYPE_CHECKING:
+    # Only the diff and baseline reports need git, and its subprocess import
+    from python_abc.git import Change
+    from python_abc.rollup import Directory
+
+FORMATS = ("text", "jsonl", "csv", "sarif")
+
+BUFFER_SIZE = 64 * 1024
+
+
+def open_output(path: Optional[str]) -> IO[str]:
+    """A buffered text stream for the report, which is stdout unless given a path
+
+    The report is streamed, so we want it to reach a terminal line by line, but otherwise to
+    be written in large chunks.
+    """
+    if path is None or path == "-":
+        sys.stdout.flush()
+        return open(
+            sys.stdout.fileno(),
+            "w",
+            buffering=BUFFER_SIZE,
+            encoding="utf-8",
+            newline="",
+            closefd=False,
+        )
+    return open(path, "w", buffering=BUFFER_SIZE, encoding="utf-8", newline="")
+
+
+def vector_fields(vector: Vector) -> Dict[str, Any]:
+    return {
+        "assignment": vector.assignment,
+        "branch": vector.branch,
+        "condition": vector.condition,
+        "magnitude": vector.get_magnitude_value(),
+    }
+
+
+def scope_fields(scope: Scope) -> Dict[str, Any]:
+    return {
+        "name": scope.name,
+        "qualname": scope.qualname,
+        "kind": scope.kind,
+        "lineno": scope.lineno,
+        **vector_fields(scope.inclusive),
+        "exclusive": vector_fields(scope.exclusive),
+    }
+
+
+def display_path(path: str) -> str:
+    return path.replace(os.sep, "/")
+
+
+def rollup_fields(directory: "Directory") -> Dict[str, Any]:
+    return {
+        "path": directory.path or ".",
+        "files": directory.files,
+        "errors": directory.errors,
+        "skipped": directory.skipped,
+        **vector_fields(directory.vector),
+        "mean": directory.mean,
+        "max": directory.max,
+        "worst": directory.worst,
+    }
+
+
+def describe_failure(error: Optional[str]) -> str:
+    """Why a file has no score, which is only left unsaid if it wasn't valid Python"""
+    if error is None or is_parse_error(error):
+        return "Unable to parse AST"
+    return error
+
+
+class Writer(ABC):
+    """Writes each record of the report as soon as it's given one"""
+
+    def __init__(self, stream: IO[str], show_scopes: bool = False):
+        self.stream = stream
+        self.show_scopes = show_scopes
+        self.line_buffered = stream.isatty()
+
+    @abstractmethod
+    def write_file(self, result: Result) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_scopes(self, ranked: List[Tuple[str, Scope]]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_change(self, change: "Change") -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_rollups(self, directories: List["Directory"]) -> None:
+        raise NotImplementedError
+
+    def flush_line(self) -> None:
+        if self.line_buffered:
+            self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class TextWriter(Writer):
+    """The fixed-width table meant for people"""
+
+    def __init__(self, stream: IO[str], show_scopes: bool = False, width: int = 0):
+        super().__init__(stream, show_scopes)
+        self.width = width
+        self.written = False
+
+    def write_file(self, result: Result) -> None:
+        self.written = True
+        # When files are analyzed as they're found the widest path isn't known up front
+        self.width = max(self.width, len(result.path))
+        width = self.width
+        lines = []
+        if result.vector is not None:
+            lines.append(f"{result.path:<{width}} {result.vector.magnitude:>26}")
+        elif result.error is None or is_parse_error(result.error):
+            lines.append(f"{result.path:<{width}} {'Unable to parse AST':>26}")
+        else:
+            lines.append(f"{result.path:<{width}} {result.error}")
+
+        if self.show_scopes and result.scope is not None:
+            for depth, scope in result.scope.walk():
+                if depth:
+                    name = "  " * depth + f"{scope.qualname}:{scope.lineno}"
+                    lines.append(f"{name:<{width}} {scope.inclusive.magnitude:>26}")
+
+        self.stream.write("\n".join(lines) + "\n")
+        self.flush_line()
+
+    def write_scopes(self, ranked: List[Tuple[str, Scope]]) -> None:
+        if self.written:
+            self.stream.write("\n")
+        self.written = True
+
+        names = [f"{path}:{scope.lineno} {scope.qualname}" for path, scope in ranked]
+        width = max((len(name) for name in names), default=0)
+        for name, (_, scope) in zip(names, ranked):
+            self.stream.write(f"{name:<{width}} {scope.inclusive.magnitude:>26}\n")
+
+    def write_rollups(self, directories: List["Directory"]) -> None:
+        if self.written:
+            self.stream.write("\n")
+        self.written = True
+
+        names = [f"{directory.path or '.'}/" for directory in directories]
+        width = max((len(name) for name in names), default=0)
+        for name, directory in zip(names, directories):
+            summary = f"{directory.files} files"
+            if directory.worst is not None:
+                summary += (
+                    f", mean {directory.mean}, max {directory.max} in {directory.worst}"
+                )
+            if directory.errors:
+                summary += f", {directory.errors} unable to parse"
+            if directory.skipped:
+                summary += f", {directory.skipped} skipped"
+            self.stream.write(
+                f"{name:<{width}} {directory.vector.magnitude:>26}  {summary}\n"
+            )
+
+    def write_change(self, change: "Change") -> None:
+        sides = []
+        for exists, vector, error in (
+            (change.status != "A", change.old, None),
+            (change.status != "D", change.new, change.error),
+        ):
+            if not exists:
+                sides.append("-")
+            elif vector is None:
+                sides.append(describe_failure(error))
+            else:
+                sides.append(vector.magnitude)
+
+        delta = change.delta
+        old_magnitude = change.old.get_magnitude_value() if change.old else 0.0
+        new_magnitude = change.new.get_magnitude_value() if change.new else 0.0
+        name = change.path
+        if change.qualname is not None:
+            name = f"{change.path}:{change.lineno} {change.qualname}"
+        self.stream.write(
+            f"{change.status} {name} {sides[0]} -> {sides[1]} "
+            f"<{delta.assignment:+}, {delta.branch:+}, {delta.condition:+}> "
+            f"({new_magnitude - old_magnitude:+.1f})\n"
+        )
+        self.flush_line()
+
+
+class JsonLinesWriter(Writer):
+    """One JSON object per line, with a `type` of `file`, `scope` or `change`"""
+
+    def __init__(self, stream: IO[str], show_scopes: bool = False):
+        # Like csv, json is only imported by the formats that need it
+        import json
+
+        super().__init__(stream, show_scopes)
+        self.encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def write_record(self, record: Dict[str, Any]) -> None:
+        self.stream.write(self.encoder.encode(record) + "\n")
+        self.flush_line()
+
+    def write_file(self, result: Result) -> None:
+        record: Dict[str, Any] = {"type": "file", "path": display_path(result.path)}
+        if result.vector is not None:
+            record.update(vector_fields(result.vector))
+        record["error"] = result.error
+        if result.scope is not None:
+            record["scopes"] = [
+                nested_scope_fields(child) for child in result.scope.children
+            ]
+        self.write_record(record)
+
+    def write_scopes(self, ranked: List[Tuple[str, Scope]]) -> None:
+        for path, scope in ranked:
+            self.write_record(
+                {"type": "scope", "path": display_path(path), **scope_fields(scope)}
+            )
+
+    def write_rollups(self, directories: List["Directory"]) -> None:
+        for directory in directories:
+            self.write_record({"type": "rollup", **rollup_fields(directory)})
+
+    def write_change(self, change: "Change") -> None:
+        self.write_record(
+            {
+                "type": "change",
+                "path": display_path(change.path),
+                "qualname": change.qualname,
+                "lineno": change.lineno or None,
+                "status": change.status,
+                "old": None if change.old is None else vector_fields(change.old),
+                "new": None if change.new is None else vector_fields(change.new),
+                "delta": {
+                    "assignment": change.delta.assignment,
+                    "branch": change.delta.branch,
+                    "condition": change.delta.condition,
+                },
+            }
+        )
+
+
+def nested_scope_fields(scope: Scope) -> Dict[str, Any]:
+    fields = scope_fields(scope)
+    fields["children"] = [nested_scope_fields(child) for child in scope.children]
+    return fields
+
+
+class CsvWriter(Writer):
+    """One row per file, followed by a row for each of its scopes if they were asked for
+
+    Diffs are written with the vector on each side in its own set of columns, and directory
+    rollups as a table of their own.
+    """
+
+    FIELDS = (
+        "path",
+        "scope",
+        "kind",
+        "lineno",
+        "assignment",
+        "branch",
+        "condition",
+        "magnitude",
+        "error",
+    )
+    CHANGE_FIELDS = (
+        "path",
+        "scope",
+        "lineno",
+        "status",
+        "old_assignment",
+        "old_branch",
+        "old_condition",
+        "old_magnitude",
+        "new_assignment",
+        "new_branch",
+        "new_condition",
+        "new_magnitude",
+    )
+
+    ROLLUP_FIELDS = (
+        "path",
+        "files",
+        "errors",
+        "skipped",
+        "assignment",
+        "branch",
+        "condition",
+        "magnitude",
+        "mean",
+        "max",
+        "worst",
+    )
+
+    def __init__(self, stream: IO[str], show_scopes: bool = False):
+        import csv
+
+        super().__init__(stream, show_scopes)
+        self.writer = csv.writer(stream)
+        self.header: Optional[Tuple[str, ...]] = None
+
+    def write_row(self, header: Tuple[str, ...], row: List[Any]) -> None:
+        if self.header != header:
+            # Rollups follow the files as a second table, after a blank line
+            if self.header is not None:
+                self.writer.writerow([])
+            self.header = header
+            self.writer.writerow(header)
+        self.writer.writerow(row)
+        self.flush_line()
+
+    def scope_row(self, path: str, scope: Scope) -> List[Any]:
+        vector = scope.inclusive
+        return [
+            display_path(path),
+            scope.qualname,
+            scope.kind,
+            scope.lineno,
+            vector.assignment,
+            vector.branch,
+            vector.condition,
+            vector.get_magnitude_value(),
+            "",
+        ]
+
+    def write_file(self, result: Result) -> None:
+        vector = result.vector
+        if vector is None:
+            counts: List[Any] = ["", "", "", ""]
+        else:
+            counts = [
+                vector.assignment,
+                vector.branch,
+                vector.condition,
+                vector.get_magnitude_value(),
+            ]
+        row = [display_path(result.path), "", "module", "", *counts, result.error or ""]
+        self.write_row(self.FIELDS, row)
+
+        if self.show_scopes and result.scope is not None:
+            for depth, scope in result.scope.walk():
+                if depth:
+                    self.write_row(self.FIELDS, self.scope_row(result.path, scope))
+
+    def write_scopes(self, ranked: List[Tuple[str, Scope]]) -> None:
+        for path, scope in ranked:
+            self.write_row(self.FIELDS, self.scope_row(path, scope))
+
+    def write_change(self, change: "Change") -> None:
+        row: List[Any] = [
+            display_path(change.path),
+            change.qualname or "",
+            change.lineno or "",
+            change.status,
+        ]
+        for vector in (change.old, change.new):
+            if vector is None:
+                row.extend(("", "", "", ""))
+            else:
+                row.extend(
+                    (
+                        vector.assignment,
+                        vector.branch,
+                        vector.condition,
+                        vector.get_magnitude_value(),
+                    )
+                )
+        self.write_row(self.CHANGE_FIELDS, row)
+
+    def write_rollups(self, directories: List["Directory"]) -> None:
+        for directory in directories:
+            fields = rollup_fields(directory)
+            fields["worst"] = fields["worst"] or ""
+            self.write_row(
+                self.ROLLUP_FIELDS, [fields[name] for name in self.ROLLUP_FIELDS]
+            )
+
+
+class SarifWriter(Writer):
+    """A SARIF 2.1.0 log, streamed one result at a time
+
+    Every file, scope and directory is reported as a `note` carrying its vector in
+    `properties`, so that code scanning tools can show the score next to the code. Files that
+    can't be read or parsed are reported as errors, and files skipped on purpose as notes.
+    """
+
+    RULES = [
+        {
+            "id": "ABC001",
+            "name": "AbcScore",
+            "shortDescription": {"text": "ABC software metric"},
+            "helpUri": "https://en.wikipedia.org/wiki/ABC_Software_Metric",
+        },
+        {
+            "id": "ABC002",
+            "name": "AbcScoreChange",
+            "shortDescription": {"text": "Change in ABC software metric"},
+        },
+        {
+            "id": "ABC000",
+            "name": "ParseError",
+            "shortDescription": {"text": "File could not be analyzed"},
+        },
+        {
+            "id": "ABC003",
+            "name": "AbcScoreRollup",
+            "shortDescription": {"text": "ABC software metric summed over a directory"},
+        },
+    ]
+
+    def __init__(self, stream: IO[str], show_scopes: bool = False):
+        import json
+
+        super().__init__(stream, show_scopes)
+        self.encoder = json.JSONEncoder()
+        self.first = True
+        header = self.encoder.encode(
+            {
+                "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+                "version": "2.1.0",
+                "runs": [
+                    {
+                        "tool": {
+                            "driver": {
+                                "name": "python-abc",
+                                "version": __version__,
+                                "informationUri": (
+                                    "https://github.com/eoinnoble/python-abc"
+                                ),
+                                "rules": self.RULES,
+                            }
+                        },
+                        "results": [],
+                    }
+                ],
+            }
+        )
+        # Leave the results array open so that results can be streamed into it
+        self.footer = "]}]}\n"
+        self.stream.write(header[: -len("]}]}")])
+
+    def write_result(
+        self,
+        rule_id: str,
+        level: str,
+        message: str,
+        path: str,
+        lineno: int = 0,
+        qualname: Optional[str] = None,
+        properties: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        location: Dict[str, Any] = {
+            "physicalLocation": {"artifactLocation": {"uri": display_path(path)}}
+        }
+        if lineno:
+            location["physicalLocation"]["region"] = {"startLine": lineno}
+        if qualname:
+            location["logicalLocations"] = [{"fullyQualifiedName": qualname}]
+
+        result: Dict[str, Any] = {
+            "ruleId": rule_id,
+            "level": level,
+            "message": {"text": message},
+            "locations": [location],
+        }
+        if properties is not None:
+            result["properties"] = properties
+
+        self.stream.write(("" if self.first else ",") + self.encoder.encode(result))
+        self.first = False
+        self.flush_line()
+
+    def write_scope(self, path: str, scope: Scope) -> None:
+        self.write_result(
+            "ABC001",
+            "note",
+            f"ABC score for {scope.qualname} is {scope.inclusive.magnitude}",
+            path,
+            scope.lineno,
+            scope.qualname,
+            scope_fields(scope),
+        )
+
+    def write_failure(self, error: Optional[str], path: str) -> None:
+        level = "note" if (error or "").startswith(SKIPPED) else "error"
+        self.write_result("ABC000", level, error or "Unable to parse AST", path)
+
+    def write_file(self, result: Result) -> None:
+        if result.vector is None:
+            self.write_failure(result.error, result.path)
+            return
+
+        self.write_result(
+            "ABC001",
+            "note",
+            f"ABC score is {result.vector.magnitude}",
+            result.path,
+            properties=vector_fields(result.vector),
+        )
+        if self.show_scopes and result.scope is not None:
+            for depth, scope in result.scope.walk():
+                if depth:
+                    self.write_scope(result.path, scope)
+
+    def write_scopes(self, ranked: List[Tuple[str, Scope]]) -> None:
+        for path, scope in ranked:
+            self.write_scope(path, scope)
+
+    def write_change(self, change: "Change") -> None:
+        if change.status != "D" and change.new is None:
+            self.write_failure(change.error, change.path)
+            return
+
+        old = change.old.magnitude if change.old else "nothing"
+        new = change.new.magnitude if change.new else "nothing"
+        self.write_result(
+            "ABC002",
+            "note",
+            f"ABC score changed from {old} to {new}",
+            change.path,
+            change.lineno,
+            change.qualname,
+            properties={
+                "status": change.status,
+                "old": None if change.old is None else vector_fields(change.old),
+                "new": None if change.new is None else vector_fields(change.new),
+            },
+        )
+
+    def write_rollups(self, directories: List["Directory"]) -> None:
+        for directory in directories:
+            fields = rollup_fields(directory)
+            self.write_result(
+                "ABC003",
+                "note",
+                f"ABC score for the {directory.files} files under {fields['path']} is "
+                f"{directory.vector.magnitude}",
+                fields["path"],
+                properties=fields,
+            )
+
+    def close(self) -> None:
+        self.stream.write(self.footer)
+        super().close()
+
+
+def make_writer(
+    output_format: str, stream: IO[str], show_scopes: bool = False, width: int = 0
+) -> Writer:
+    if output_format == "jsonl":
+        return JsonLinesWriter(stream, show_scopes)
+    if output_format == "csv":
+        return CsvWriter(stream, show_scopes)
+    if output_format == "sarif":
+        return SarifWriter(stream, show_scopes)
+    return TextWriter(stream, show_scopes, width)
@@ -0,0 +1,365 @@
+import ast
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from python_abc import archive
+from python_abc.analyze import (
+    Compact,
+    FileSkipped,
+    Options,
+    Result,
+    analyze_tree,
+    check_generated,
+    check_size,
+    describe_error,
+    expand,
+    is_generated,
+    read_source,
+    to_compact,
+)
+from python_abc.calculate import handlers
+from python_abc.executor import AnyExecutor
+from python_abc.rank import Ranking
+from python_abc.stream import stream
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak memory isn't reported
+    resource = None  # type: ignore[assignment]
+
+T = TypeVar("T")
+
+DEFAULT_SLOWEST = 10
+
+# The phases run in this process, in the order they happen, and those run by the workers
+PHASES = ("discover", "schedule", "wait", "aggregate", "output")
+WORKER_PHASES = ("read", "parse", "count")
+
+
+def peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, and macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class FileProfile(NamedTuple):
+    path: str
+    size: int
+    nodes: int
+    # Wall and CPU time of each of `WORKER_PHASES`
+    wall: Tuple[float, float, float]
+    cpu: Tuple[float, float, float]
+
+
+class BatchProfile(NamedTuple):
+    worker: str
+    wall: float
+    cpu: float
+    peak_rss_kb: Optional[int]
+    files: List[FileProfile]
+    # How many nodes of each type had a handler called on them
+    calls: Dict[str, int]
+
+
+def profile_file(
+    filename: str, options: Options, calls: Counter, data: Optional[bytes] = None
+) -> Tuple[Compact, FileProfile]:
+    """Analyze a file the way `analyze_file` does, timing each step on the way
+
+    The cache and baseline are never consulted, since the point is to time the work they'd
+    save. The contents of archive members are passed in as `data`, having been read along
+    with the rest of the batch.
+    """
+    clock, cpu_clock = time.perf_counter, time.thread_time
+    marks = [(clock(), cpu_clock())]
+    size = nodes = 0
+    tree = None
+    try:
+        source = read_source(filename, options) if data is None else data
+        size = len(source)
+        check_generated(is_generated(source), options)
+        marks.append((clock(), cpu_clock()))
+        tree = ast.parse(source)
+        marks.append((clock(), cpu_clock()))
+        payload = analyze_tree(tree, source, options)
+        marks.append((clock(), cpu_clock()))
+    except (OSError, FileSkipped) as e:
+        compact: Compact = (filename, None, None, describe_error(e), None)
+    except (SyntaxError, ValueError) as e:
+        compact = to_compact(filename, {"error": describe_error(e)}, None, options)
+    else:
+        compact = to_compact(filename, payload, None, options)
+
+    if tree is not None:
+        # Not timed, since it's only needed for the profile
+        table = handlers()
+        for node in ast.walk(tree):
+            nodes += 1
+            node_type = type(node)
+            if node_type in table:
+                calls[node_type.__name__] += 1
+
+    # Steps that were never reached took no time
+    marks.extend([marks[-1]] * (len(WORKER_PHASES) + 1 - len(marks)))
+    wall = tuple(end[0] - start[0] for start, end in zip(marks, marks[1:]))
+    cpu = tuple(end[1] - start[1] for start, end in zip(marks, marks[1:]))
+    return compact, FileProfile(filename, size, nodes, wall, cpu)  # type: ignore[arg-type]
+
+
+def profile_batch(
+    filenames: List[str], options: Options
+) -> Tuple[List[Compact], BatchProfile]:
+    calls: Counter = Counter()
+    compacts, files = [], []
+    members = archive.read_members(filenames, partial(check_size, options=options))
+    for filename in filenames:
+        data = members.get(filename)
+        if isinstance(data, Exception):
+            compact: Compact = (filename, None, None, describe_error(data), None)
+            nothing = (0.0, 0.0, 0.0)
+            profile = FileProfile(filename, 0, 0, nothing, nothing)
+        else:
+            compact, profile = profile_file(filename, options, calls, data)
+        compacts.append(compact)
+        files.append(profile)
+    # Leave out the time spent profiling, so that a worker's utilisation is what it'd be
+    # without it
+    return compacts, BatchProfile(
+        f"{os.getpid()}:{threading.current_thread().name}",
+        sum(sum(profile.wall) for profile in files),
+        sum(sum(profile.cpu) for profile in files),
+        peak_rss_kb(),
+        files,
+        dict(calls),
+    )
+
+
+class WorkerTotals:
+    def __init__(self) -> None:
+        self.batches = 0
+        self.files = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss_kb: Optional[int] = None
+
+
+class Profiler:
+    """Collects where the time goes during a scan, to be reported at the end
+
+    Time in this process is split into `PHASES`. Phases can nest, in which case the time
+    spent in the inner phase isn't also counted in the outer one. Workers report the time
+    they spent on each of `WORKER_PHASES` for every file along with their results.
+
+    Nothing here is used unless profiling was asked for, so the usual scan pays nothing for it.
+    """
+
+    def __init__(self, slowest: int = DEFAULT_SLOWEST):
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.phases: Dict[str, List[float]] = {}
+        self.worker_phases = [[0.0, 0.0] for _ in WORKER_PHASES]
+        self.workers: Dict[str, WorkerTotals] = {}
+        self.slowest: Ranking[FileProfile] = Ranking(slowest)
+        self.calls: Counter = Counter()
+        self.files = self.bytes = self.nodes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack = self._local.__dict__.setdefault("stack", [])
+        nested = [0.0, 0.0]
+        stack.append(nested)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - cpu_start
+            stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+            with self._lock:
+                totals = self.phases.setdefault(name, [0.0, 0.0])
+                totals[0] += wall - nested[0]
+                totals[1] += cpu - nested[1]
+
+    def iterate(self, items: Iterable[T], name: str) -> Iterator[T]:
+        """Yield each of `items`, counting the time spent waiting for each towards `name`"""
+        iterator = iter(items)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add_batch(self, batch: BatchProfile) -> None:
+        worker = self.workers.setdefault(batch.worker, WorkerTotals())
+        worker.batches += 1
+        worker.files += len(batch.files)
+        worker.wall += batch.wall
+        worker.cpu += batch.cpu
+        if batch.peak_rss_kb is not None:
+            worker.peak_rss_kb = max(worker.peak_rss_kb or 0, batch.peak_rss_kb)
+
+        for profile in batch.files:
+            for totals, wall, cpu in zip(self.worker_phases, profile.wall, profile.cpu):
+                totals[0] += wall
+                totals[1] += cpu
+            self.slowest.add(sum(profile.wall), profile)  # type: ignore[arg-type]
+            self.files += 1
+            self.bytes += profile.size
+            self.nodes += profile.nodes
+        self.calls.update(batch.calls)
+
+    def analyze_batches(
+        self,
+        pool: AnyExecutor,
+        batches: Iterable[List[str]],
+        options: Options,
+        ordered: bool,
+        window: int,
+    ) -> Iterator[Result]:
+        """What `analyze_files` does with its batches, with every worker profiling its work"""
+        for compacts, batch in stream(
+            pool,
+            partial(profile_batch, options=options),
+            batches,
+            ordered=ordered,
+            window=window,
+        ):
+            with self.phase("aggregate"):
+                self.add_batch(batch)
+                results = [expand(compact) for compact in compacts]
+            yield from results
+
+    def report(self) -> Dict[str, Any]:
+        """Everything that was collected, in a form that can be written as JSON"""
+        wall = time.perf_counter() - self.start
+        names = [name for name in PHASES if name in self.phases]
+        names.extend(name for name in self.phases if name not in PHASES)
+        return {
+            "wall": wall,
+            "cpu": time.process_time() - self.cpu_start,
+            "files": self.files,
+            "bytes": self.bytes,
+            "nodes": self.nodes,
+            "peak_rss_kb": peak_rss_kb(),
+            "phases": {
+                name: {"wall": self.phases[name][0], "cpu": self.phases[name][1]}
+                for name in names
+            },
+            "worker_phases": {
+                name: {"wall": totals[0], "cpu": totals[1]}
+                for name, totals in zip(WORKER_PHASES, self.worker_phases)
+            },
+            "workers": [
+                {
+                    "worker": name,
+                    "batches": worker.batches,
+                    "files": worker.files,
+                    "wall": worker.wall,
+                    "cpu": worker.cpu,
+                    "utilisation": worker.wall / wall if wall else 0.0,
+                    "peak_rss_kb": worker.peak_rss_kb,
+                }
+                for name, worker in sorted(self.workers.items())
+            ],
+            "slowest": [
+                {
+                    "path": profile.path,
+                    "wall": sum(profile.wall),
+                    "bytes": profile.size,
+                    "nodes": profile.nodes,
+                    **dict(zip(WORKER_PHASES, profile.wall)),
+                }
+                for profile in self.slowest
+            ],
+            "handler_calls": dict(self.calls.most_common()),
+        }
+
+
+class TimedWriter:
+    """Counts the time spent in every call to a writer towards the `output` phase"""
+
+    def __init__(self, writer: Any, profiler: Profiler):
+        self.writer = writer
+        self.profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.writer, name)
+
+        def timed(*args, **kwargs):
+            with self.profiler.phase("output"):
+                return method(*args, **kwargs)
+
+        return timed
+
+
+def format_kb(kb: Optional[int]) -> str:
+    return "-" if kb is None else f"{kb / 1024:.1f} MB"
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{report['wall']:.3f}s wall and {report['cpu']:.3f}s CPU in this process, "
+        f"{report['files']} files, {report['bytes']:,} bytes, {report['nodes']:,} nodes, "
+        f"peak memory {format_kb(report['peak_rss_kb'])}",
+        "",
+        f"{'phase':<16} {'wall':>10} {'cpu':>10}",
+    ]
+    for heading, phases in (
+        ("", report["phases"]),
+        ("workers: ", report["worker_phases"]),
+    ):
+        for name, times in phases.items():
+            label = f"{heading}{name}"
+            lines.append(f"{label:<16} {times['wall']:>9.3f}s {times['cpu']:>9.3f}s")
+
+    lines += [
+        "",
+        f"{'worker':<24} {'batches':>7} {'files':>7} {'busy':>9} {'cpu':>9} "
+        f"{'use':>6} {'peak memory':>12}",
+    ]
+    for worker in report["workers"]:
+        lines.append(
+            f"{worker['worker']:<24} {worker['batches']:>7} {worker['files']:>7} "
+            f"{worker['wall']:>8.3f}s {worker['cpu']:>8.3f}s "
+            f"{worker['utilisation']:>6.0%} {format_kb(worker['peak_rss_kb']):>12}"
+        )
+
+    if report["slowest"]:
+        lines += ["", "slowest files:"]
+        for profile in report["slowest"]:
+            lines.append(
+                f"{profile['wall']:>9.3f}s {profile['nodes']:>9,} nodes  {profile['path']}"
+            )
+
+    if report["handler_calls"]:
+        lines += ["", "handler calls:"]
+        for node_type, calls in report["handler_calls"].items():
+            lines.append(f"{calls:>12,}  {node_type}")
+
+    return "\n".join(lines) + "\n"
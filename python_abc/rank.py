@@ -0,0 +1,44 @@
+import heapq
+import itertools
+from typing import Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Ranking(Generic[T]):
+    """Keeps the highest scoring of the items it is given, best first
+
+    With a `limit` only that many items are ever held, in a heap, so ranking any number of
+    items needs O(`limit`) memory. Items scoring below `minimum` are dropped straight away.
+
+    Scores are the squared magnitude of a vector, which can be compared exactly because they
+    are integers, rather than the magnitude, which is rounded to one decimal place. Items with
+    equal scores keep the order in which they were added.
+    """
+
+    def __init__(self, limit: Optional[int] = None, minimum: Optional[float] = None):
+        self.limit = limit
+        self.minimum = None if minimum is None else minimum * minimum
+        self._heap: List[Tuple[int, int, T]] = []
+        self._counter = itertools.count()
+
+    def accepts(self, score: int) -> bool:
+        return self.minimum is None or score >= self.minimum
+
+    def add(self, score: int, item: T) -> None:
+        if not self.accepts(score):
+            return
+
+        # Negating the counter means that among equal scores, the latest is evicted first
+        entry = (score, -next(self._counter), item)
+        if self.limit is None or len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif self.limit > 0:
+            heapq.heappushpop(self._heap, entry)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self) -> Iterator[T]:
+        for _, _, item in sorted(self._heap, reverse=True):
+            yield item
@@ -0,0 +1,154 @@
+import math
+from typing import Dict, Iterator, List, Optional
+
+from python_abc.analyze import Result, is_skipped
+from python_abc.archive import SEPARATOR, split
+from python_abc.output import display_path
+from python_abc.vector import Vector
+
+
+def parent(path: str) -> str:
+    """The directory a path is in, where an archive is the directory of its members"""
+    parts = split(path)
+    if parts is not None:
+        archive, member = parts
+        index = member.rfind("/")
+        return archive if index == -1 else f"{archive}{SEPARATOR}{member[:index]}"
+    index = path.rfind("/")
+    return path[:index] if index > 0 else ""
+
+
+class Directory:
+    """The totals for every file under one directory
+
+    Until `Rollup.finish` folds them together, each only counts the files directly inside it.
+    """
+
+    __slots__ = (
+        "path",
+        "assignment",
+        "branch",
+        "condition",
+        "files",
+        "errors",
+        "skipped",
+        "total_magnitude",
+        "max_score",
+        "worst",
+        "children",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self.assignment = 0
+        self.branch = 0
+        self.condition = 0
+        self.files = 0
+        self.errors = 0
+        self.skipped = 0
+        self.total_magnitude = 0.0
+        # The squared magnitude of the worst file, which unlike the magnitude is exact
+        self.max_score = -1
+        self.worst: Optional[str] = None
+        self.children: List[Directory] = []
+
+    @property
+    def count(self) -> int:
+        """How many files are under this directory, however they turned out"""
+        return self.files + self.errors + self.skipped
+
+    @property
+    def vector(self) -> Vector:
+        return Vector(self.assignment, self.branch, self.condition)
+
+    @property
+    def mean(self) -> float:
+        return round(self.total_magnitude / self.files, 1) if self.files else 0.0
+
+    @property
+    def max(self) -> float:
+        return round(math.sqrt(self.max_score), 1) if self.worst is not None else 0.0
+
+    def add_worst(self, score: int, path: Optional[str]) -> None:
+        # Ties go to the first path, so the order the results came in doesn't matter
+        if path is not None and (
+            score > self.max_score
+            or (
+                score == self.max_score and self.worst is not None and path < self.worst
+            )
+        ):
+            self.max_score = score
+            self.worst = path
+
+    def add(self, other: "Directory") -> None:
+        self.assignment += other.assignment
+        self.branch += other.branch
+        self.condition += other.condition
+        self.files += other.files
+        self.errors += other.errors
+        self.skipped += other.skipped
+        self.total_magnitude += other.total_magnitude
+        self.add_worst(other.max_score, other.worst)
+
+    def walk(self) -> Iterator["Directory"]:
+        """Yield this directory and every one below it, each before its subdirectories"""
+        stack = [self]
+        while stack:
+            directory = stack.pop()
+            yield directory
+            stack.extend(reversed(directory.children))
+
+
+class Rollup:
+    """Totals up the results for every directory as they arrive
+
+    Each result is only added to the directory it's in, so the cost of adding one doesn't
+    grow with how deep it is. The directories are folded into their parents once, by
+    `finish`, which touches each directory rather than each file.
+    """
+
+    def __init__(self) -> None:
+        self.root = Directory("")
+        self.directories: Dict[str, Directory] = {"": self.root}
+
+    def directory(self, path: str) -> Directory:
+        directory = self.directories.get(path)
+        if directory is None:
+            directory = self.directories[path] = Directory(path)
+            self.directory(parent(path)).children.append(directory)
+        return directory
+
+    def add(self, result: Result) -> None:
+        path = display_path(result.path)
+        directory = self.directory(parent(path))
+        if is_skipped(result):
+            directory.skipped += 1
+            return
+        if result.vector is None:
+            directory.errors += 1
+            return
+
+        vector = result.vector
+        score = vector.get_magnitude_squared()
+        directory.assignment += vector.assignment
+        directory.branch += vector.branch
+        directory.condition += vector.condition
+        directory.files += 1
+        directory.total_magnitude += math.sqrt(score)
+        directory.add_worst(score, path)
+
+    def finish(self) -> List[Directory]:
+        """Every directory from the one all the files have in common down, in path order"""
+        directories = list(self.root.walk())
+        for directory in reversed(directories):
+            directory.children.sort(key=lambda child: child.path)
+            for child in directory.children:
+                directory.add(child)
+
+        top = self.root
+        while len(top.children) == 1:
+            child = top.children[0]
+            if child.count != top.count:
+                break
+            top = child
+        return list(top.walk())
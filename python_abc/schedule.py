@@ -0,0 +1,82 @@
+from typing import Iterable, Iterator, List, Tuple
+
+from python_abc.archive import source_size
+
+# Batches are filled until they hold about this much source, which takes a worker a few tens
+# of milliseconds to analyze, so the cost of dispatching a task is small in comparison
+DEFAULT_BATCH_BYTES = 256 * 1024
+DEFAULT_BATCH_FILES = 128
+
+Batch = List[str]
+
+
+def iter_stat_sizes(files: Iterable[str]) -> Iterator[Tuple[str, int]]:
+    for filename in files:
+        try:
+            size = source_size(filename)
+        except OSError:
+            # Let the worker report the problem when it tries to open the file
+            size = 0
+        yield filename, size
+
+
+def stat_sizes(files: Iterable[str]) -> List[Tuple[str, int]]:
+    return list(iter_stat_sizes(files))
+
+
+def batch_bytes(total_bytes: int, cores: int) -> int:
+    """Aim for at least four batches per core so that the work can still be balanced"""
+    return max(4096, min(DEFAULT_BATCH_BYTES, total_bytes // (4 * max(cores, 1))))
+
+
+def plan_batches(
+    sized: List[Tuple[str, int]],
+    cores: int,
+    keep_order: bool = True,
+    max_files: int = DEFAULT_BATCH_FILES,
+) -> List[Batch]:
+    """Group files into batches for the workers
+
+    Small files are grouped together so that the cost of dispatching a task isn't paid for
+    every one. Unless `keep_order` is set, the largest batches come first, so that a big file
+    found at the very end of a scan doesn't leave every other worker idle while it finishes
+    (longest-processing-time-first scheduling). With `keep_order` each batch holds consecutive
+    files, so results can still be reported in the order the files were found.
+    """
+    target = batch_bytes(sum(size for _, size in sized), cores)
+    if not keep_order:
+        sized = sorted(sized, key=lambda item: item[1], reverse=True)
+
+    batches = list(group(sized, target, max_files))
+    if not keep_order:
+        batches.sort(key=lambda item: item[0], reverse=True)
+
+    return [batch for _, batch in batches]
+
+
+def group(
+    sized: Iterable[Tuple[str, int]],
+    target: int = DEFAULT_BATCH_BYTES,
+    max_files: int = DEFAULT_BATCH_FILES,
+) -> Iterator[Tuple[int, Batch]]:
+    """Lazily group consecutive files into batches of about `target` bytes"""
+    batch: Batch = []
+    size_of_batch = 0
+    for filename, size in sized:
+        batch.append(filename)
+        size_of_batch += size
+        if size_of_batch >= target or len(batch) >= max_files:
+            yield size_of_batch, batch
+            batch, size_of_batch = [], 0
+    if batch:
+        yield size_of_batch, batch
+
+
+def iter_batches(
+    files: Iterable[str],
+    target: int = DEFAULT_BATCH_BYTES,
+    max_files: int = DEFAULT_BATCH_FILES,
+) -> Iterator[Batch]:
+    """Batch files as they are discovered, for when we can't wait to see them all"""
+    for _, batch in group(iter_stat_sizes(files), target, max_files):
+        yield batch
@@ -0,0 +1,116 @@
+import ast
+from typing import Iterator, List, Optional, Tuple, Union
+
+from python_abc import vector
+
+SCOPE_NODES = (ast.AsyncFunctionDef, ast.ClassDef, ast.FunctionDef)
+ScopeNode = Union[ast.AsyncFunctionDef, ast.ClassDef, ast.FunctionDef]
+
+
+class Scope:
+    """The ABC vector for one module, class or function
+
+    `exclusive` only counts the code that belongs directly to this scope, while `inclusive`
+    also counts everything in the scopes nested inside it. The vector for a module's
+    `inclusive` is the same as the one `calculate_abc` returns for the whole file.
+    """
+
+    __slots__ = (
+        "name",
+        "kind",
+        "lineno",
+        "exclusive",
+        "inclusive",
+        "children",
+        "parent",
+    )
+
+    def __init__(
+        self, name: str, kind: str, lineno: int, parent: Optional["Scope"] = None
+    ):
+        self.name = name
+        self.kind = kind
+        self.lineno = lineno
+        self.exclusive = vector.Vector(0, 0, 0)
+        self.inclusive = vector.Vector(0, 0, 0)
+        self.children: List[Scope] = []
+        self.parent = parent
+
+    def __repr__(self) -> str:
+        return f"<Scope {self.kind} {self.qualname}:{self.lineno} {self.inclusive}>"
+
+    @property
+    def qualname(self) -> str:
+        if self.parent is None or self.parent.kind == "module":
+            return self.name
+        return f"{self.parent.qualname}.{self.name}"
+
+    def add_child(self, node: ScopeNode) -> "Scope":
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        elif self.kind == "class":
+            kind = "method"
+        else:
+            kind = "function"
+
+        child = Scope(node.name, kind, node.lineno, self)
+        self.children.append(child)
+        return child
+
+    def walk(self) -> Iterator[Tuple[int, "Scope"]]:
+        """Yield every scope below this one, with its depth, in source order"""
+        stack = [(0, self)]
+        while stack:
+            depth, scope = stack.pop()
+            yield depth, scope
+            stack.extend((depth + 1, child) for child in reversed(scope.children))
+
+    def finalise(self) -> None:
+        """Put children in source order and total up the inclusive vectors"""
+        scopes = [scope for _, scope in self.walk()]
+        for scope in reversed(scopes):
+            scope.children.sort(key=lambda child: child.lineno)
+            scope.inclusive = sum(
+                (child.inclusive for child in scope.children), scope.exclusive
+            )
+
+    def to_list(self) -> list:
+        """A compact representation that can be pickled or serialised as JSON"""
+        exclusive = self.exclusive
+        return [
+            self.name,
+            self.kind,
+            self.lineno,
+            [exclusive.assignment, exclusive.branch, exclusive.condition],
+            [child.to_list() for child in self.children],
+        ]
+
+    @classmethod
+    def from_list(cls, data: list, parent: Optional["Scope"] = None) -> "Scope":
+        name, kind, lineno, exclusive, children = data
+        scope = cls(name, kind, lineno, parent)
+        scope.exclusive = vector.Vector(*exclusive)
+        scope.children = [cls.from_list(child, scope) for child in children]
+        if parent is None:
+            scope.finalise()
+        return scope
+
+
+def module() -> Scope:
+    return Scope("<module>", "module", 0)
+
+
+def body_fields(node: ast.AST) -> Iterator[Tuple[bool, ast.AST]]:
+    """Yield the children of a scope node, and whether each runs inside that scope
+
+    Decorators, default arguments, annotations and base classes are all evaluated when the
+    definition itself runs, so they belong to the enclosing scope.
+    """
+    for field, value in ast.iter_fields(node):
+        inside = field == "body"
+        if isinstance(value, list):
+            for item in value:
+                if isinstance(item, ast.AST):
+                    yield inside, item
+        elif isinstance(value, ast.AST):
+            yield inside, value
@@ -0,0 +1,61 @@
+import argparse
+import heapq
+import os
+from typing import List, NamedTuple, Tuple
+
+from python_abc.archive import split
+
+
+class Shard(NamedTuple):
+    """The `number`th of `total` shards, counting from 1"""
+
+    number: int
+    total: int
+
+
+def parse_shard(value: str) -> Shard:
+    """Parse `K/N`, for use as an argparse type"""
+    try:
+        number, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not of the form K/N: {value!r}") from None
+    if not 1 <= number <= total:
+        raise argparse.ArgumentTypeError(f"K must be between 1 and N: {value!r}")
+    return Shard(number, total)
+
+
+def path_key(path: str) -> Tuple[Tuple[int, str, str], ...]:
+    """Sorts paths in the order discovery finds them under a directory
+
+    Discovery yields the files in a directory, by name, before going into each of its
+    subdirectories, by name, and an archive's members by their full name.
+    """
+    member = ""
+    if (parts := split(path)) is not None:
+        path, member = parts
+    *directories, name = path.replace(os.sep, "/").split("/")
+    return (*((1, directory, "") for directory in directories), (0, name, member))
+
+
+def assign(sized: List[Tuple[str, int]], count: int) -> List[int]:
+    """The shard, counting from 0, that each file goes in
+
+    The largest file goes in the emptiest shard, and so on down (longest-processing-time-first
+    scheduling), with ties broken by path and then by shard. Every machine that sees the same
+    files with the same sizes makes the same choice, whatever order they were found in.
+    """
+    order = sorted(range(len(sized)), key=lambda i: (-sized[i][1], sized[i][0]))
+    shards = [(0, shard) for shard in range(count)]
+    assigned = [0] * len(sized)
+    for i in order:
+        total, shard = heapq.heappop(shards)
+        assigned[i] = shard
+        heapq.heappush(shards, (total + sized[i][1], shard))
+    return assigned
+
+
+def select(sized: List[Tuple[str, int]], shard: Shard) -> List[Tuple[str, int]]:
+    """The files in one shard, in path order so that shards can be merged as they're read"""
+    assigned = assign(sized, shard.total)
+    selected = [item for item, i in zip(sized, assigned) if i == shard.number - 1]
+    return sorted(selected, key=lambda item: path_key(item[0]))
@@ -0,0 +1,127 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Tuple,
+    TypeVar,
+)
+
+from python_abc.executor import SerialExecutor
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from queue import Queue
+
+    from python_abc.executor import AnyExecutor
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def stream(
+    executor: "AnyExecutor",
+    function: Callable[[T], R],
+    items: Iterable[T],
+    ordered: bool = True,
+    window: int = 16,
+) -> Iterator[R]:
+    """Run `function` over `items` on `executor`, yielding each result as soon as it's ready
+
+    No more than `window` items are ever in flight or waiting to be yielded, so neither the
+    items nor the results have to fit in memory. With `ordered` the results come back in the
+    same order as `items`, using the window as a reorder buffer; otherwise they come back in
+    the order they finish.
+
+    If the caller stops iterating early then any work that hasn't started is cancelled.
+    """
+    if isinstance(executor, SerialExecutor):
+        # Each task is over by the time it's submitted, so there's never anything to wait for
+        for item in items:
+            yield executor.submit(function, item).result()
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    source = enumerate(items)
+    exhausted = False
+    pending: Dict["Future", int] = {}
+    buffered: Dict[int, R] = {}
+    next_index = 0
+
+    try:
+        while True:
+            while not exhausted and len(pending) + len(buffered) < window:
+                try:
+                    index, item = next(source)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    pending[executor.submit(function, item)] = index
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                if ordered:
+                    buffered[index] = future.result()
+                else:
+                    yield future.result()
+
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def prefetch(items: Iterable[T], size: int = 1024) -> Iterator[T]:
+    """Consume `items` on a background thread, up to `size` ahead of the caller
+
+    This lets a slow producer, like a directory walk, keep going while the caller waits on
+    something else, like the workers.
+    """
+    # Only a lazy walk needs a thread, so scoring a few files doesn't wait on importing these
+    import threading
+    from queue import Full, Queue
+
+    queue: "Queue[Tuple[bool, Any]]" = Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(entry: Tuple[bool, Any]) -> bool:
+        # Give up if the caller has gone away, rather than waiting forever for space
+        while not stopped.is_set():
+            try:
+                queue.put(entry, timeout=0.1)
+            except Full:
+                continue
+            return True
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((False, item)):
+                    return
+        except BaseException as e:
+            put((True, e))
+        else:
+            put((True, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            finished, item = queue.get()
+            if finished:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stopped.set()
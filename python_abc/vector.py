@@ -41,6 +41,14 @@ class Vector:
     def as_notation(self) -> str:
         return ("a" * self.assignment) + ("b" * self.branch) + ("c" * self.condition)
 
+    def get_magnitude_squared(self) -> int:
+        """Unlike the magnitude this is exact, so it is what vectors should be ranked by"""
+        return (
+            self.assignment * self.assignment
+            + self.branch * self.branch
+            + self.condition * self.condition
+        )
+
     def get_magnitude_value(self) -> float:
         """Fitzpatrick's original paper defines the magnitude for a given vector as
 
@@ -0,0 +1,104 @@
+import ast
+from typing import Callable, Dict, Iterator, List, Tuple, Type
+
+# Fields that only ever hold identifiers, flags or operator/context singletons, none of which
+# can contain a node that contributes to the ABC vector
+LEAF_FIELDS = frozenset(
+    (
+        "arg",
+        "attr",
+        "conversion",
+        "ctx",
+        "id",
+        "is_async",
+        "kind",
+        "level",
+        "module",
+        "name",
+        "names",
+        "op",
+        "ops",
+        "simple",
+        "type_comment",
+    )
+)
+
+_child_fields: Dict[Type[ast.AST], Tuple[str, ...]] = {}
+
+
+def child_fields(node_type: Type[ast.AST]) -> Tuple[str, ...]:
+    """The fields of `node_type` that may hold nodes we need to visit"""
+    fields = _child_fields.get(node_type)
+    if fields is None:
+        fields = tuple(field for field in node_type._fields if field not in LEAF_FIELDS)
+        _child_fields[node_type] = fields
+    return fields
+
+
+def node_types() -> List[Type[ast.AST]]:
+    """Every concrete node class that `ast.parse` might produce"""
+    found = []
+    stack = [ast.AST]
+    while stack:
+        node_type = stack.pop()
+        found.append(node_type)
+        stack.extend(node_type.__subclasses__())
+    return found
+
+
+def build_table(
+    dispatcher: Callable, node_types: List[Type[ast.AST]]
+) -> Dict[type, Callable]:
+    """Resolve a `singledispatch` function for each node type up front
+
+    Node types that would fall through to the default implementation are left out of the
+    table, so they can be skipped without calling anything at all.
+
+    None of the node classes are ABCs, so the handler `singledispatch` would pick is simply
+    the one registered for the nearest class in the MRO. Looking that up directly is much
+    cheaper than calling `dispatch` for every type, which works out and caches an MRO for each.
+    """
+    registry = dispatcher.registry  # type: ignore[attr-defined]
+    default = registry[object]
+    table = {}
+    for node_type in node_types:
+        handler = next(registry[base] for base in node_type.__mro__ if base in registry)
+        if handler is not default:
+            table[node_type] = handler
+    return table
+
+
+def walk(
+    tree: ast.AST, table: Dict[type, Callable]
+) -> Iterator[Tuple[ast.AST, Callable]]:
+    """Yield every node below `tree` that has a handler in `table`, along with that handler
+
+    Unlike `ast.walk` this uses a plain list as a stack and never creates a generator per
+    node, so it is considerably faster and has no trouble with very deeply nested trees. Nodes
+    are visited depth-first rather than breadth-first.
+    """
+    AST = ast.AST
+    get_handler = table.get
+    stack = [tree]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node = pop()
+        node_type = type(node)
+
+        handler = get_handler(node_type)
+        if handler is not None:
+            yield node, handler
+
+        fields = _child_fields.get(node_type)
+        if fields is None:
+            fields = child_fields(node_type)
+        for field in fields:
+            value = getattr(node, field, None)
+            if isinstance(value, AST):
+                push(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, AST):
+                        push(item)
@@ -0,0 +1,288 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from python_abc import archive
+from python_abc.analyze import Result
+from python_abc.discover import compile_globs, discover, is_virtualenv
+
+# Saves are coalesced until nothing has changed for this long, but never held back for longer
+# than the maximum, so that something that's written continuously can't stall the view
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_MAX_DELAY = 5.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Changes(NamedTuple):
+    added: List[str]
+    modified: List[str]
+    deleted: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+
+class Session:
+    """The latest result for every file under `paths`, kept up to date as files change
+
+    Each refresh walks the tree again and compares the size and mtime of every file with the
+    last walk, which is cheap next to parsing, and only files that are new or have changed are
+    passed to `analyze`.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        analyze: Callable[[List[str]], Iterable[Result]],
+        **discover_options,
+    ):
+        self.paths = paths
+        self.analyze = analyze
+        self.discover_options = discover_options
+        self.stats: Dict[str, Tuple[int, int]] = {}
+        self.results: Dict[str, Result] = {}
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for filename in discover(self.paths, **self.discover_options):
+            try:
+                stat = archive.stat(filename)
+            except OSError:
+                continue
+            stats[filename] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def refresh(self) -> Changes:
+        stats = self.scan()
+        added = [filename for filename in stats if filename not in self.stats]
+        modified = [
+            filename
+            for filename, stat in stats.items()
+            if filename in self.stats and self.stats[filename] != stat
+        ]
+        deleted = [filename for filename in self.stats if filename not in stats]
+
+        fresh = {result.path: result for result in self.analyze(added + modified)}
+        # Keep the results in the order the files were found
+        self.results = {
+            filename: fresh.get(filename) or self.results[filename]
+            for filename in stats
+        }
+        self.stats = stats
+        return Changes(added, modified, deleted)
+
+
+class PollingWatcher:
+    """Notices changes by walking the tree every `interval` seconds"""
+
+    def __init__(
+        self,
+        scan: Callable[[], Dict[str, Tuple[int, int]]],
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.scan = scan
+        self.interval = interval
+        self.last = scan()
+
+    def wait(self) -> None:
+        """Block until something has changed and then stopped changing"""
+        changed = False
+        while True:
+            time.sleep(self.interval)
+            current = self.scan()
+            if current != self.last:
+                changed = True
+            elif changed:
+                return
+            self.last = current
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Notices changes as they happen using Linux's inotify, without any polling
+
+    Every directory that discovery would enter is watched, including any created later on.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        excluded: Optional[Pattern[str]] = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.excluded = excluded
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # The directory each watch is on, and where it is relative to the path being watched
+        self.watches: Dict[int, Tuple[str, str]] = {}
+        try:
+            for path in paths:
+                if os.path.isdir(path):
+                    self.add_tree(path, "")
+                else:
+                    self.add_watch(os.path.dirname(path) or ".", "")
+        except OSError:
+            self.close()
+            raise
+
+    def add_watch(self, directory: str, relative: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            # Most likely we've run out of watches (ENOSPC)
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"can't watch {directory}: {os.strerror(errno)}")
+        self.watches[wd] = (directory, relative)
+
+    def add_tree(self, directory: str, relative: str) -> None:
+        stack = [(directory, relative)]
+        while stack:
+            directory, relative = stack.pop()
+            try:
+                self.add_watch(directory, relative)
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                entry_relative = f"{relative}{entry.name}"
+                if entry.is_dir(follow_symlinks=False) and self.is_wanted(
+                    entry.path, entry_relative
+                ):
+                    stack.append((entry.path, f"{entry_relative}/"))
+
+    def is_wanted(self, directory: str, relative: str) -> bool:
+        if self.excluded is not None and self.excluded.fullmatch(relative):
+            return False
+        return not is_virtualenv(directory)
+
+    def read_events(self) -> Iterator[Tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, name
+
+    def handle_events(self) -> None:
+        for wd, mask, name in self.read_events():
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # A new directory, which may already have files in it by now
+                if wd in self.watches:
+                    parent, relative = self.watches[wd]
+                    directory = os.path.join(parent, name)
+                    if self.is_wanted(directory, f"{relative}{name}"):
+                        self.add_tree(directory, f"{relative}{name}/")
+
+    def wait(self) -> None:
+        """Block until something has changed and then stopped changing"""
+        select.select([self.fd], [], [])
+        self.handle_events()
+
+        # Coalesce whatever else happens in the same burst, like a branch switch
+        deadline = time.monotonic() + self.max_delay
+        while True:
+            timeout = min(self.debounce, deadline - time.monotonic())
+            if timeout <= 0:
+                return
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                return
+            self.handle_events()
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def make_watcher(
+    session: Session,
+    exclude: Iterable[str] = (),
+    poll: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL,
+) -> Watcher:
+    """Use inotify where we can, and fall back to polling where we can't"""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(session.paths, compile_globs(exclude))
+        except (OSError, AttributeError):
+            # No inotify in this libc, or not enough watches for the tree
+            pass
+    return PollingWatcher(session.scan, interval)
+
+
+def watch(
+    session: Session,
+    watcher: Watcher,
+    render: Callable[[Changes, float], None],
+) -> None:
+    """Render every result, then render them again each time some have changed"""
+    start = time.perf_counter()
+    changes = session.refresh()
+    render(changes, time.perf_counter() - start)
+    while True:
+        watcher.wait()
+        start = time.perf_counter()
+        changes = session.refresh()
+        if changes:
+            render(changes, time.perf_counter() - start)
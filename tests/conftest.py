@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    """Writes out a tree of files, returning their paths in the order they were given
+
+    The files are given as a dict of sources by relative path, or as a list of paths for
+    files that should be empty, and written under `tmp_path` unless given another `root`.
+    """
+
+    def make(files, root=None):
+        if not isinstance(files, dict):
+            files = dict.fromkeys(files, "")
+        root = tmp_path if root is None else root
+        paths = []
+        for name, source in files.items():
+            path = root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(source)
+            paths.append(str(path))
+        return paths
+
+    return make
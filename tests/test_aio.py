@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from python_abc import aio
+from python_abc.analyze import Options
+
+
+class SlowExecutor(ThreadPoolExecutor):
+    """Takes a while to start each task, and counts how many it has at once"""
+
+    def __init__(self, delay: float):
+        super().__init__(max_workers=8)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        def slowly():
+            with self.lock:
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+            try:
+                time.sleep(self.delay)
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        return super().submit(slowly)
+
+
+TREE = {f"module{i}.py": "x = 1\n" * (i + 1) for i in range(10)}
+
+
+def test_score_source():
+    async def main():
+        async with aio.AsyncAnalyzer("thread", workers=2) as analyzer:
+            return await asyncio.gather(
+                analyzer.score_source("x = 1\n"),
+                analyzer.score_source("def f(:\n", name="broken.py"),
+            )
+
+    scored, broken = asyncio.run(main())
+    assert str(scored.vector) == "<1, 0, 0>"
+    assert broken.path == "broken.py"
+    assert broken.error == "invalid syntax (line 1)"
+
+
+def test_analyze_file_with_scopes(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("def f():\n    return g()\n")
+
+    async def main():
+        analyzer = aio.AsyncAnalyzer("serial", options=Options(scopes=True))
+        return await analyzer.analyze_file(str(path))
+
+    result = asyncio.run(main())
+    assert str(result.vector) == "<0, 1, 0>"
+    assert [scope.qualname for _, scope in result.scope.walk()] == ["<module>", "f"]
+
+
+def test_analyze_paths_streams_every_file(tmp_path, make_tree):
+    files = sorted(make_tree(TREE))
+
+    async def main():
+        async with aio.AsyncAnalyzer("thread", workers=2) as analyzer:
+            return [result async for result in analyzer.analyze_paths([str(tmp_path)])]
+
+    results = asyncio.run(main())
+    assert sorted(result.path for result in results) == files
+
+
+def test_limit_is_shared_between_requests():
+    executor = SlowExecutor(0.05)
+
+    async def main():
+        analyzer = aio.AsyncAnalyzer(executor, limit=2)
+        await asyncio.gather(*(analyzer.score_source("x = 1\n") for _ in range(6)))
+
+    asyncio.run(main())
+    executor.shutdown()
+    assert executor.most_running == 2
+
+
+def test_timeout():
+    executor = SlowExecutor(0.5)
+
+    async def main():
+        analyzer = aio.AsyncAnalyzer(executor, limit=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await analyzer.score_source("x = 1\n", timeout=0.05)
+        # The limit is held until the worker is really done
+        assert analyzer.semaphore.locked()
+
+    asyncio.run(main())
+    executor.shutdown()
+
+
+def test_analyze_paths_timeout(tmp_path, make_tree):
+    make_tree(TREE)
+    executor = SlowExecutor(0.5)
+
+    async def main():
+        analyzer = aio.AsyncAnalyzer(executor)
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in analyzer.analyze_paths([str(tmp_path)], timeout=0.05):
+                pass
+
+    asyncio.run(main())
+    executor.shutdown()
+
+
+def test_shared_process_pool():
+    async def main():
+        return await aio.score_source("if a:\n    b()\n")
+
+    assert str(asyncio.run(main()).vector) == "<0, 1, 1>"
+    assert aio.shared_analyzer() is aio.shared_analyzer()
@@ -0,0 +1,217 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import python_abc
+from python_abc import analyze
+from python_abc.analyze import (
+    Options,
+    analyze_file,
+    analyze_files,
+    analyze_paths,
+    expand,
+)
+from python_abc.cache import ResultCache
+from python_abc.executor import SERIAL_MAX_BYTES, SerialExecutor, choose_executor
+
+
+def tree(count=20):
+    sources = {
+        f"package{i % 3}/module{i:02}.py": "x = 1\n" * (i + 1) for i in range(count)
+    }
+    sources["broken.py"] = "def f(:\n"
+    return sources
+
+
+@pytest.mark.parametrize("executor", ["auto", "serial", "thread", "process"])
+def test_analyze_paths(tmp_path, executor, make_tree):
+    files = sorted(make_tree(tree()))
+    results = list(analyze_paths([str(tmp_path)], executor=executor, workers=2))
+
+    assert sorted(result.path for result in results) == files
+    by_name = {result.path.rsplit("/", 1)[-1]: result for result in results}
+    assert str(by_name["module04.py"].vector) == "<5, 0, 0>"
+    assert by_name["broken.py"].vector is None
+    assert by_name["broken.py"].error == "invalid syntax (line 1)"
+
+
+def test_analyze_files_keeps_order_on_a_given_executor(make_tree):
+    files = sorted(make_tree(tree()))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = analyze_files(reversed(files), executor=pool, window=2)
+        assert [result.path for result in results] == files[::-1]
+
+
+def test_unordered_results_cover_every_file(make_tree):
+    files = sorted(make_tree(tree()))
+    results = analyze_files(files, executor="thread", ordered=False)
+    assert sorted(result.path for result in results) == files
+
+
+def test_scopes_are_optional(make_tree):
+    [module, _] = make_tree(tree(count=1))
+    [plain] = analyze_files([module], executor="serial")
+    [scoped] = analyze_files([module], executor="serial", options=Options(scopes=True))
+
+    assert plain.scope is None
+    assert scoped.scope is not None
+    assert str(scoped.scope.inclusive) == str(plain.vector)
+
+
+def test_closing_early_stops_consuming_files(make_tree):
+    files = make_tree(tree(count=500))
+    consumed = []
+
+    def tracked():
+        for file in files:
+            consumed.append(file)
+            yield file
+
+    results = analyze_files(tracked(), executor="serial", window=1, lazy=True)
+    next(results)
+    results.close()
+
+    assert len(consumed) < len(files)
+
+
+def test_unknown_executor_is_rejected_straight_away():
+    with pytest.raises(ValueError):
+        analyze_files([], executor="gpu")
+
+
+def test_choose_executor():
+    assert choose_executor(8, 1, 10 * SERIAL_MAX_BYTES) == "serial"
+    assert choose_executor(8, 100, SERIAL_MAX_BYTES - 1) == "serial"
+    assert choose_executor(1, 100, 10 * SERIAL_MAX_BYTES) == "serial"
+    assert choose_executor(8, 100, 10 * SERIAL_MAX_BYTES) == "process"
+    # Without knowing the size of the job, assume it's worth starting the pool
+    assert choose_executor(8) == "process"
+
+
+def test_auto_analyzes_a_small_tree_in_process(monkeypatch, make_tree):
+    chosen = []
+    get_executor = analyze.get_executor
+
+    def spy(executor, workers):
+        chosen.append(executor)
+        return get_executor(executor, workers)
+
+    monkeypatch.setattr(analyze, "get_executor", spy)
+    files = sorted(make_tree(tree()))
+    assert len(list(analyze_files(files, workers=4))) == len(files)
+    assert chosen == ["serial"]
+
+
+def test_scoring_one_file_does_not_start_a_pool(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\n")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "python_abc", str(module)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    imported = {
+        line.rsplit("|", 1)[-1].strip()
+        for line in completed.stderr.decode().splitlines()
+    }
+    assert b"<1, 0, 0>" in completed.stdout
+    unneeded = {
+        "joblib",
+        "multiprocessing",
+        "asyncio",
+        "ctypes",
+        "sqlite3",
+        "tarfile",
+        "zipfile",
+        "csv",
+        "concurrent.futures",
+        "logging",
+        "hashlib",
+        "threading",
+        "python_abc.cache",
+    }
+    assert not unneeded & imported
+
+
+def test_scoring_one_file_takes_well_under_100ms(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\n")
+    # Let the bytecode be cached, as it would be for an installed copy
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "python_abc", str(module)],
+            stdout=subprocess.DEVNULL,
+            env=env,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    assert min(timings) < 0.1
+
+
+def test_encoding_declarations_are_honoured(tmp_path):
+    declared = tmp_path / "declared.py"
+    declared.write_bytes("# -*- coding: latin-1 -*-\nname = 'café'\n".encode("latin-1"))
+    bom = tmp_path / "bom.py"
+    bom.write_bytes(b"\xef\xbb\xbfname = '\xc3\xa9'\n")
+    undeclared = tmp_path / "undeclared.py"
+    undeclared.write_bytes("name = 'café'\n".encode("latin-1"))
+
+    for options in (Options(), Options(digests=True)):
+        assert str(expand(analyze_file(str(declared), options)).vector) == "<1, 0, 0>"
+        assert str(expand(analyze_file(str(bom), options)).vector) == "<1, 0, 0>"
+        # Without a declaration, source has to be UTF-8
+        assert expand(analyze_file(str(undeclared), options)).vector is None
+
+
+def test_verbose_output_decodes_declared_encodings(tmp_path, capsys):
+    declared = tmp_path / "declared.py"
+    declared.write_bytes("# coding: latin-1\nname = 'café'\n".encode("latin-1"))
+    analyze_file(str(declared), Options(verbose=True))
+    assert "name = 'café'" in capsys.readouterr().out
+
+
+def test_large_files_are_skipped(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\n" * 10)
+    for options in (Options(max_file_size=59), Options(max_file_size=59, digests=True)):
+        result = expand(analyze_file(str(module), options))
+        assert result.vector is None
+        assert result.error == "skipped, 60 bytes is over the limit of 59"
+
+    for options in (Options(max_file_size=60), Options(max_file_size=0)):
+        assert expand(analyze_file(str(module), options)).vector is not None
+
+
+def test_generated_files_can_be_skipped(tmp_path):
+    module = tmp_path / "module_pb2.py"
+    module.write_text("# @generated by a tool\nx = 1\n")
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    # Scored unless asked otherwise, and remembered as generated in the cache
+    assert expand(analyze_file(str(module), Options(cache=cache))).vector is not None
+    for options in (
+        Options(skip_generated=True),
+        Options(skip_generated=True, cache=cache),
+    ):
+        result = expand(analyze_file(str(module), options))
+        assert result.error == "skipped, the file is marked as generated"
+
+
+def test_serial_executor_captures_exceptions():
+    future = SerialExecutor().submit(int, "not a number")
+    with pytest.raises(ValueError):
+        future.result()
+    assert SerialExecutor().submit(int, "3").result() == 3
+
+
+def test_public_api_is_exported():
+    assert python_abc.analyze_paths is analyze_paths
+    assert str(python_abc.calculate_abc("x = 1\n")) == "<1, 0, 0>"
@@ -0,0 +1,96 @@
+import ast
+import io
+import subprocess
+import sys
+import time
+from textwrap import dedent
+
+from python_abc.annotate import Section, annotate, marks, sections
+
+SOURCE = dedent(
+    """\
+    class Thing:
+        def method(self, a):
+            if a < 1:
+                x = f(a)
+
+            def inner():
+                return g(<tag>)
+
+    def function(b):
+        return b and c
+    """
+).replace("<tag>", "'<tag>'")
+
+
+def test_text_marks_each_line():
+    out = io.StringIO()
+    annotate("if a and b:\n    print(a)\nx = y\n", out)
+    assert out.getvalue().split("\n") == [
+        "cc | if a and b:",
+        "b  |     print(a)",
+        "a  | x = y",
+        "   | ",
+        "",
+    ]
+
+
+def test_busy_lines_are_shown_as_numbers():
+    assert marks(1, 2, 0) == "abb"
+    assert marks(2, 11, 0) == "2a 11b"
+
+
+def test_sections():
+    assert sections(ast.parse(SOURCE)) == [
+        Section("Thing", "class", 1, 7),
+        Section("Thing.method", "method", 2, 7),
+        Section("Thing.method.inner", "function", 6, 7),
+        Section("function", "function", 9, 10),
+    ]
+
+
+def test_html_folds_every_class_and_function():
+    out = io.StringIO()
+    annotate(SOURCE, out, "html", "module.py")
+    page = out.getvalue()
+
+    assert page.startswith("<!DOCTYPE html>")
+    assert page.count("<details open>") == page.count("</details>") == 4
+    assert "function Thing.method.inner" in page
+    assert "return g('&lt;tag&gt;')" in page
+    # The busiest line is the hottest, and lines that count for nothing aren't shaded
+    assert '<div class="h9"><a class="n" id="L10"' in page
+    assert '<div class="h0"><a class="n" id="L5"' in page
+    # Everything is inline, so the page can be opened on its own
+    assert "<script" not in page and "<link" not in page
+
+
+def test_long_files_are_quick_to_render():
+    line = "if a and b:\n    x = f(y, z)\n"
+    source = "def f():\n" + "    " + line.replace("\n", "\n    ") * 25_000
+    out = io.StringIO()
+    start = time.perf_counter()
+    annotate(source, out, "html")
+    assert time.perf_counter() - start < 30
+    assert out.getvalue().count('<div class="h') == source.count("\n") + 1
+
+
+def test_command_line(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_bytes("# coding: latin-1\nname = 'café'\n".encode("latin-1"))
+    page = tmp_path / "module.html"
+    subprocess.run(
+        [sys.executable, "-m", "python_abc.annotate", str(module), "--format", "html"]
+        + ["--output", str(page)],
+        check=True,
+    )
+    assert "name = 'café'" in page.read_text(encoding="utf-8")
+
+    module.write_text("def f(:\n")
+    completed = subprocess.run(
+        [sys.executable, "-m", "python_abc.annotate", str(module)],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert completed.returncode == 1
+    assert "line 1" in completed.stderr
@@ -0,0 +1,106 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from python_abc import archive
+from python_abc.analyze import Options, analyze_file, analyze_files, expand
+from python_abc.cache import ResultCache
+from python_abc.discover import discover
+
+CORE = "if a and b:\n    f(x)\n"
+
+
+def make_wheel(tmp_path):
+    path = tmp_path / "pkg-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("pkg/__init__.py", "x = 1\n")
+        z.writestr("pkg/core.py", CORE)
+        z.writestr("pkg/__pycache__/core.py", "y = 2\n")
+        z.writestr("pkg-1.0.dist-info/METADATA", "Name: pkg\n")
+    return str(path)
+
+
+def make_sdist(tmp_path):
+    path = tmp_path / "pkg-1.0.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in (
+            ("pkg-1.0/setup.py", b"setup(name='pkg')\n"),
+            ("pkg-1.0/pkg/core.py", CORE.encode()),
+        ):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def test_split():
+    assert archive.split("dist/pkg.whl!pkg/core.py") == ("dist/pkg.whl", "pkg/core.py")
+    assert archive.split("we!rd/pkg.tar.gz!a/b.py") == ("we!rd/pkg.tar.gz", "a/b.py")
+    assert archive.split("pkg/core.py") is None
+    assert archive.split("pkg.whl") is None
+
+
+def test_discover_searches_archives_like_directories(tmp_path):
+    wheel, sdist = make_wheel(tmp_path), make_sdist(tmp_path)
+    assert list(discover([wheel, sdist])) == [
+        f"{wheel}!pkg/__init__.py",
+        f"{wheel}!pkg/core.py",
+        f"{sdist}!pkg-1.0/pkg/core.py",
+        f"{sdist}!pkg-1.0/setup.py",
+    ]
+    assert list(discover([wheel], exclude=["pkg"])) == []
+    assert list(discover([sdist], include=["setup.py"])) == [
+        f"{sdist}!pkg-1.0/setup.py"
+    ]
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_members_are_analyzed_without_extracting(tmp_path, executor):
+    files = list(discover([make_wheel(tmp_path), make_sdist(tmp_path)]))
+    results = list(analyze_files(files, executor, 2))
+    assert [result.path for result in results] == files
+    assert [str(result.vector) for result in results] == [
+        "<1, 0, 0>",
+        "<0, 1, 2>",
+        "<0, 1, 2>",
+        "<0, 1, 0>",
+    ]
+
+
+def test_a_single_member_can_be_analyzed(tmp_path):
+    member = f"{make_sdist(tmp_path)}!pkg-1.0/pkg/core.py"
+    assert str(expand(analyze_file(member, Options())).vector) == "<0, 1, 2>"
+
+    result = expand(analyze_file(f"{member}x", Options()))
+    assert result.vector is None
+    assert result.error.startswith("pkg-1.0/pkg/core.pyx isn't in ")
+
+
+def test_members_are_cached_along_with_their_archive(tmp_path):
+    files = list(discover([make_wheel(tmp_path)]))
+    options = Options(cache=ResultCache(str(tmp_path / "cache")))
+
+    def scores(results):
+        return [(result.path, str(result.vector)) for result in results]
+
+    expected = scores(analyze_files(files, "serial"))
+    assert scores(analyze_files(files, "serial", options=options)) == expected
+    assert scores(analyze_files(files, "serial", options=options)) == expected
+
+
+def test_large_members_are_skipped(tmp_path):
+    member = f"{make_wheel(tmp_path)}!pkg/core.py"
+    result = expand(analyze_file(member, Options(max_file_size=5)))
+    assert result.error == "skipped, 21 bytes is over the limit of 5"
+
+
+def test_broken_archives_are_reported(tmp_path):
+    broken = tmp_path / "broken.zip"
+    broken.write_bytes(b"not a zip")
+    assert list(discover([str(broken)])) == [str(broken)]
+
+    (result,) = analyze_files([str(broken)], "serial")
+    assert result.vector is None
+    assert result.error == f"can't read {broken}: File is not a zip file"
@@ -0,0 +1,167 @@
+import pytest
+
+from python_abc import analyze
+from python_abc.analyze import Options, Result, analyze_file, analyze_files, expand
+from python_abc.baseline import (
+    Baseline,
+    BaselineError,
+    BaselineWriter,
+    compare,
+    is_regression,
+)
+from python_abc.calculate import calculate_abc_by_scope
+from python_abc.cache import ResultCache, content_digest
+from python_abc.vector import Vector
+
+BEFORE = """\
+def f(x):
+    return g(x)
+
+def h():
+    pass
+"""
+
+AFTER = """\
+def f(x):
+    if x:
+        return g(x)
+
+def h():
+    pass
+
+def k():
+    y = 1
+"""
+
+
+def result(path: str, source: str) -> Result:
+    module = calculate_abc_by_scope(source)
+    return Result(
+        path, module.inclusive, module, digest=content_digest(source.encode())
+    )
+
+
+def write(path, results) -> Baseline:
+    for _ in BaselineWriter(str(path)).record(results):
+        pass
+    return Baseline(str(path))
+
+
+def test_baseline_round_trip(tmp_path):
+    baseline = write(
+        tmp_path / "abc.db",
+        [result("./pkg/a.py", BEFORE), Result("bad.py", None, error="oops")],
+    )
+
+    entry = baseline.get("pkg/a.py")
+    assert entry is not None
+    assert str(entry.vector) == "<0, 1, 0>"
+    assert [scope.qualname for _, scope in entry.scope.walk()] == ["<module>", "f", "h"]
+    assert baseline.get("bad.py").payload == {"error": "oops"}
+    assert baseline.get("missing.py") is None
+    baseline.close()
+
+
+def test_compare_reports_new_changed_and_regressed(tmp_path):
+    baseline = write(tmp_path / "abc.db", [result("a.py", BEFORE), result("b.py", "")])
+
+    changes = list(
+        compare(
+            baseline,
+            [result("a.py", AFTER), result("b.py", ""), result("c.py", "z = 1\n")],
+        )
+    )
+    assert [(c.path, c.qualname, c.status) for c in changes] == [
+        ("a.py", None, "M"),
+        ("a.py", "f", "M"),
+        ("a.py", "k", "A"),
+        ("c.py", None, "A"),
+    ]
+    assert [is_regression(change) for change in changes] == [True, True, False, False]
+    baseline.close()
+
+
+def test_improvements_are_not_regressions(tmp_path):
+    baseline = write(tmp_path / "abc.db", [result("a.py", AFTER)])
+
+    changes = list(compare(baseline, [result("a.py", BEFORE)]))
+    assert [(c.qualname, c.status) for c in changes] == [(None, "M"), ("f", "M")]
+    assert not any(is_regression(change) for change in changes)
+    baseline.close()
+
+
+def test_unchanged_files_are_reused_without_parsing(tmp_path, monkeypatch):
+    source = tmp_path / "a.py"
+    source.write_text(BEFORE)
+    baseline = write(tmp_path / "abc.db", [result(str(source), BEFORE)])
+
+    def fail(*args):
+        raise AssertionError("should not be parsed")
+
+    monkeypatch.setattr(analyze, "analyze_source", fail)
+    options = Options(scopes=True, baseline=baseline)
+    reused = expand(analyze_file(str(source), options))
+    assert str(reused.vector) == "<0, 1, 0>"
+    assert reused.digest == content_digest(BEFORE.encode())
+    assert list(compare(baseline, [reused])) == []
+    baseline.close()
+
+
+def test_baseline_is_only_written_once_complete(tmp_path):
+    path = tmp_path / "abc.db"
+
+    def broken():
+        yield Result("a.py", Vector(1, 0, 0))
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        for _ in BaselineWriter(str(path)).record(broken()):
+            pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_or_invalid_baseline(tmp_path):
+    with pytest.raises(BaselineError):
+        Baseline(str(tmp_path / "missing.db")).open()
+
+    (tmp_path / "junk.db").write_text("not a database")
+    with pytest.raises(BaselineError):
+        Baseline(str(tmp_path / "junk.db")).open()
+
+
+def test_thread_executor_with_cache_and_baseline(tmp_path):
+    files = []
+    for i in range(20):
+        source = tmp_path / f"m{i}.py"
+        source.write_text(BEFORE if i % 2 else AFTER)
+        files.append(str(source))
+    baseline = write(tmp_path / "abc.db", [result(file, BEFORE) for file in files[::2]])
+    cache = ResultCache(str(tmp_path / "cache"))
+    options = Options(scopes=True, cache=cache, baseline=baseline)
+
+    for _ in range(2):
+        results = list(analyze_files(files, "thread", 4, options))
+        assert [r.path for r in results] == files
+        assert all(r.vector is not None for r in results)
+    baseline.close()
+    cache.close()
+
+
+def test_losing_a_score_is_a_regression(tmp_path):
+    baseline = write(tmp_path / "abc.db", [result("a.py", AFTER), result("b.py", "")])
+
+    changes = list(
+        compare(
+            baseline,
+            [
+                Result("a.py", None, error="invalid syntax (line 1)"),
+                Result("b.py", None, error="skipped, the file is marked as generated"),
+            ],
+        )
+    )
+    assert [(c.path, c.status, c.new) for c in changes] == [
+        ("a.py", "M", None),
+        ("b.py", "M", None),
+    ]
+    assert all(is_regression(change) for change in changes)
+    baseline.close()
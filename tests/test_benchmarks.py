@@ -0,0 +1,69 @@
+import ast
+
+from benchmarks.corpus import PROFILES, Profile, generate_corpus, generate_sources
+from benchmarks.suite import bench_calculate, compare, mismatches
+
+
+def results(benchmarks, **meta):
+    return {"format": 1, "seed": 0, "corpora": {}, **meta, "benchmarks": benchmarks}
+
+
+def test_corpus_is_the_same_for_the_same_seed():
+    profile = PROFILES["small"]._replace(files=20)
+    assert generate_sources(profile, seed=1) == generate_sources(profile, seed=1)
+    assert generate_sources(profile, seed=1) != generate_sources(profile, seed=2)
+
+
+def test_corpus_is_valid_python_of_the_requested_shape():
+    profile = Profile(files=5, statements=200, depth=3)
+    for source in generate_sources(profile):
+        tree = ast.parse(source)
+        compile(tree, "<generated>", "exec")
+        indents = [len(line) - len(line.lstrip()) for line in source.splitlines()]
+        # Compound statements at the deepest level still have a body one level further in
+        assert max(indents) <= 4 * (profile.depth + 1)
+
+
+def test_generate_corpus_writes_every_file(tmp_path):
+    profile = Profile(files=60, statements=5, depth=1)
+    files = generate_corpus(str(tmp_path), profile)
+    assert len(files) == 60
+    assert len({path.parent for path in tmp_path.rglob("*.py")}) == 2
+
+
+def test_bench_calculate_counts_nodes():
+    metrics = bench_calculate(["x = 1\n"], repeat=1)
+    # Module, Assign, Name, Store and Constant
+    assert metrics["nodes"] == 5
+    assert metrics["nodes_per_sec"] > 0
+
+
+def test_compare_flags_regressions_in_both_directions():
+    old = results(
+        {
+            "cli/small/auto": {"seconds": 1.0, "files_per_sec": 100.0, "files": 100},
+            "calculate/small": {"nodes_per_sec": 1000.0},
+            "removed": {"seconds": 1.0},
+        }
+    )
+    new = results(
+        {
+            "cli/small/auto": {"seconds": 1.05, "files_per_sec": 50.0, "files": 200},
+            "calculate/small": {"nodes_per_sec": 2000.0},
+            "added": {"seconds": 1.0},
+        }
+    )
+    statuses = {
+        (c.benchmark, c.metric): c.status for c in compare(old, new, threshold=0.1)
+    }
+    assert statuses == {
+        ("cli/small/auto", "seconds"): "unchanged",
+        ("cli/small/auto", "files_per_sec"): "regression",
+        ("calculate/small", "nodes_per_sec"): "improvement",
+    }
+
+
+def test_mismatched_runs_are_reported():
+    old = results({}, corpora={"small": "abc"}, cpu_count=4)
+    new = results({}, corpora={"small": "def"}, cpu_count=4)
+    assert mismatches(old, new) == [("corpus small", "abc", "def")]
@@ -0,0 +1,48 @@
+import os
+
+from python_abc import cache
+
+
+def test_cache_round_trip(tmp_path):
+    source = tmp_path / "source.py"
+    source.write_text("a = 1\n")
+    stat = os.stat(source)
+    digest = cache.content_digest(source.read_bytes())
+
+    result_cache = cache.ResultCache(str(tmp_path / "cache"))
+    assert result_cache.get_by_stat(str(source), stat) == (False, None)
+
+    result_cache.put(str(source), stat, digest, [1, 0, 0])
+    assert result_cache.get_by_stat(str(source), stat) == (True, [1, 0, 0])
+
+    # Identical content under another path is found by its digest
+    assert result_cache.get_by_stat("copy.py", stat) == (False, None)
+    assert result_cache.get_by_digest("copy.py", stat, digest) == (True, [1, 0, 0])
+    assert result_cache.get_by_stat("copy.py", stat) == (True, [1, 0, 0])
+    result_cache.close()
+
+
+def test_cache_is_invalidated_by_a_new_cache_key(tmp_path, monkeypatch):
+    stat = os.stat(tmp_path)
+    result_cache = cache.ResultCache(str(tmp_path))
+    result_cache.put("file.py", stat, "digest", [1, 2, 3])
+    result_cache.close()
+
+    monkeypatch.setattr(cache, "CACHE_KEY", "a different version")
+    assert result_cache.get_by_stat("file.py", stat) == (False, None)
+    result_cache.close()
+
+
+def test_evict_removes_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+
+    stat = os.stat(tmp_path)
+    result_cache = cache.ResultCache(str(tmp_path), max_bytes=len("[1,2,3]"))
+    result_cache.put("old.py", stat, "old", [1, 2, 3])
+    result_cache.put("new.py", stat, "new", [4, 5, 6])
+
+    assert result_cache.evict() == 1
+    assert result_cache.get_by_digest("old.py", stat, "old") == (False, None)
+    assert result_cache.get_by_digest("new.py", stat, "new") == (True, [4, 5, 6])
+    result_cache.close()
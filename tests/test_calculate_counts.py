@@ -0,0 +1,36 @@
+import ast
+from textwrap import dedent
+
+import pytest
+
+from python_abc import calculate
+from tests.test_calculate_assignment import ASSIGNMENT_CASES
+from tests.test_calculate_branch import BRANCH_CASES
+from tests.test_calculate_condition import CONDITION_CASES
+from tests.test_calculate_empty import EMPTY_CASES
+from tests.test_radon_test_cases import RADON_CASES
+
+SOURCES = [
+    dedent(source)
+    for source, _ in (
+        ASSIGNMENT_CASES + BRANCH_CASES + CONDITION_CASES + EMPTY_CASES + RADON_CASES
+    )
+]
+
+
+def test_every_handler_has_a_counter():
+    assert calculate.counters().keys() == calculate.handlers().keys()
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_counts_match_handlers(source):
+    tree = ast.parse(source)
+    expected = [0, 0, 0]
+    for node in ast.walk(tree):
+        for v in calculate.calculate_abc_for_node(node):
+            if getattr(v, "lineno", 0):
+                expected[0] += v.assignment
+                expected[1] += v.branch
+                expected[2] += v.condition
+
+    assert calculate.calculate_abc_counts(source) == tuple(expected)
@@ -0,0 +1,61 @@
+from textwrap import dedent
+
+from python_abc import calculate
+from python_abc.scope import Scope
+
+SOURCE = dedent(
+    """\
+    import functools
+
+    x = 1
+
+    @functools.cache
+    def f(n=g()):
+        def inner(n):
+            return n ** 2
+        if n == 0:
+            return 1
+        return inner(n)
+
+    class Hello(Base()):
+        greeting = "hello"
+
+        def hello(self, name):
+            print(self.greeting, name)
+
+        async def goodbye(self):
+            await close()
+    """
+)
+
+
+def summarise(module: Scope):
+    return [
+        (depth, scope.qualname, scope.kind, str(scope.exclusive), str(scope.inclusive))
+        for depth, scope in module.walk()
+    ]
+
+
+def test_scopes():
+    module = calculate.calculate_abc_by_scope(SOURCE)
+
+    assert summarise(module) == [
+        (0, "<module>", "module", "<1, 2, 0>", "<2, 5, 1>"),
+        (1, "f", "function", "<0, 1, 1>", "<0, 1, 1>"),
+        (2, "f.inner", "function", "<0, 0, 0>", "<0, 0, 0>"),
+        (1, "Hello", "class", "<1, 0, 0>", "<1, 2, 0>"),
+        (2, "Hello.hello", "method", "<0, 1, 0>", "<0, 1, 0>"),
+        (2, "Hello.goodbye", "method", "<0, 1, 0>", "<0, 1, 0>"),
+    ]
+
+
+def test_module_scope_matches_calculate_abc():
+    module = calculate.calculate_abc_by_scope(SOURCE)
+
+    assert str(module.inclusive) == str(calculate.calculate_abc(SOURCE))
+
+
+def test_scopes_round_trip():
+    module = calculate.calculate_abc_by_scope(SOURCE)
+
+    assert summarise(Scope.from_list(module.to_list())) == summarise(module)
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+from python_abc import daemon
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = str(tmp_path / "abc.sock")
+    server = daemon.Daemon(workers=1, executor="thread")
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(path),))
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.01)
+
+    yield path
+
+    list(daemon.request(daemon.connect(path), {"stop": True}))
+    thread.join(timeout=5)
+    assert not os.path.exists(path)
+
+
+def test_files_are_scored_and_remembered(socket_path, tmp_path):
+    source = tmp_path / "a.py"
+    source.write_text("x = 1\n")
+    files = [str(source), str(tmp_path / "missing.py")]
+
+    [first, missing] = daemon.analyze_files(daemon.connect(socket_path), files)
+    assert first.path == str(source)
+    assert str(first.vector) == "<1, 0, 0>"
+    assert missing.vector is None
+    assert missing.error.startswith("FileNotFoundError")
+
+    # A new mtime means the file is scored again rather than answered from memory
+    source.write_text("x = 1\ny = 2\n")
+    os.utime(source, ns=(0, 10**9))
+    [second] = daemon.analyze_files(daemon.connect(socket_path), files[:1])
+    assert str(second.vector) == "<2, 0, 0>"
+
+
+def test_relative_paths_are_kept(socket_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "b.py").write_text("def f():\n    return g()\n")
+
+    [result] = daemon.analyze_files(daemon.connect(socket_path), ["b.py"], scopes=True)
+    assert result.path == "b.py"
+    assert [scope.qualname for _, scope in result.scope.walk()] == ["<module>", "f"]
+
+
+def test_source(socket_path):
+    message = {"source": "if a:\n    b = 1\n", "name": "snippet.py"}
+    for _ in range(2):
+        [compact] = daemon.request(daemon.connect(socket_path), message)
+        assert compact[:2] == ["snippet.py", [1, 0, 1]]
+
+
+def test_score_source(socket_path):
+    source = "class C:\n    def m(self):\n        return f()\n"
+    result = daemon.score_source(daemon.connect(socket_path), source, "c.py", scopes=True)
+    assert (result.path, str(result.vector)) == ("c.py", "<0, 1, 0>")
+    assert [scope.qualname for _, scope in result.scope.walk()][1:] == ["C", "C.m"]
+
+
+def test_stdin_is_scored_on_the_daemon(socket_path):
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "python_abc",
+            "--stdin-filename",
+            "snippet.py",
+            "--daemon",
+            "--daemon-socket",
+            socket_path,
+        ],
+        input="# -*- coding: latin-1 -*-\nname = 'café'\n".encode("latin-1"),
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert completed.stdout.split() == [b"snippet.py", b"<1,", b"0,", b"0>", b"(1.0)"]
+
+
+def test_bad_request(socket_path):
+    with pytest.raises(daemon.DaemonError):
+        list(daemon.request(daemon.connect(socket_path), {"nonsense": True}))
+
+
+def test_only_one_daemon_per_socket(socket_path):
+    with pytest.raises(daemon.DaemonError):
+        daemon.remove_stale_socket(socket_path)
+
+
+def test_connect_without_a_daemon(tmp_path):
+    with pytest.raises(OSError):
+        daemon.connect(str(tmp_path / "nobody.sock"))
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_files_given_twice(socket_path, tmp_path, ordered):
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text("x = 1\n")
+    files = [str(tmp_path / name) for name in ("a.py", "b.py", "a.py")]
+
+    results = list(
+        daemon.analyze_files(daemon.connect(socket_path), files, ordered=ordered)
+    )
+    assert sorted(result.path for result in results) == sorted(files)
+    if ordered:
+        assert [result.path for result in results] == files
+
+
+def test_files_are_skipped_as_asked(socket_path, tmp_path):
+    source = tmp_path / "a.py"
+    source.write_text("# @generated\nx = 1\n")
+    files = [str(source)]
+
+    [result] = daemon.analyze_files(daemon.connect(socket_path), files)
+    assert str(result.vector) == "<1, 0, 0>"
+    [result] = daemon.analyze_files(
+        daemon.connect(socket_path), files, skip_generated=True
+    )
+    assert result.error == "skipped, the file is marked as generated"
+    [result] = daemon.analyze_files(daemon.connect(socket_path), files, max_file_size=5)
+    assert result.error.startswith("skipped, 19 bytes is over the limit")
+
+
+def test_only_we_can_use_the_socket(socket_path):
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+
+def test_a_daemon_run_by_someone_else_is_refused(socket_path, monkeypatch):
+    monkeypatch.setattr(daemon, "peer_uid", lambda sock, path: os.getuid() + 1)
+    with pytest.raises(daemon.DaemonError, match="another user"):
+        daemon.connect(socket_path)
+
+
+def test_default_socket_is_in_a_private_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    directory = os.path.dirname(daemon.default_socket_path())
+    assert directory == str(tmp_path / f"python-abc-{os.getuid()}")
+
+    daemon.make_private_directory(directory)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    # Someone else could have made it first, and left it open to everyone
+    os.chmod(directory, 0o777)
+    with pytest.raises(daemon.DaemonError, match="other users"):
+        daemon.make_private_directory(directory)
@@ -0,0 +1,70 @@
+import pytest
+
+from python_abc import analyze
+from python_abc.analyze import analyze_files
+from python_abc.cache import content_digest
+from python_abc.dedupe import Duplicates, file_digest
+
+
+TREE = {
+    "a.py": "x = 1\n",
+    "vendor/one/core.py": "if a and b:\n    f(x)\n",
+    "b.py": "y = 2\n",
+    "vendor/two/core.py": "if a and b:\n    f(x)\n",
+    "vendor/two/a.py": "x = 1\n",
+    "c.py": "z = 3\n",
+    "vendor/three/core.py": "if a and b:\n    f(x)\n",
+}
+
+
+def test_file_digest_matches_content_digest(tmp_path):
+    path = tmp_path / "big.py"
+    path.write_bytes(b"x = 1\n" * 500_000)
+    assert file_digest(str(path)) == content_digest(path.read_bytes())
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+@pytest.mark.parametrize("ordered", [True, False])
+def test_each_distinct_file_is_only_analyzed_once(
+    monkeypatch, executor, ordered, make_tree
+):
+    files = make_tree(TREE)
+    expected = {r.path: str(r.vector) for r in analyze_files(files, "serial")}
+
+    analyzed = []
+    analyze_file = analyze.analyze_file
+
+    def spy(filename, *args):
+        analyzed.append(filename)
+        return analyze_file(filename, *args)
+
+    if executor == "serial":
+        monkeypatch.setattr(analyze, "analyze_file", spy)
+
+    duplicates = Duplicates()
+    results = list(
+        analyze_files(files, executor, 2, ordered=ordered, duplicates=duplicates)
+    )
+
+    if ordered:
+        assert [result.path for result in results] == files
+    else:
+        assert sorted(result.path for result in results) == sorted(files)
+    assert {r.path: str(r.vector) for r in results} == expected
+    assert duplicates.files == 3
+    assert duplicates.bytes == 2 * 21 + 6
+    if executor == "serial":
+        assert sorted(analyzed) == sorted(files[:3] + files[5:6])
+
+
+def test_files_without_duplicates_are_never_read(monkeypatch, make_tree):
+    files = make_tree(TREE)[:3]
+    read = []
+    monkeypatch.setattr("python_abc.dedupe.file_digest", read.append)
+    duplicates = Duplicates()
+    assert duplicates.find([(files[0], 6), (files[1], 21), (files[2], 7)]) == [
+        (files[0], 6),
+        (files[1], 21),
+        (files[2], 7),
+    ]
+    assert read == []
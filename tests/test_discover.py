@@ -0,0 +1,199 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from python_abc.analyze import analyze_files
+from python_abc.discover import GitIgnore, discover, read_file_list
+from python_abc.executor import SerialExecutor
+
+
+def relative(root, found):
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path in found]
+
+
+def test_discovery_skips_excluded_directories_and_virtualenvs(tmp_path, make_tree):
+    make_tree(
+        [
+            "a.py",
+            "notes.txt",
+            "pkg/b.py",
+            "pkg/z.py",
+            "build/lib/c.py",
+            "node_modules/d.py",
+            "env/pyvenv.cfg",
+            "env/lib/e.py",
+        ],
+    )
+
+    assert relative(tmp_path, discover([str(tmp_path)])) == [
+        "a.py",
+        "pkg/b.py",
+        "pkg/z.py",
+    ]
+
+
+def test_include_and_exclude_globs(tmp_path, make_tree):
+    make_tree(["a.py", "a.pyi", "pkg/test_b.py", "pkg/sub/c.py"])
+
+    found = discover(
+        [str(tmp_path)], include=["*.py", "*.pyi"], exclude=["test_*", "pkg/sub"]
+    )
+
+    assert relative(tmp_path, found) == ["a.py", "a.pyi"]
+
+
+def test_files_are_always_included(tmp_path, make_tree):
+    make_tree(["script"])
+
+    assert list(discover([str(tmp_path / "script")])) == [str(tmp_path / "script")]
+
+
+def test_gitignore(tmp_path, make_tree):
+    make_tree(
+        [
+            "keep.py",
+            "generated_a.py",
+            "generated_keep.py",
+            "out/a.py",
+            "src/out.py",
+            "src/docs/a.py",
+            "src/nested/ignored.py",
+            "src/nested/kept.py",
+        ],
+    )
+    (tmp_path / ".gitignore").write_text(
+        "# comment\ngenerated_*.py\n!generated_keep.py\nout/\n/src/docs\n"
+    )
+    (tmp_path / "src" / "nested" / ".gitignore").write_text("ignored.py\n")
+
+    found = discover([str(tmp_path)], gitignore=True)
+
+    assert relative(tmp_path, found) == [
+        "generated_keep.py",
+        "keep.py",
+        "src/out.py",
+        "src/nested/kept.py",
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern,path,is_dir,ignored",
+    [
+        ("*.py", "a/b.py", False, True),
+        ("/a.py", "a.py", False, True),
+        ("/a.py", "b/a.py", False, None),
+        ("a/*.py", "a/b.py", False, True),
+        ("a/*.py", "a/b/c.py", False, None),
+        ("**/b.py", "a/x/b.py", False, True),
+        ("a/**", "a/x/b.py", False, True),
+        ("a/**/b.py", "a/b.py", False, True),
+        ("a/**/b.py", "a/x/y/b.py", False, True),
+        ("build/", "build", False, None),
+        ("build/", "build", True, True),
+        ("[ab].py", "b.py", False, True),
+        ("[!ab].py", "b.py", False, None),
+    ],
+)
+def test_gitignore_patterns(pattern, path, is_dir, ignored):
+    assert GitIgnore([pattern]).match(path, is_dir) is ignored
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_symlink_loops_are_only_followed_once(tmp_path, make_tree):
+    make_tree(["a/b.py"])
+    os.symlink(tmp_path, tmp_path / "a" / "loop")
+
+    assert relative(tmp_path, discover([str(tmp_path)])) == ["a/b.py"]
+    assert relative(tmp_path, discover([str(tmp_path)], follow_symlinks=True)) == [
+        "a/b.py"
+    ]
+
+
+class Trickle(io.BufferedIOBase):
+    """A stream that only returns a few bytes at a time, like a slow pipe"""
+
+    def __init__(self, data: bytes, size: int):
+        self.stream = io.BytesIO(data)
+        self.size = size
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.stream.read(self.size)
+
+
+@pytest.mark.parametrize("size", [1, 3, 1024])
+def test_read_file_list(size):
+    newlines = b"a.py\r\nb c.py\n\nd/e.py"
+    assert list(read_file_list(Trickle(newlines, size))) == ["a.py", "b c.py", "d/e.py"]
+
+    nuls = b"a.py\0new\nline.py\0\0"
+    assert list(read_file_list(Trickle(nuls, size))) == ["a.py", "new\nline.py"]
+
+    assert list(read_file_list(Trickle(b"", size))) == []
+
+
+def test_listed_files_are_analyzed_as_they_arrive(tmp_path):
+    for index in range(100):
+        (tmp_path / f"module{index}.py").write_text("x = 1\n")
+    read_fd, write_fd = os.pipe()
+    started = threading.Event()
+    overlapped = []
+
+    class Executor(SerialExecutor):
+        def submit(self, fn, /, *args, **kwargs):
+            started.set()
+            return super().submit(fn, *args, **kwargs)
+
+    def produce():
+        with open(write_fd, "wb") as pipe:
+            pipe.writelines(f"{tmp_path}/module{i}.py\0".encode() for i in range(50))
+            pipe.flush()
+            # Hold the rest back until the first batch has been started on
+            overlapped.append(started.wait(10))
+            pipe.writelines(
+                f"{tmp_path}/module{i}.py\0".encode() for i in range(50, 100)
+            )
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    with open(read_fd, "rb") as pipe:
+        files = discover(read_file_list(pipe))
+        results = list(analyze_files(files, Executor(), lazy=True))
+    producer.join()
+
+    assert overlapped == [True]
+    assert [str(result.vector) for result in results] == ["<1, 0, 0>"] * 100
+
+
+def test_paths_can_be_listed_on_the_command_line(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    (tmp_path / "b.py").write_text("f()\n")
+    completed = subprocess.run(
+        [sys.executable, "-m", "python_abc", "-", "--format", "jsonl"],
+        input=f"{tmp_path}/a.py\0{tmp_path}/b.py\0".encode(),
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert completed.stdout.count(b'"type":"file"') == 2
+
+    listing = tmp_path / "files.txt"
+    listing.write_text(f"{tmp_path}/b.py\n")
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-W",
+            "always::ResourceWarning",
+            "-m",
+            "python_abc",
+            "--files-from",
+            str(listing),
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    assert b"b.py" in completed.stdout and b"a.py" not in completed.stdout
+    assert b"ResourceWarning" not in completed.stderr
@@ -0,0 +1,108 @@
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from python_abc import git
+from python_abc.discover import DEFAULT_INCLUDES, compile_globs
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def commit(repository, files, message):
+    for name, contents in files.items():
+        path = repository / name
+        if contents is None:
+            path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(contents)
+
+    for args in (["add", "-A"], ["commit", "-q", "-m", message]):
+        subprocess.run(
+            [
+                "git",
+                "-c",
+                "user.name=test",
+                "-c",
+                "user.email=test@example.com",
+                *args,
+            ],
+            cwd=repository,
+            check=True,
+        )
+
+
+@pytest.fixture
+def repository(tmp_path):
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=tmp_path, check=True)
+    commit(
+        tmp_path,
+        {"kept.py": "a = 1\n", "changed.py": "f()\n", "removed.py": "if a: pass\n"},
+        "base",
+    )
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "spec,expected",
+    [
+        ("main..feature", ("main", "feature")),
+        ("main...feature", ("main", "feature")),
+        ("main..", ("main", "HEAD")),
+        ("main", ("main", "HEAD")),
+    ],
+)
+def test_parse_range(spec, expected):
+    assert git.parse_range(spec) == expected
+
+
+def test_cat_file(repository):
+    with git.CatFile(str(repository)) as cat_file:
+        assert cat_file.read("HEAD", "kept.py") == b"a = 1\n"
+        assert cat_file.read("HEAD", "missing.py") is None
+        assert cat_file.read("HEAD", "changed.py") == b"f()\n"
+
+
+def test_diff_scores(repository):
+    subprocess.run(["git", "checkout", "-q", "-b", "feature"], cwd=repository)
+    commit(
+        repository,
+        {
+            "changed.py": "f()\ng()\n",
+            "removed.py": None,
+            "added.py": "b = c = d\n",
+            "broken.py": "def (\n",
+            "notes.txt": "not python",
+        },
+        "feature",
+    )
+
+    changes = {
+        change.path: change
+        for change in git.diff_scores(
+            "main..feature", str(repository), compile_globs(DEFAULT_INCLUDES)
+        )
+    }
+
+    assert sorted(changes) == ["added.py", "broken.py", "changed.py", "removed.py"]
+    assert str(changes["changed.py"].old) == "<0, 1, 0>"
+    assert str(changes["changed.py"].new) == "<0, 2, 0>"
+    assert str(changes["changed.py"].delta) == "<0, 1, 0>"
+    assert changes["added.py"].status == "A"
+    assert str(changes["added.py"].delta) == "<2, 0, 0>"
+    assert changes["removed.py"].new is None
+    assert str(changes["removed.py"].delta) == "<0, 0, -1>"
+    assert changes["broken.py"].new is None
+
+
+def test_bad_revision_is_reported_without_a_traceback(repository):
+    completed = subprocess.run(
+        [sys.executable, "-m", "python_abc", str(repository), "--diff", "nope..main"],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert completed.returncode == 1
+    assert completed.stderr.startswith("python-abc: error: ")
+    assert "Traceback" not in completed.stderr
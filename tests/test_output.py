@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from python_abc.analyze import Result
+from python_abc.calculate import calculate_abc_by_scope
+from python_abc.git import Change
+from python_abc.output import (
+    CsvWriter,
+    JsonLinesWriter,
+    SarifWriter,
+    TextWriter,
+    Writer,
+    make_writer,
+)
+from python_abc.vector import Vector
+
+SOURCE = """\
+class A:
+    def f(self):
+        x = 1
+        if x:
+            return g()
+"""
+
+
+def scoped_result() -> Result:
+    module = calculate_abc_by_scope(SOURCE)
+    return Result("pkg/a.py", module.inclusive, module)
+
+
+def test_text_matches_the_table():
+    stream = io.StringIO()
+    writer = TextWriter(stream)
+    writer.write_file(Result("a.py", Vector(1, 2, 0)))
+    writer.write_file(Result("pkg/bad.py", None, error="invalid syntax (line 1)"))
+    writer.write_file(Result("pkg/gen.py", None, error="skipped, it's generated"))
+    writer.write_file(Result("gone.py", None, error="FileNotFoundError: gone.py"))
+    writer.close()
+
+    assert stream.getvalue().splitlines() == [
+        f"a.py {'<1, 2, 0> (2.2)':>26}",
+        f"pkg/bad.py {'Unable to parse AST':>26}",
+        "pkg/gen.py skipped, it's generated",
+        "gone.py    FileNotFoundError: gone.py",
+    ]
+
+
+def test_text_changes_say_why_there_is_no_score():
+    stream = io.StringIO()
+    writer = TextWriter(stream)
+    old = Vector(1, 0, 0)
+    writer.write_change(Change("a.py", "M", old, None, error="invalid syntax (line 3)"))
+    writer.write_change(Change("b.py", "M", old, None, error="skipped, it's generated"))
+
+    assert stream.getvalue().splitlines() == [
+        "M a.py <1, 0, 0> (1.0) -> Unable to parse AST <-1, +0, +0> (-1.0)",
+        "M b.py <1, 0, 0> (1.0) -> skipped, it's generated <-1, +0, +0> (-1.0)",
+    ]
+
+
+def test_jsonl_writes_one_object_per_file():
+    stream = io.StringIO()
+    writer = JsonLinesWriter(stream, show_scopes=True)
+    writer.write_file(scoped_result())
+    writer.write_file(Result("bad.py", None, error="invalid syntax (line 1)"))
+    writer.close()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["type"] == "file"
+    assert first["path"] == "pkg/a.py"
+    assert (first["assignment"], first["branch"], first["condition"]) == (1, 1, 1)
+    assert first["error"] is None
+    [cls] = first["scopes"]
+    assert cls["qualname"] == "A"
+    assert cls["children"][0]["qualname"] == "A.f"
+    assert second == {
+        "type": "file",
+        "path": "bad.py",
+        "error": "invalid syntax (line 1)",
+    }
+
+
+def test_jsonl_scopes_and_changes():
+    stream = io.StringIO()
+    writer = JsonLinesWriter(stream)
+    module = calculate_abc_by_scope(SOURCE)
+    writer.write_scopes([("a.py", scope) for _, scope in module.walk() if _])
+    writer.write_change(Change("a.py", "M", Vector(1, 0, 0), Vector(2, 1, 0)))
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["type"] for record in records] == ["scope", "scope", "change"]
+    assert records[1]["qualname"] == "A.f"
+    assert records[2]["delta"] == {"assignment": 1, "branch": 1, "condition": 0}
+
+
+def test_csv_has_a_row_per_file_and_scope():
+    stream = io.StringIO()
+    writer = CsvWriter(stream, show_scopes=True)
+    writer.write_file(scoped_result())
+    writer.write_file(Result("bad.py", None, error="invalid syntax (line 1)"))
+
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert [(row["path"], row["scope"], row["kind"]) for row in rows] == [
+        ("pkg/a.py", "", "module"),
+        ("pkg/a.py", "A", "class"),
+        ("pkg/a.py", "A.f", "method"),
+        ("bad.py", "", "module"),
+    ]
+    assert rows[2]["lineno"] == "2"
+    assert rows[3]["magnitude"] == ""
+    assert rows[3]["error"] == "invalid syntax (line 1)"
+
+
+def test_csv_changes():
+    stream = io.StringIO()
+    writer = CsvWriter(stream)
+    writer.write_change(Change("a.py", "A", None, Vector(3, 4, 0)))
+
+    [row] = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert row["status"] == "A"
+    assert row["old_magnitude"] == ""
+    assert row["new_magnitude"] == "5.0"
+
+
+def test_sarif_is_a_valid_log():
+    stream = io.StringIO()
+    writer = SarifWriter(stream, show_scopes=True)
+    writer.write_file(scoped_result())
+    writer.write_file(Result("bad.py", None, error="invalid syntax (line 1)"))
+    writer.write_file(Result("gen.py", None, error="skipped, it's generated"))
+    writer.close()
+
+    log = json.loads(stream.getvalue())
+    assert log["version"] == "2.1.0"
+    results = log["runs"][0]["results"]
+    assert [result["ruleId"] for result in results] == [
+        "ABC001",
+        "ABC001",
+        "ABC001",
+        "ABC000",
+        "ABC000",
+    ]
+    method = results[2]
+    assert method["locations"][0]["physicalLocation"]["region"] == {"startLine": 2}
+    assert method["properties"]["qualname"] == "A.f"
+    assert results[3]["level"] == "error"
+    assert results[4]["level"] == "note"
+
+
+def test_empty_sarif_log():
+    stream = io.StringIO()
+    SarifWriter(stream).close()
+
+    assert json.loads(stream.getvalue())["runs"][0]["results"] == []
+
+
+def test_make_writer_defaults_to_text():
+    assert isinstance(make_writer("text", io.StringIO()), TextWriter)
+    assert isinstance(make_writer("sarif", io.StringIO()), SarifWriter)
+
+
+def test_writer_must_write_every_record():
+    class FilesOnly(Writer):
+        def write_file(self, result: Result) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        FilesOnly(io.StringIO())  # type: ignore[abstract]
+
+
+def test_output_file_is_closed(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    report = tmp_path / "report.txt"
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-W",
+            "always::ResourceWarning",
+            "-m",
+            "python_abc",
+            str(tmp_path / "a.py"),
+            "--output",
+            str(report),
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    assert "a.py" in report.read_text()
+    assert b"ResourceWarning" not in completed.stderr
@@ -0,0 +1,88 @@
+import json
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from python_abc.analyze import Options, analyze_file, analyze_files
+from python_abc.profiling import Profiler, format_report, profile_file
+
+
+TREE = {
+    "small.py": "x = 1\n",
+    "large.py": "if a and b:\n    f(x)\n" * 200,
+    "broken.py": "def f(:\n",
+}
+
+
+def test_profile_file_gives_the_same_result_as_analyze_file(make_tree):
+    for filename in make_tree(TREE):
+        for options in (Options(), Options(scopes=True)):
+            compact, profile = profile_file(filename, options, Counter())
+            assert compact == analyze_file(filename, options)
+            assert profile.path == filename
+
+
+def test_profile_file_counts_nodes_and_handler_calls(tmp_path):
+    filename = tmp_path / "module.py"
+    filename.write_text("x = f(1)\n")
+    calls: Counter = Counter()
+    _, profile = profile_file(str(filename), Options(), calls)
+
+    # Module, Assign, Name, Store, Call, Name, Load and Constant
+    assert profile.nodes == 8
+    assert profile.size == 9
+    assert calls == {"Assign": 1, "Call": 1}
+    assert all(wall >= 0 for wall in profile.wall)
+
+
+def test_nested_phases_are_not_counted_twice():
+    profiler = Profiler()
+    with profiler.phase("aggregate"):
+        time.sleep(0.02)
+        with profiler.phase("output"):
+            time.sleep(0.05)
+
+    assert profiler.phases["output"][0] >= 0.05
+    assert 0.02 <= profiler.phases["aggregate"][0] < 0.05
+
+
+def test_report_covers_every_file(make_tree):
+    files = sorted(make_tree(TREE))
+    profiler = Profiler(slowest=2)
+    results = list(
+        profiler.iterate(
+            analyze_files(files, executor="thread", workers=2, profiler=profiler),
+            "wait",
+        )
+    )
+    report = profiler.report()
+
+    assert sorted(result.path for result in results) == files
+    assert report["files"] == 3
+    assert report["slowest"][0]["path"].endswith("large.py")
+    assert len(report["slowest"]) == 2
+    assert report["handler_calls"]["Call"] == 200
+    assert sum(worker["files"] for worker in report["workers"]) == 3
+    assert set(report["phases"]) == {"wait", "aggregate"}
+    assert "slowest files:" in format_report(report)
+
+
+def test_cli_writes_the_profile_to_stderr(tmp_path, make_tree):
+    make_tree(TREE)
+    completed = subprocess.run(
+        [sys.executable, "-m", "python_abc", str(tmp_path), "--profile", "json"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    report = json.loads(completed.stderr)
+    assert report["files"] == 3
+    assert list(report["phases"]) == [
+        "discover",
+        "schedule",
+        "wait",
+        "aggregate",
+        "output",
+    ]
+    assert b"large.py" in completed.stdout
@@ -0,0 +1,42 @@
+from python_abc.rank import Ranking
+
+
+def test_unlimited_ranking_sorts_highest_first():
+    ranking: Ranking[str] = Ranking()
+    for score, item in [(4, "b"), (9, "a"), (1, "c")]:
+        ranking.add(score, item)
+
+    assert list(ranking) == ["a", "b", "c"]
+
+
+def test_limit_keeps_only_the_highest():
+    ranking: Ranking[int] = Ranking(limit=3)
+    for n in [5, 1, 9, 3, 7, 2, 8]:
+        ranking.add(n, n)
+
+    assert len(ranking) == 3
+    assert list(ranking) == [9, 8, 7]
+
+
+def test_ties_keep_the_order_they_were_added_in():
+    ranking: Ranking[str] = Ranking(limit=2)
+    for item in ["first", "second", "third"]:
+        ranking.add(1, item)
+
+    assert list(ranking) == ["first", "second"]
+
+
+def test_minimum_is_a_magnitude():
+    ranking: Ranking[str] = Ranking(minimum=3.0)
+    ranking.add(8, "below")  # sqrt(8) is 2.8
+    ranking.add(9, "equal")
+    ranking.add(10, "above")
+
+    assert list(ranking) == ["above", "equal"]
+
+
+def test_zero_limit():
+    ranking: Ranking[int] = Ranking(limit=0)
+    ranking.add(1, 1)
+
+    assert list(ranking) == []
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+import random
+
+import pytest
+
+from python_abc.analyze import Result
+from python_abc.output import CsvWriter, JsonLinesWriter, TextWriter
+from python_abc.rollup import Rollup, parent
+from python_abc.vector import Vector
+
+RESULTS = [
+    Result("src/a.py", Vector(3, 4, 0)),
+    Result("src/pkg/b.py", Vector(1, 0, 0)),
+    Result("src/pkg/sub/c.py", Vector(0, 12, 5)),
+    Result("src/pkg/sub/d.py", Vector(0, 5, 12)),
+    Result("src/pkg/bad.py", None, error="invalid syntax (line 1)"),
+    Result("src/pkg/gen.py", None, error="skipped, the file is marked as generated"),
+    Result("src/other/e.py", Vector(0, 0, 2)),
+]
+
+
+def rollups(results):
+    rollup = Rollup()
+    for result in results:
+        rollup.add(result)
+    return {directory.path: directory for directory in rollup.finish()}
+
+
+@pytest.mark.parametrize(
+    "path,expected",
+    [
+        ("a.py", ""),
+        ("src/pkg/a.py", "src/pkg"),
+        ("/abs/a.py", "/abs"),
+        ("dist/x.whl!pkg/sub/a.py", "dist/x.whl!pkg/sub"),
+        ("dist/x.whl!a.py", "dist/x.whl"),
+        ("dist/x.whl", "dist"),
+    ],
+)
+def test_parent(path, expected):
+    assert parent(path) == expected
+
+
+def test_directories_total_everything_below_them():
+    directories = rollups(RESULTS)
+    assert list(directories) == ["src", "src/other", "src/pkg", "src/pkg/sub"]
+
+    top = directories["src"]
+    assert str(top.vector) == "<4, 21, 19>"
+    assert (top.files, top.errors, top.skipped) == (5, 1, 1)
+    assert top.mean == round((5 + 1 + 13 + 13 + 2) / 5, 1)
+    assert (top.max, top.worst) == (13.0, "src/pkg/sub/c.py")
+
+    pkg = directories["src/pkg"]
+    assert str(pkg.vector) == "<1, 17, 17>"
+    assert (pkg.files, pkg.errors, pkg.skipped) == (3, 1, 1)
+    assert directories["src/pkg/sub"].worst == "src/pkg/sub/c.py"
+
+
+def test_the_result_does_not_depend_on_the_order():
+    def summary(results):
+        return {
+            path: (str(d.vector), d.count, d.mean, d.max, d.worst)
+            for path, d in rollups(results).items()
+        }
+
+    shuffled = list(RESULTS)
+    random.Random(0).shuffle(shuffled)
+    assert summary(shuffled) == summary(RESULTS)
+
+
+def test_top_level_is_kept_when_it_has_files_of_its_own():
+    directories = rollups([Result("a.py", Vector(1, 0, 0))] + RESULTS)
+    assert list(directories)[:2] == ["", "src"]
+    assert directories[""].files == 6
+
+
+def test_writers():
+    directories = list(rollups(RESULTS).values())
+
+    stream = io.StringIO()
+    writer = TextWriter(stream)
+    writer.write_rollups(directories)
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == (
+        f"src/         {'<4, 21, 19> (28.6)':>26}  "
+        "5 files, mean 6.8, max 13.0 in src/pkg/sub/c.py, 1 unable to parse, 1 skipped"
+    )
+
+    stream = io.StringIO()
+    JsonLinesWriter(stream).write_rollups(directories)
+    record = json.loads(stream.getvalue().splitlines()[1])
+    assert record == {
+        "type": "rollup",
+        "path": "src/other",
+        "files": 1,
+        "errors": 0,
+        "skipped": 0,
+        "assignment": 0,
+        "branch": 0,
+        "condition": 2,
+        "magnitude": 2.0,
+        "mean": 2.0,
+        "max": 2.0,
+        "worst": "src/other/e.py",
+    }
+
+    stream = io.StringIO()
+    writer = CsvWriter(stream)
+    writer.write_file(RESULTS[0])
+    writer.write_rollups(directories)
+    rows = list(csv.reader(io.StringIO(stream.getvalue())))
+    assert rows[2] == []
+    assert rows[3][:3] == ["path", "files", "errors"]
+    assert rows[4][:4] == ["src", "5", "1", "1"]
@@ -0,0 +1,41 @@
+from python_abc.schedule import batch_bytes, plan_batches, stat_sizes
+
+SIZED = [("a.py", 10), ("big.py", 100_000), ("b.py", 20), ("c.py", 30)]
+
+
+def test_keep_order_batches_consecutive_files():
+    batches = plan_batches(SIZED, cores=1, keep_order=True, max_files=2)
+
+    assert batches == [["a.py", "big.py"], ["b.py", "c.py"]]
+
+
+def test_largest_first():
+    batches = plan_batches(SIZED, cores=1, keep_order=False)
+
+    assert batches[0] == ["big.py"]
+    assert sorted(batches[1]) == ["a.py", "b.py", "c.py"]
+
+
+def test_every_file_is_scheduled_exactly_once():
+    sized = [(f"{n}.py", n * 97 % 5000) for n in range(1000)]
+
+    for keep_order in (True, False):
+        batches = plan_batches(sized, cores=8, keep_order=keep_order)
+        scheduled = [filename for batch in batches for filename in batch]
+        assert sorted(scheduled) == sorted(filename for filename, _ in sized)
+
+
+def test_batches_shrink_to_keep_every_core_busy():
+    assert batch_bytes(1_000_000_000, cores=4) == 256 * 1024
+    assert batch_bytes(400_000, cores=4) == 25_000
+    assert batch_bytes(100, cores=4) == 4096
+
+
+def test_missing_files_are_left_to_the_worker(tmp_path):
+    present = tmp_path / "present.py"
+    present.write_text("a = 1\n")
+
+    assert stat_sizes([str(present), str(tmp_path / "missing.py")]) == [
+        (str(present), 6),
+        (str(tmp_path / "missing.py"), 0),
+    ]
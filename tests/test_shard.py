@@ -0,0 +1,117 @@
+import argparse
+import io
+import subprocess
+import sys
+
+import pytest
+
+from python_abc.merge import MergeError, merge_results, read_results
+from python_abc.shard import Shard, assign, parse_shard, path_key, select
+
+SOURCES = {
+    "a.py": "x = 1\n",
+    "big.py": "".join(
+        f"def f{i}(a):\n    if a > {i}:\n        b = a\n" for i in range(40)
+    ),
+    "pkg/__init__.py": "",
+    "pkg/core.py": "class C:\n    def m(self):\n        return self.x and self.y\n",
+    "pkg/sub/deep.py": "for i in range(3):\n    print(i)\n",
+    "z.py": "if a:\n    b = c\nelse:\n    d()\n",
+}
+
+
+def run(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "python_abc", *args],
+        stdout=subprocess.PIPE,
+        check=True,
+        text=True,
+    ).stdout
+
+
+def test_parse_shard():
+    assert parse_shard("2/3") == Shard(2, 3)
+    for value in ("0/3", "4/3", "1", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_shard(value)
+
+
+def test_shards_are_balanced_by_bytes_whatever_the_order():
+    sized = [("huge.py", 1000)] + [(f"small{i}.py", 100) for i in range(10)]
+    assigned = assign(sized, 2)
+    totals = [0, 0]
+    for (_, size), shard in zip(sized, assigned):
+        totals[shard] += size
+    assert totals == [1000, 1000]
+
+    shuffled = sized[::-1]
+    assert dict(zip(shuffled, assign(shuffled, 2))) == dict(zip(sized, assigned))
+
+
+def test_every_file_is_in_exactly_one_shard():
+    sized = [(f"dir{i % 3}/file{i}.py", i % 7) for i in range(50)]
+    shards = [select(sized, Shard(k, 4)) for k in range(1, 5)]
+    assert sorted(item for shard in shards for item in shard) == sorted(sized)
+    for shard in shards:
+        assert shard == sorted(shard, key=lambda item: path_key(item[0]))
+
+
+def test_path_key_matches_discovery_order():
+    paths = ["a.py", "z.py", "pkg/b.py", "pkg/sub/a.py", "x.whl!a/b.py", "x.whl!a.py"]
+    assert sorted(paths, key=path_key) == [
+        "a.py",
+        "x.whl!a.py",
+        "x.whl!a/b.py",
+        "z.py",
+        "pkg/b.py",
+        "pkg/sub/a.py",
+    ]
+
+
+@pytest.mark.parametrize("shard_report", [[], ["--rollup"]])
+@pytest.mark.parametrize(
+    "report",
+    [
+        ["--format", "jsonl", "--scopes"],
+        ["--sort", "--top", "3"],
+        ["--rollup", "--top", "0", "--format", "jsonl"],
+    ],
+)
+def test_merged_shards_match_a_single_run(tmp_path, report, shard_report, make_tree):
+    tree = str(tmp_path / "tree")
+    make_tree(SOURCES, tmp_path / "tree")
+    shards = []
+    for k in (1, 2, 3):
+        shard = tmp_path / f"shard{k}.jsonl"
+        options = ["--scopes", "--format", "jsonl", "--output", str(shard)]
+        options += shard_report
+        run(tree, "--shard", f"{k}/3", *options)
+        shards.append(str(shard))
+
+    merged = run("merge", *shards, *report)
+    single = run(tree, *report)
+    assert merged.split() == single.split()
+
+
+def test_merge_rejects_shards_out_of_order():
+    shard = io.StringIO(
+        '{"type":"file","path":"b.py","assignment":1,"branch":0,"condition":0}\n'
+        '{"type":"file","path":"a.py","assignment":1,"branch":0,"condition":0}\n'
+    )
+    with pytest.raises(MergeError, match="out of order"):
+        list(merge_results({"shard": shard}))
+
+
+def test_read_results_rebuilds_scopes():
+    [result] = read_results(
+        io.StringIO(
+            '{"type":"file","path":"a.py","assignment":3,"branch":1,"condition":0,'
+            '"scopes":[{"name":"f","kind":"function","lineno":2,"assignment":2,'
+            '"branch":0,"condition":0,"exclusive":{"assignment":2,"branch":0,'
+            '"condition":0},"children":[]}]}\n'
+        )
+    )
+    assert str(result.vector) == "<3, 1, 0>"
+    assert str(result.scope.inclusive) == "<3, 1, 0>"
+    assert str(result.scope.exclusive) == "<1, 1, 0>"
+    assert result.scope.children[0].qualname == "f"
@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from python_abc.stream import prefetch, stream
+
+
+def slow_square(n: int) -> int:
+    # Earlier items take longer, so they finish last
+    time.sleep((10 - n) / 1000)
+    return n * n
+
+
+def test_ordered():
+    with ThreadPoolExecutor(4) as executor:
+        results = list(stream(executor, slow_square, range(10), ordered=True, window=4))
+
+    assert results == [n * n for n in range(10)]
+
+
+def test_completion_order():
+    with ThreadPoolExecutor(4) as executor:
+        results = list(stream(executor, slow_square, range(10), ordered=False))
+
+    assert sorted(results) == [n * n for n in range(10)]
+
+
+def test_window_bounds_work_in_flight():
+    lock = threading.Lock()
+    in_flight = 0
+    most_in_flight = 0
+
+    def track(n: int) -> int:
+        nonlocal in_flight, most_in_flight
+        with lock:
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+        time.sleep(0.001)
+        with lock:
+            in_flight -= 1
+        return n
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(stream(executor, track, range(50), window=3))
+
+    assert results == list(range(50))
+    assert most_in_flight <= 3
+
+
+def test_items_are_consumed_lazily():
+    consumed = []
+
+    def items():
+        for n in range(100):
+            consumed.append(n)
+            yield n
+
+    with ThreadPoolExecutor(2) as executor:
+        results = stream(executor, slow_square, items(), window=2)
+        assert next(results) == 0
+        results.close()
+
+    assert len(consumed) < 10
+
+
+def test_prefetch():
+    assert list(prefetch(range(100), size=3)) == list(range(100))
+
+
+def test_prefetch_reraises_errors():
+    def items():
+        yield 1
+        raise ValueError("oops")
+
+    results = prefetch(items())
+    assert next(results) == 1
+    with pytest.raises(ValueError):
+        next(results)
@@ -44,3 +44,10 @@ def test_base_vectors(vector_type, as_boolean, as_string, as_notation, magnitude
     assert str(vector_type) == as_string
     assert vector_type.as_notation == as_notation
     assert vector_type.magnitude == magnitude
+
+
+def test_magnitude_squared_is_exact():
+    vector_ = vector.Vector(1, 7, 10)
+
+    assert vector_.get_magnitude_squared() == 150
+    assert vector_.get_magnitude_value() == 12.2
@@ -0,0 +1,34 @@
+import ast
+
+from python_abc import calculate, walk
+
+
+def test_table_skips_default_handlers():
+    assert ast.Call in calculate.handlers()
+    assert ast.If in calculate.handlers()
+    assert ast.Name not in calculate.handlers()
+    assert ast.FunctionDef not in calculate.handlers()
+
+
+def test_walk_finds_the_same_nodes_as_ast_walk():
+    tree = ast.parse(
+        """\
+def f(a, b=g()):
+    while a < b:
+        b, a = a ** 2, [h(x) for x in b if x]
+    return {k: v() for k, v in a.items()} or (lambda: b(a))
+"""
+    )
+
+    expected = [node for node in ast.walk(tree) if type(node) in calculate.handlers()]
+    found = [node for node, _ in walk.walk(tree, calculate.handlers())]
+
+    assert sorted(map(id, found)) == sorted(map(id, expected))
+
+
+def test_walk_handles_deeply_nested_trees():
+    tree = ast.Expr(ast.Constant(1))
+    for _ in range(10_000):
+        tree = ast.Expr(ast.Call(ast.Name("f", ast.Load()), [tree.value], []))
+
+    assert sum(1 for _ in walk.walk(tree, calculate.handlers())) == 10_000
@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from python_abc.analyze import analyze_files
+from python_abc.watch import InotifyWatcher, PollingWatcher, Session
+
+
+def test_only_new_and_changed_files_are_analyzed(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    (tmp_path / "b.py").write_text("y = f()\n")
+    analyzed = []
+
+    def analyze(files):
+        analyzed.append(sorted(os.path.basename(f) for f in files))
+        return analyze_files(files, executor="serial")
+
+    session = Session([str(tmp_path)], analyze)
+    changes = session.refresh()
+    assert len(changes.added) == 2
+    assert analyzed == [["a.py", "b.py"]]
+
+    assert not session.refresh()
+    assert analyzed[-1] == []
+
+    (tmp_path / "a.py").write_text("x = 1\nz = 2\n")
+    os.utime(tmp_path / "a.py", ns=(0, 10**9))
+    (tmp_path / "b.py").unlink()
+    (tmp_path / "c.py").write_text("")
+    changes = session.refresh()
+    assert [os.path.basename(f) for f in changes.modified] == ["a.py"]
+    assert [os.path.basename(f) for f in changes.deleted] == ["b.py"]
+    assert analyzed[-1] == ["a.py", "c.py"]
+
+    results = list(session.results.values())
+    assert [os.path.basename(r.path) for r in results] == ["a.py", "c.py"]
+    assert str(results[0].vector) == "<2, 0, 0>"
+
+
+def changes_in_background(tmp_path, count=20):
+    def write():
+        time.sleep(0.1)
+        for i in range(count):
+            (tmp_path / f"m{i}.py").write_text("x = 1\n")
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+
+def test_polling_waits_for_changes_to_settle(tmp_path):
+    session = Session([str(tmp_path)], lambda files: analyze_files(files, "serial"))
+    watcher = PollingWatcher(session.scan, interval=0.05)
+
+    thread = changes_in_background(tmp_path)
+    watcher.wait()
+    thread.join()
+    assert len(session.refresh().added) == 20
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+def test_inotify_coalesces_a_burst_of_changes(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    watcher = InotifyWatcher([str(tmp_path)], debounce=0.1)
+    try:
+        thread = changes_in_background(tmp_path / "pkg")
+        watcher.wait()
+        thread.join()
+        assert len(os.listdir(tmp_path / "pkg")) == 20
+
+        # Directories created after we started watching are watched too
+        (tmp_path / "new").mkdir()
+        watcher.wait()
+        thread = changes_in_background(tmp_path / "new", count=1)
+        watcher.wait()
+        thread.join()
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+def test_inotify_skips_excluded_directories(tmp_path):
+    from python_abc.discover import compile_globs
+
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "src").mkdir()
+    watcher = InotifyWatcher([str(tmp_path)], compile_globs(["node_modules"]))
+    try:
+        watched = sorted(relative for _, relative in watcher.watches.values())
+        assert watched == ["", "src/"]
+    finally:
+        watcher.close()